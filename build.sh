@@ -10,3 +10,4 @@ python manage.py collectstatic --no-input
 python manage.py migrate
 python manage.py create_default_superuser
 python manage.py load_initial_products
+python manage.py rebuild_sales_summary --if-empty
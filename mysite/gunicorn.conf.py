@@ -0,0 +1,24 @@
+# Loaded automatically by `gunicorn --chdir mysite ...` (gunicorn reads
+# ./gunicorn.conf.py after changing directory).
+import os
+
+# Every open order tracking stream (Server-Sent Events) holds a request thread
+# for up to ORDER_EVENTS_STREAM_TIMEOUT seconds, so the default sync worker
+# would let a handful of tracking tabs take the whole site down. Streams close
+# their database connection once they start, so idle streams only cost a thread.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+# Gunicorn reads WEB_CONCURRENCY itself; spelled out here so the total is visible
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+
+def worker_exit(server, worker):
+    # Let emails already handed to the dispatch pool go out before the worker
+    # exits; anything still queued after EMAIL_DISPATCH_DRAIN_TIMEOUT stays
+    # pending in the outbox for run_email_worker.
+    from hello.utils import email_dispatch, metrics
+
+    if not email_dispatch.drain():
+        worker.log.warning("Email dispatch pool did not drain before exit: %s", email_dispatch.executor.stats())
+    # Fold this worker's counters into METRICS_DIR/aggregate.json so its pid file can't be reused
+    metrics.mark_process_dead(worker.pid)
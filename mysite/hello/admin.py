@@ -1,7 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import SignupEvent, Product, Order, OrderItem, SalesSummary, FrontendContent
+from django.utils import timezone
+from django.db import transaction
+from .models import SignupEvent, Product, Order, OrderItem, SalesSummary, ProductSalesSummary, FrontendContent, EmailOutbox, PaymentIntentStatus, DeletedOrder
+from .utils import order_events, sales_rollup
 
 # Unregister the default User admin and register our custom one
 admin.site.unregister(User)
@@ -61,29 +64,100 @@ class OrderAdmin(admin.ModelAdmin):
     readonly_fields = ("created_at", "updated_at")
     actions = ["mark_completed", "mark_pending", "mark_cancelled"]
 
+    def _set_status(self, queryset, status):
+        with transaction.atomic():
+            changing = list(queryset.exclude(status=status).values_list("pk", flat=True))
+            updated = Order.objects.transition(Order.objects.filter(pk__in=changing), status)
+            # Open tracking pages should see admin changes too
+            for order in Order.objects.filter(pk__in=changing).prefetch_related("order_items"):
+                order_events.publish_order_status(order)
+        return updated
+
     def mark_completed(self, request, queryset):
-        updated = queryset.update(status="completed")
+        # Delivery orders finish as delivered; pickup and dine-in orders as picked up
+        updated = self._set_status(queryset.filter(order_type="delivery"), "delivered")
+        updated += self._set_status(queryset.exclude(order_type="delivery"), "picked_up")
         self.message_user(request, f"Marked {updated} order(s) as completed.")
     mark_completed.short_description = "Mark selected orders as completed"
 
     def mark_pending(self, request, queryset):
-        updated = queryset.update(status="pending")
+        updated = self._set_status(queryset, "order_placed")
         self.message_user(request, f"Marked {updated} order(s) as pending.")
     mark_pending.short_description = "Mark selected orders as pending"
 
     def mark_cancelled(self, request, queryset):
-        updated = queryset.update(status="cancelled")
+        updated = self._set_status(queryset, "cancelled")
         self.message_user(request, f"Marked {updated} order(s) as cancelled.")
     mark_cancelled.short_description = "Mark selected orders as cancelled"
 
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            if obj.status != "cancelled":
+                sales_rollup.reverse_orders([obj])
+            super().delete_model(request, obj)
+            DeletedOrder.objects.record([obj.order_id])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            sales_rollup.reverse_orders(queryset.exclude(status="cancelled").prefetch_related("order_items"))
+            order_ids = list(queryset.values_list("order_id", flat=True))
+            super().delete_queryset(request, queryset)
+            DeletedOrder.objects.record(order_ids)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Orders added here get their items only now, so count them once they exist
+        if not change and form.instance.status != "cancelled":
+            sales_rollup.record_orders([form.instance])
+        # An edited total or removed item can't be applied as a delta, so recount the order's periods
+        elif change and ("total_amount" in form.changed_data or any(formset.has_changed() for formset in formsets)):
+            sales_rollup.rebuild_periods([sales_rollup.order_day(form.instance)])
+
 
 @admin.register(SalesSummary)
 class SalesSummaryAdmin(admin.ModelAdmin):
-    list_display = ("period_type", "period_start", "total_amount", "updated_at")
+    list_display = ("period_type", "period_start", "total_amount", "order_count", "products_sold", "updated_at")
     list_filter = ("period_type", "period_start")
     date_hierarchy = "period_start"
     search_fields = ("period_type",)
-    readonly_fields = ("period_type", "period_start", "total_amount", "updated_at")
+    readonly_fields = ("period_type", "period_start", "total_amount", "order_count", "products_sold", "updated_at")
+
+
+@admin.register(ProductSalesSummary)
+class ProductSalesSummaryAdmin(admin.ModelAdmin):
+    list_display = ("period_type", "period_start", "product_name", "size", "quantity", "revenue", "order_count")
+    list_filter = ("period_type", "period_start")
+    date_hierarchy = "period_start"
+    search_fields = ("product_name",)
+    readonly_fields = ("period_type", "period_start", "product_name", "size", "quantity", "revenue", "order_count", "updated_at")
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "to_email", "subject", "status", "attempts", "created_at", "sent_at", "latency_ms")
+    list_filter = ("status", "kind", "created_at")
+    search_fields = ("to_email", "subject", "order__order_id")
+    readonly_fields = ("created_at", "first_attempt_at", "sent_at", "send_duration_ms", "latency_ms", "last_error")
+    raw_id_fields = ("order",)
+    actions = ["retry_now"]
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=EmailOutbox.STATUS_SENT).update(
+            status=EmailOutbox.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+            locked_at=None,
+        )
+        self.message_user(request, f"Requeued {updated} email(s).")
+    retry_now.short_description = "Retry selected emails now"
+
+
+@admin.register(PaymentIntentStatus)
+class PaymentIntentStatusAdmin(admin.ModelAdmin):
+    list_display = ("payment_intent_id", "status", "source", "created_at", "updated_at")
+    list_filter = ("status", "source")
+    search_fields = ("payment_intent_id",)
+    readonly_fields = ("created_at", "updated_at")
 
 
 @admin.register(FrontendContent)
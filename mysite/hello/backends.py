@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def _user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def evict_cached_user(user_id):
+    caches[settings.SESSION_CACHE_ALIAS].delete(_user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend whose ``get_user`` (run by AuthenticationMiddleware) is served from cache.
+
+    Authenticated requests otherwise load the user row on every hit, which
+    for the 3-second pollers is most of their query budget. Entries are
+    evicted whenever the user is saved or deleted (see ``hello.signals``),
+    so password changes still log out other sessions right away.
+
+    Staff and superusers are never cached: a bulk ``update()`` that
+    deactivates or demotes them sends no signal, and their access has to
+    end on the next request, not when the entry expires.
+    """
+
+    def get_user(self, user_id):
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        if not timeout:
+            return super().get_user(user_id)
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        key = _user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None and not (user.is_staff or user.is_superuser):
+                cache.set(key, user, timeout)
+        return user
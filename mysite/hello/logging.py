@@ -0,0 +1,104 @@
+"""Structured logging that keeps stdout writes off the request thread.
+
+Records carry key/value fields::
+
+    log = get_logger(__name__)
+    log.info("order created", order_id=order.order_id, items=3)
+
+which come out as one line each::
+
+    2026-01-31T09:15:02+0800 INFO hello.views order created order_id=MJ1234 items=3
+
+``QueueingHandler`` (wired up in settings.LOGGING) formats the record and
+puts it on an in-memory queue; a ``QueueListener`` thread does the actual
+write. Levels are set per logger through LOG_LEVEL / LOG_LEVELS.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+# LogRecord attributes the logging module accepts as keyword arguments itself
+_LOGGING_KWARGS = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+
+def _format_value(value):
+    text = str(value)
+    if not text or any(c in text for c in ' ="\n'):
+        text = '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    return text
+
+
+class KeyValueFormatter(logging.Formatter):
+    """``<time> <LEVEL> <logger> <message> key=value ...`` with the traceback, if any, on following lines.
+
+    Fields whose value is None are left out.
+    """
+
+    default_time_format = '%Y-%m-%dT%H:%M:%S%z'
+    default_msec_format = None
+
+    def format(self, record):
+        parts = [self.formatTime(record), record.levelname, record.name, record.getMessage()]
+        fields = getattr(record, 'fields', None)
+        if fields:
+            parts.extend(f"{key}={_format_value(value)}" for key, value in fields.items() if value is not None)
+        line = ' '.join(parts)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line = f"{line}\n{record.exc_text}"
+        return line
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # The queue may be full at shutdown; wait for the thread to make room rather than fail
+        self.queue.put(self._sentinel)
+
+
+class QueueingHandler(logging.handlers.QueueHandler):
+    """Format on the calling thread, write to stdout from a background listener thread."""
+
+    def __init__(self, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.setFormatter(KeyValueFormatter())
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(logging.Formatter('%(message)s'))
+        self.listener = _Listener(self.queue, output, respect_handler_level=False)
+        self.listener.start()
+        self._listening = True
+        atexit.register(self.stop_listener)
+
+    def stop_listener(self):
+        """Write out whatever is still queued and stop the listener thread (safe to call twice)."""
+        if self._listening:
+            self._listening = False
+            self.listener.stop()
+
+    def close(self):
+        self.stop_listener()
+        super().close()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Stdout can't keep up; dropping a line beats blocking the request
+            pass
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger adapter that turns extra keyword arguments into record fields."""
+
+    def process(self, msg, kwargs):
+        fields = {key: kwargs.pop(key) for key in list(kwargs) if key not in _LOGGING_KWARGS}
+        if fields:
+            kwargs['extra'] = {**kwargs.get('extra', {}), 'fields': fields}
+        return msg, kwargs
+
+
+def get_logger(name):
+    return StructuredLogger(logging.getLogger(name), {})
+
@@ -0,0 +1,34 @@
+"""Shared helpers for the ``benchmark_*`` management commands."""
+from contextlib import contextmanager
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def isolated_database(verbosity=0):
+    """Run the block against a throwaway test database, never the real one."""
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def measure(func, repeat):
+    """Call ``func`` ``repeat`` times; return (median ms, p95 ms, queries per call)."""
+    timings = []
+    query_counts = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(ctx.captured_queries))
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(round(len(timings) * 0.95)) - 1)]
+    return statistics.median(timings), p95, max(query_counts)
@@ -0,0 +1,59 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from hello.models import Product
+
+from ._benchmark import isolated_database, measure
+
+
+class Command(BaseCommand):
+    help = 'Benchmark api_create_order for carts of 1, 10 and 50 lines on a throwaway test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Orders placed per cart size')
+        parser.add_argument('--lines', type=int, nargs='+', default=[1, 10, 50], help='Cart sizes to benchmark')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with isolated_database(), override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'
+        ):
+            max_lines = max(options['lines'])
+            Product.objects.bulk_create([
+                Product(name=f'Benchmark Product {i}', price=100, stock_quantity=1_000_000)
+                for i in range(max_lines)
+            ])
+            products = list(Product.objects.order_by('pk'))
+            client = Client()
+
+            self.stdout.write(f"{'lines':>6} {'median ms':>10} {'p95 ms':>10} {'queries':>8}")
+            for line_count in options['lines']:
+                # Alternate id and name lookups so both matching paths are exercised
+                items = [
+                    {
+                        'product_id': product.id if i % 2 == 0 else None,
+                        'name': product.name,
+                        'quantity': 1,
+                        'price': 100,
+                        'total': 100,
+                    }
+                    for i, product in enumerate(products[:line_count])
+                ]
+                body = json.dumps({
+                    'items': items,
+                    'totalAmount': 100 * line_count,
+                    'orderType': 'pickup',
+                    'paymentMethod': 'cash',
+                })
+
+                def place_order():
+                    response = client.post('/api/orders/', data=body, content_type='application/json')
+                    if response.status_code != 200:
+                        raise RuntimeError(response.content.decode())
+
+                median_ms, p95_ms, queries = measure(place_order, repeat)
+                self.stdout.write(f"{line_count:>6} {median_ms:>10.2f} {p95_ms:>10.2f} {queries:>8}")
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
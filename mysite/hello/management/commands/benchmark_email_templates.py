@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hello.utils import email_templates
+
+
+# Representative context for each registered layout
+SAMPLE_CONTEXTS = {
+    'order_receipt': {
+        'order_id': 'MJ12345678',
+        'customer_name': 'Juan dela Cruz',
+        'order_type': 'Delivery',
+        'payment_method': 'GCash',
+        'total_amount': '450.00',
+        'items': [f'- Product {i} x 1 (Size: M) - Php 90.00' for i in range(5)],
+    },
+    'order_status': {
+        'order_id': 'MJ12345678',
+        'customer_name': 'Juan dela Cruz',
+        'order_type': 'Delivery',
+        'status': 'Out for Delivery',
+        'total_amount': '450.00',
+        'items': [f'- Product {i} x 1 (Size: M) - ₱90.00' for i in range(5)],
+    },
+    'password_reset': {
+        'reset_url': 'https://example.com/reset-password/' + 'x' * 50 + '/',
+    },
+}
+
+
+class Command(BaseCommand):
+    help = 'Measure how many emails per second each registered template renders (subject, text and HTML)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20000, help='Renders per template')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(f"{'template':<16} {'msgs/s':>10} {'us/msg':>8} {'html bytes':>11}")
+        for name, context in SAMPLE_CONTEXTS.items():
+            email = email_templates.render(name, **context)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                email_templates.render(name, **context)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name:<16} {repeat / elapsed:>10.0f} {elapsed / repeat * 1e6:>8.1f} {len(email.html.encode('utf-8')):>11}"
+            )
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from hello.models import Order, next_stock_version
+from hello.views import _encode_changes_token
+
+from ._benchmark import isolated_database, measure
+
+
+# (label, SESSION_ENGINE, AUTHENTICATION_BACKENDS)
+CONFIGURATIONS = [
+    ('db sessions', 'django.contrib.sessions.backends.db', ['django.contrib.auth.backends.ModelBackend']),
+    ('cached_db + user', 'django.contrib.sessions.backends.cached_db', ['hello.backends.CachedModelBackend']),
+    ('signed + user', 'django.contrib.sessions.backends.signed_cookies', ['hello.backends.CachedModelBackend']),
+]
+
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-default'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-sessions'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare queries per request of the polling endpoints under each session/user caching setup'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Requests per endpoint and configuration')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with isolated_database(), override_settings(CACHES=LOCAL_CACHES):
+            staff = User.objects.create_user('benchmark-staff', 'staff@example.com', 'pw', is_staff=True)
+            order = Order.objects.create(
+                order_id='MJBENCH0001', user=staff, customer_name='Benchmark', order_type='delivery', total_amount=100,
+            )
+            endpoints = [
+                ('order status', f'/api/orders/{order.order_id}/status/'),
+                ('order changes', f'/api/orders/changes/?since={_encode_changes_token(order.updated_at)}'),
+                ('stock changes', f'/api/products/stock/?since={next_stock_version()}'),
+            ]
+
+            self.stdout.write(f"{'configuration':<18} {'endpoint':<14} {'median ms':>10} {'p95 ms':>10} {'queries':>8}")
+            for label, engine, backends in CONFIGURATIONS:
+                with override_settings(SESSION_ENGINE=engine, AUTHENTICATION_BACKENDS=backends):
+                    client = Client()
+                    client.force_login(staff)
+                    for name, url in endpoints:
+                        def poll():
+                            response = client.get(url)
+                            if response.status_code != 200:
+                                raise RuntimeError(f'{url}: {response.status_code} {response.content[:200]!r}')
+
+                        poll()  # warm the caches, as a poller's first hit would
+                        median_ms, p95_ms, queries = measure(poll, repeat)
+                        self.stdout.write(f"{label:<18} {name:<14} {median_ms:>10.2f} {p95_ms:>10.2f} {queries:>8}")
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
-from hello.models import Product
+from hello.models import Product, next_stock_version
+from hello.utils.catalog import bump_catalog_version
 
 
 class Command(BaseCommand):
@@ -9,11 +10,13 @@ class Command(BaseCommand):
         # Fix products that are hidden
         hidden_products = Product.objects.filter(show_in_all_menu=False)
         count_hidden = hidden_products.count()
-        hidden_products.update(show_in_all_menu=True)
+        hidden_products.update(show_in_all_menu=True, stock_version=next_stock_version())
         
         inactive_products = Product.objects.filter(is_active=False)
         count_inactive = inactive_products.count()
-        inactive_products.update(is_active=True)
+        inactive_products.update(is_active=True, stock_version=next_stock_version())
+        # Bulk updates skip the Product signals, so invalidate the menu cache here
+        bump_catalog_version()
         
         self.stdout.write(
             self.style.SUCCESS(
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hello.models import DeletedOrder
+
+
+class Command(BaseCommand):
+    help = 'Delete order tombstones older than ORDER_CHANGES_TOMBSTONE_DAYS (run from the reconcile cron)'
+
+    def handle(self, *args, **options):
+        purged = DeletedOrder.objects.purge()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} deleted order tombstone(s)'))
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hello.models import SalesSummary
+from hello.utils.sales_rollup import rebuild, rebuild_periods
+
+
+class Command(BaseCommand):
+    help = 'Recompute the SalesSummary and ProductSalesSummary rollups from all orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Only backfill when no rollups exist yet (safe to run on every deploy)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            help='Only recompute the periods containing the last N days (the scheduled reconcile)',
+        )
+
+    def handle(self, *args, **options):
+        if options['if_empty'] and SalesSummary.objects.exists():
+            self.stdout.write('Sales rollups already present, skipping rebuild')
+            return
+
+        if options['days']:
+            today = timezone.localdate()
+            summary_rows, product_rows = rebuild_periods(today - timedelta(days=n) for n in range(options['days']))
+        else:
+            summary_rows, product_rows = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {summary_rows} sales summary row(s) and {product_rows} product sales row(s)'
+            )
+        )
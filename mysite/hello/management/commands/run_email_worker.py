@@ -0,0 +1,59 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from hello.utils.email import mail_transport
+from hello.utils.outbox import deliver_batch, min_lock_timeout_seconds, outbox_stats
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the EmailOutbox table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit (for cron)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Messages sent per connection')
+        parser.add_argument('--stats', action='store_true', help='Print queue depth and throughput, then exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for key, value in outbox_stats().items():
+                self.stdout.write(f"{key}: {value}")
+            return
+
+        if settings.EMAIL_OUTBOX_LOCK_TIMEOUT <= min_lock_timeout_seconds():
+            # A claim that can expire mid-send lets another worker send the same email again
+            raise CommandError(
+                f'EMAIL_OUTBOX_LOCK_TIMEOUT ({settings.EMAIL_OUTBOX_LOCK_TIMEOUT}s) must be longer than '
+                f'one send can take ({min_lock_timeout_seconds()}s, from EMAIL_TIMEOUT)'
+            )
+
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        batch_size = options['batch_size'] or settings.EMAIL_OUTBOX_BATCH_SIZE
+        self.stdout.write(self.style.SUCCESS(f'Email worker started (batch size {batch_size})'))
+
+        while not self._stopping:
+            close_old_connections()
+            result = deliver_batch(batch_size)
+            if any(result.values()):
+                self.stdout.write(
+                    f"[EMAIL WORKER] sent={result['sent']} retried={result['retried']} dead={result['dead']}"
+                )
+            # A full batch means more mail is probably waiting; otherwise idle until the next poll
+            if result['sent'] + result['retried'] + result['dead'] >= batch_size:
+                continue
+            if options['once']:
+                break
+            time.sleep(settings.EMAIL_OUTBOX_POLL_INTERVAL)
+
+        mail_transport.close()
+        self.stdout.write(self.style.SUCCESS('Email worker stopped'))
+
+    def _request_stop(self, signum, frame):
+        # Finish the batch in flight, then exit the loop
+        self._stopping = True
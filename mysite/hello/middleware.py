@@ -0,0 +1,76 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .logging import get_logger
+from .utils import metrics, request_metrics
+
+
+log = get_logger('hello.requests')
+
+
+class RequestTimingMiddleware:
+    """Time every request and attribute it to its URL name.
+
+    Records wall time, database time and query count (via an execute
+    wrapper on each connection) and time spent in PayMongo/Lalamove calls.
+    Staff responses get a ``Server-Timing`` header. Requests slower than
+    REQUEST_SLOW_MS, or running more than REQUEST_SLOW_QUERIES queries, are
+    logged with their most repeated SQL, which is how N+1 loops show up.
+
+    Streaming responses (order event streams) are timed up to the point
+    the stream starts.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer, token = request_metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            request_metrics.finish(token)
+
+        match = request.resolver_match
+        if match is None:
+            # Unrouted requests (404s from the resolver) aren't worth a series of their own
+            return response
+
+        view_name = match.view_name
+        total_ms = timer.elapsed_ms()
+        request_metrics.record_request(view_name, timer, total_ms)
+        metrics.observe('hello_http_request_duration_seconds', total_ms / 1000, view=view_name, method=request.method)
+        metrics.observe('hello_http_request_queries', timer.queries, view=view_name)
+        metrics.inc('hello_http_request_db_seconds_total', timer.db_ms / 1000, view=view_name)
+
+        if settings.REQUEST_TIMING_HEADER and _is_staff(request):
+            response['Server-Timing'] = (
+                f'app;dur={total_ms:.1f}, '
+                f'db;dur={timer.db_ms:.1f};desc="{timer.queries} queries", '
+                f'ext;dur={timer.external_ms:.1f};desc="{timer.external_calls} calls"'
+            )
+
+        if total_ms >= settings.REQUEST_SLOW_MS or timer.queries >= settings.REQUEST_SLOW_QUERIES:
+            log.warning(
+                "slow request",
+                view=view_name,
+                method=request.method,
+                path=request.path,
+                status=response.status_code,
+                total_ms=round(total_ms, 1),
+                db_ms=round(timer.db_ms, 1),
+                queries=timer.queries,
+                external_ms=round(timer.external_ms, 1),
+                top_sql=' | '.join(f"{count}x {sql[:200]}" for count, sql in timer.repeated_sql()) or None,
+            )
+        return response
+
+
+def _is_staff(request):
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated and (user.is_staff or user.is_superuser)
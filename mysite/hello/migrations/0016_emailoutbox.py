@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hello', '0015_order_picked_up_at_order_preparing_at_order_ready_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'E-receipt'), ('order_status', 'Order status update'), ('other', 'Other')], default='other', max_length=20)),
+                ('to_email', models.EmailField(max_length=254)),
+                ('from_email', models.CharField(max_length=254)),
+                ('subject', models.CharField(max_length=255)),
+                ('body_text', models.TextField()),
+                ('body_html', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('dead', 'Dead letter')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('first_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('send_duration_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_emails', to='hello.order')),
+            ],
+            options={
+                'verbose_name': 'Email outbox message',
+                'verbose_name_plural': 'Email outbox',
+                'ordering': ('-created_at',),
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='hello_outbox_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hello', '0016_emailoutbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='hello_order_updated_idx'),
+        ),
+    ]
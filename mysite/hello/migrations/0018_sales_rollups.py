@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hello', '0017_order_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salessummary',
+            name='order_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='salessummary',
+            name='products_sold',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ProductSalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_type', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month'), ('year', 'Year')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('product_name', models.CharField(max_length=100)),
+                ('size', models.CharField(blank=True, default='', max_length=10)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('order_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Product sales summaries',
+                'ordering': ('-period_start', 'product_name', 'size'),
+                'unique_together': {('period_type', 'period_start', 'product_name', 'size')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:13
+
+import hello.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hello', '0018_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_version',
+            field=models.BigIntegerField(default=hello.models.next_stock_version),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hello', '0020_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentIntentStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_intent_id', models.CharField(max_length=100, unique=True)),
+                ('status', models.CharField(max_length=40)),
+                ('source', models.CharField(choices=[('webhook', 'Webhook'), ('api', 'API')], max_length=10)),
+                ('payment_data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Payment intent statuses',
+                'ordering': ('-updated_at',),
+            },
+        ),
+    ]
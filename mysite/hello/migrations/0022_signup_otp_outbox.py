@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hello', '0021_payment_intent_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingsignup',
+            name='otp_email',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='hello.emailoutbox'),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='kind',
+            field=models.CharField(choices=[('receipt', 'E-receipt'), ('order_status', 'Order status update'), ('signup_otp', 'Signup verification code'), ('password_reset', 'Password reset link'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='emailoutbox',
+            index=models.Index(fields=['to_email', 'created_at'], name='hello_outbox_recipient_idx'),
+        ),
+    ]
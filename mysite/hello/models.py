@@ -1,9 +1,16 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 import random
 import json
+import math
+import time
 
 
 class Item(models.Model):
@@ -34,6 +41,12 @@ class PasswordResetToken(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     token = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # reset_password_confirm looks tokens up by value
+            models.Index(fields=["token"], name="hello_pwreset_token_idx"),
+        ]
     
     def __str__(self):
         return f"Password reset for {self.user.username}"
@@ -48,16 +61,36 @@ class PendingSignup(models.Model):
     otp_code = models.CharField(max_length=6)
     otp_expires_at = models.DateTimeField()
     otp_attempts = models.PositiveSmallIntegerField(default=0)
+    # Outbox row carrying the current code; its status is what the OTP page shows
+    otp_email = models.ForeignKey(
+        "EmailOutbox", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def is_otp_expired(self):
         return timezone.now() > self.otp_expires_at
 
+    def otp_resend_wait_seconds(self):
+        """Seconds until another code may be sent, or 0 if the last one can be replaced now.
+
+        A code whose email was dead-lettered can be replaced straight away.
+        """
+        email = self.otp_email
+        if email is None or email.status == email.STATUS_DEAD:
+            return 0
+        elapsed = (timezone.now() - email.created_at).total_seconds()
+        return max(0, math.ceil(settings.OTP_RESEND_WINDOW_SECONDS - elapsed))
+
     def __str__(self):
         return f"PendingSignup({self.email})"
 
 
+def next_stock_version():
+    """Stock versions are microsecond timestamps, so newer changes sort after older ones."""
+    return time.time_ns() // 1000
+
+
 class Product(models.Model):
     CATEGORY_CHOICES = [
         ('spud', 'Spud'),
@@ -77,15 +110,53 @@ class Product(models.Model):
     size_options = models.JSONField(default=dict, blank=True)
     show_in_all_menu = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
+    # Bumped whenever stock or visibility may have changed, for the admin stock poller
+    stock_version = models.BigIntegerField(default=next_stock_version)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("name",)
+        indexes = [
+            # Name fallback when api_create_order resolves cart items
+            models.Index(fields=["name"], name="hello_product_name_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.stock_version = next_stock_version()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "stock_version"}
+        super().save(*args, **kwargs)
+
+
+class OrderManager(models.Manager):
+    def transition(self, queryset, new_status):
+        """Move every order in ``queryset`` to ``new_status`` with one UPDATE.
+
+        The status's tracking timestamp is filled in where it is still empty
+        and the sales rollups follow orders in and out of cancelled. Orders
+        already in ``new_status`` are left alone; returns the number changed.
+        Raises ValueError for a status that isn't one of ORDER_STATUS_CHOICES.
+        """
+        from .utils import sales_rollup
+
+        if new_status not in Order.ORDER_STATUS_LABELS:
+            raise ValueError(f"Unknown order status: {new_status!r}")
+        now = timezone.now()
+        updates = {"status": new_status, "updated_at": now}
+        timestamp_field = Order.STATUS_TIMESTAMP_FIELDS.get(new_status)
+        if timestamp_field:
+            updates[timestamp_field] = Coalesce(timestamp_field, Value(now))
+
+        changing = queryset.exclude(status=new_status)
+        with transaction.atomic():
+            sales_rollup.apply_status_change(changing, new_status)
+            return changing.update(**updates)
+
 
 class Order(models.Model):
     ORDER_STATUS_CHOICES = [
@@ -110,6 +181,10 @@ class Order(models.Model):
         ('gcash', 'GCash'),
         ('bank', 'Bank Transfer')
     ]
+
+    # Built once instead of dict(...CHOICES) on every email
+    ORDER_STATUS_LABELS = dict(ORDER_STATUS_CHOICES)
+    ORDER_TYPE_LABELS = dict(ORDER_TYPE_CHOICES)
     
     order_id = models.CharField(max_length=50, unique=True)
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
@@ -128,46 +203,128 @@ class Order(models.Model):
     ready_at = models.DateTimeField(null=True, blank=True)
     picked_up_at = models.DateTimeField(null=True, blank=True)
 
+    # Tracking timestamp stamped the first time an order reaches each status
+    STATUS_TIMESTAMP_FIELDS = {
+        'preparing': 'preparing_at',
+        'ready_for_delivery': 'ready_at',
+        'ready_for_pickup': 'ready_at',
+        'delivered': 'picked_up_at',
+        'picked_up': 'picked_up_at',
+    }
+
+    # Status as last read from or written to the database (None for new orders)
+    _loaded_status = None
+
+    objects = OrderManager()
+
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # Cursor scans of the admin dashboard changes feed
+            models.Index(fields=["updated_at"], name="hello_order_updated_idx"),
+            models.Index(fields=["status"], name="hello_order_status_idx"),
+            # Date range scans in the reports and order history
+            models.Index(fields=["created_at"], name="hello_order_created_idx"),
+            # Newest non-cancelled orders (analytics, sales rollup rebuild)
+            models.Index(
+                fields=["-created_at"],
+                condition=~models.Q(status="cancelled"),
+                name="hello_order_active_created_idx",
+            ),
+            # A customer's latest order (redirect_to_order)
+            models.Index(fields=["user", "-created_at"], name="hello_order_user_created_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Order {self.order_id} - {self.customer_name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so save() can spot transitions without re-reading it
+        instance._loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or "status" in fields:
+            self._loaded_status = self.status
+
     def save(self, *args, **kwargs):
         # Generate order_id if not set
         if not self.order_id:
             self.order_id = 'MJ' + str(int(timezone.now().timestamp())) + str(random.randint(100, 999))
 
         # Auto-fill tracking timestamps when status changes
-        if self.pk:
-            try:
-                old_status = Order.objects.get(pk=self.pk).status
-                if old_status != self.status:
-                    if self.status == 'preparing' and not self.preparing_at:
-                        self.preparing_at = timezone.now()
-                    elif self.status in ['ready_for_delivery', 'ready_for_pickup'] and not self.ready_at:
-                        self.ready_at = timezone.now()
-                    elif self.status in ['delivered', 'picked_up'] and not self.picked_up_at:
-                        self.picked_up_at = timezone.now()
-            except Order.DoesNotExist:
-                pass
-
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        old_status = None
+        if not self._state.adding and (update_fields is None or "status" in update_fields):
+            old_status = self._loaded_status
+            if old_status is None:
+                # Status was deferred when this instance was loaded
+                old_status = Order.objects.filter(pk=self.pk).values_list("status", flat=True).first()
+            timestamp_field = self.STATUS_TIMESTAMP_FIELDS.get(self.status)
+            if old_status != self.status and timestamp_field and not getattr(self, timestamp_field):
+                setattr(self, timestamp_field, timezone.now())
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, timestamp_field}
+
+        cancelled_changed = old_status is not None and old_status != self.status and "cancelled" in (old_status, self.status)
+        if not cancelled_changed:
+            super().save(*args, **kwargs)
+        else:
+            # Cancelling drops the order from the sales rollups; reinstating adds it back
+            from .utils import sales_rollup
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                if self.status == "cancelled":
+                    sales_rollup.reverse_orders([self])
+                else:
+                    sales_rollup.record_orders([self])
+        self._loaded_status = self.status
 
 
 class OrderItem(models.Model):
-    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="order_items")
+    # Indexed through hello_orderitem_sales_idx, which leads with order
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="order_items", db_index=False)
     product_name = models.CharField(max_length=100)
     quantity = models.PositiveIntegerField()
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     size = models.CharField(max_length=10, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Product sales grouped by name and size for a set of orders
+            models.Index(fields=["order", "product_name", "size"], name="hello_orderitem_sales_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.product_name} x {self.quantity}"
 
 
+class DeletedOrderManager(models.Manager):
+    def record(self, order_ids):
+        """Leave a tombstone for each of ``order_ids`` with one INSERT; call in the deleting transaction."""
+        return self.bulk_create([self.model(order_id=order_id) for order_id in order_ids], batch_size=500)
+
+    def purge(self):
+        """Drop tombstones older than ORDER_CHANGES_TOMBSTONE_DAYS and return how many went."""
+        cutoff = timezone.now() - timedelta(days=settings.ORDER_CHANGES_TOMBSTONE_DAYS)
+        return self.filter(deleted_at__lt=cutoff).delete()[0]
+
+
+class DeletedOrder(models.Model):
+    """Tombstone for a deleted order, so the admin changes feed can drop it from open dashboards."""
+    order_id = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = DeletedOrderManager()
+
+    def __str__(self) -> str:
+        return f"Deleted order {self.order_id}"
+
+
 class SalesSummary(models.Model):
     PERIOD_DAY = "day"
     PERIOD_WEEK = "week"
@@ -183,6 +340,8 @@ class SalesSummary(models.Model):
     period_type = models.CharField(max_length=10, choices=PERIOD_CHOICES)
     period_start = models.DateField()
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    products_sold = models.IntegerField(default=0)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -193,7 +352,128 @@ class SalesSummary(models.Model):
         return f"{self.period_type.capitalize()} starting {self.period_start}: {self.total_amount}"
 
 
-# Remove the old sales summary maintenance code since we have a new Order model structure
+class ProductSalesSummary(models.Model):
+    """Per-product, per-size companion to SalesSummary for the product sales tables."""
+    period_type = models.CharField(max_length=10, choices=SalesSummary.PERIOD_CHOICES)
+    period_start = models.DateField()
+    product_name = models.CharField(max_length=100)
+    size = models.CharField(max_length=10, blank=True, default="")
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("period_type", "period_start", "product_name", "size")
+        ordering = ("-period_start", "product_name", "size")
+        verbose_name_plural = "Product sales summaries"
+
+    def __str__(self) -> str:
+        label = f"{self.product_name} ({self.size})" if self.size else self.product_name
+        return f"{label} - {self.period_type} starting {self.period_start}: {self.quantity}"
+
+
+# SalesSummary and ProductSalesSummary are maintained by hello.utils.sales_rollup
+
+
+class PaymentIntentStatus(models.Model):
+    """Last known status of a PayMongo payment intent.
+
+    Written by the PayMongo webhook (and by the status endpoint when it has
+    to ask PayMongo directly), so QR payment polling is answered locally.
+    """
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    # PayMongo will not move an intent out of these on its own
+    FINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+    SOURCE_WEBHOOK = "webhook"
+    SOURCE_API = "api"
+    SOURCE_CHOICES = (
+        (SOURCE_WEBHOOK, "Webhook"),
+        (SOURCE_API, "API"),
+    )
+
+    payment_intent_id = models.CharField(max_length=100, unique=True)
+    status = models.CharField(max_length=40)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    payment_data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("-updated_at",)
+        verbose_name_plural = "Payment intent statuses"
+
+    def __str__(self) -> str:
+        return f"{self.payment_intent_id}: {self.status}"
+
+    @property
+    def is_final(self):
+        return self.status in self.FINAL_STATUSES
+
+
+class EmailOutbox(models.Model):
+    """Outgoing email written in the same transaction as the change that triggered it.
+
+    The ``run_email_worker`` management command delivers pending rows in
+    batches, so request handlers never wait on the mail provider.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_DEAD, "Dead letter"),
+    )
+
+    KIND_RECEIPT = "receipt"
+    KIND_ORDER_STATUS = "order_status"
+    KIND_SIGNUP_OTP = "signup_otp"
+    KIND_PASSWORD_RESET = "password_reset"
+    KIND_OTHER = "other"
+    KIND_CHOICES = (
+        (KIND_RECEIPT, "E-receipt"),
+        (KIND_ORDER_STATUS, "Order status update"),
+        (KIND_SIGNUP_OTP, "Signup verification code"),
+        (KIND_PASSWORD_RESET, "Password reset link"),
+        (KIND_OTHER, "Other"),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_OTHER)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="outbox_emails")
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    first_attempt_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # Time spent in the provider call that succeeded, and from enqueue to delivery
+    send_duration_ms = models.PositiveIntegerField(null=True, blank=True)
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at",)
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="hello_outbox_due_idx"),
+            # request_password_reset checks for a link already queued to the address
+            models.Index(fields=["to_email", "created_at"], name="hello_outbox_recipient_idx"),
+        ]
+        verbose_name = "Email outbox message"
+        verbose_name_plural = "Email outbox"
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} to {self.to_email} ({self.status})"
 
 
 class FrontendContent(models.Model):
@@ -0,0 +1,34 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import evict_cached_user
+from .models import Order, Product
+from .utils import order_events
+from .utils.catalog import bump_catalog_version
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_catalog(sender, **kwargs):
+    """Any product change invalidates the cached public catalog."""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Order)
+def publish_order_status_change(sender, instance, created, **kwargs):
+    """Push status changes from any save() (views, admin form, shell) to open tracking streams."""
+    # Order.save() updates _loaded_status only after this signal has been sent
+    if not created and instance._loaded_status != instance.status:
+        order_events.publish_order_status(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the user cached for AuthenticationMiddleware (password, is_active, is_staff may have changed)."""
+    user_id = instance.pk
+    evict_cached_user(user_id)
+    # Again after commit, in case a concurrent request re-cached the old row meanwhile
+    transaction.on_commit(lambda: evict_cached_user(user_id))
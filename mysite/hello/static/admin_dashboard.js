@@ -748,6 +748,23 @@ function getOrderHistoryStatus(order) {
     return { text: 'Delivered', className: 'completed' };
 }
 
+async function loadMoreOrderHistory() {
+    if (!orderHistoryCursor) return;
+    try {
+        const page = await fetchOrdersPage({ status: FINISHED_ORDER_STATUSES, cursor: orderHistoryCursor });
+        orderHistoryCursor = page.next_cursor;
+        page.orders.map(toFrontendOrder).forEach(order => {
+            if (!activeOrders.some(existing => existing.id === order.id)) {
+                activeOrders.push(order);
+            }
+        });
+        renderOrderHistory();
+    } catch (error) {
+        console.error('Error loading more order history:', error);
+        showToast('Failed to load more orders', 'error');
+    }
+}
+
 function renderOrderHistory() {
     const container = document.getElementById('orderHistoryContainer');
     const countElement = document.getElementById('orderHistoryCount');
@@ -758,7 +775,7 @@ function renderOrderHistory() {
         .sort((a, b) => new Date(`${b.date} ${b.time}`) - new Date(`${a.date} ${a.time}`));
 
     if (countElement) {
-        countElement.textContent = `${historyOrders.length} Orders`;
+        countElement.textContent = `${historyOrders.length}${orderHistoryCursor ? '+' : ''} Orders`;
     }
 
     if (historyOrders.length === 0) {
@@ -826,7 +843,9 @@ function renderOrderHistory() {
                 </div>
             </div>
         `;
-    }).join('');
+    }).join('') + (orderHistoryCursor
+        ? '<button class="btn btn-secondary" style="align-self: center;" onclick="loadMoreOrderHistory()">Load more orders</button>'
+        : '');
 }
 
 async function loadUsers() {
@@ -1359,6 +1378,8 @@ let newOrdersCount = 0;
 let viewedOrderIds = new Set(); // Track viewed orders
 
 async function initializeOrders() {
+    // Take the changes-feed token first so nothing placed during the full load is missed
+    await pollForNewOrders();
     await loadOrdersFromBackend();
     
     // Load viewed orders from localStorage
@@ -1425,34 +1446,59 @@ function convertToPhilippineTime(dateString) {
     }
 }
 
+// Convert a backend order payload to the format used by the dashboard
+function toFrontendOrder(order) {
+    const phTime = convertToPhilippineTime(order.created_at);
+    return {
+        id: order.order_id,
+        customer: order.customer_name,
+        orderType: order.order_type,
+        paymentMethod: order.payment_method || 'Cash',
+        paymentReference: order.payment_reference || '',
+        paymentStatus: 'Paid',
+        total: order.total_amount,
+        status: order.status,
+        date: phTime.date,
+        time: phTime.time,
+        items: order.items || []
+    };
+}
+
+// Orders in progress are loaded in full; finished orders are paged into Order History
+const IN_PROGRESS_ORDER_STATUSES = 'order_placed,preparing,ready_for_delivery,out_for_delivery,ready_for_pickup';
+const FINISHED_ORDER_STATUSES = 'delivered,picked_up,cancelled';
+let orderHistoryCursor = null;
+
+async function fetchOrdersPage(params) {
+    const response = await fetch(`/api/orders/all/?${new URLSearchParams(params)}`, {
+        credentials: 'include'
+    });
+    if (!response.ok) {
+        throw new Error('Failed to load orders');
+    }
+    return response.json();
+}
+
 async function loadOrdersFromBackend() {
     try {
-        const response = await fetch('/api/orders/all/', {
-            credentials: 'include'
-        });
-        if (response.ok) {
-            const ordersData = await response.json();
-            
-            // Convert backend data to frontend format
-            activeOrders = ordersData.map(order => {
-                const phTime = convertToPhilippineTime(order.created_at);
-                return {
-                    id: order.order_id,
-                    customer: order.customer_name,
-                    orderType: order.order_type,
-                    paymentMethod: order.payment_method || 'Cash',
-                    paymentReference: order.payment_reference || '',
-                    paymentStatus: 'Paid',
-                    total: order.total_amount,
-                    status: order.status,
-                    date: phTime.date,
-                    time: phTime.time,
-                    items: order.items || []
-                };
-            });
-        } else {
-            throw new Error('Failed to load orders');
-        }
+        const ordersData = [];
+        let cursor = null;
+        do {
+            const params = { status: IN_PROGRESS_ORDER_STATUSES, limit: 200 };
+            if (cursor) {
+                params.cursor = cursor;
+            }
+            const page = await fetchOrdersPage(params);
+            ordersData.push(...page.orders);
+            cursor = page.next_cursor;
+        } while (cursor);
+
+        const history = await fetchOrdersPage({ status: FINISHED_ORDER_STATUSES });
+        ordersData.push(...history.orders);
+        orderHistoryCursor = history.next_cursor;
+        
+        // Convert backend data to frontend format
+        activeOrders = ordersData.map(toFrontendOrder);
     } catch (error) {
         console.error('Error loading orders from backend:', error);
         showToast('Failed to load orders from server', 'error');
@@ -2136,6 +2182,49 @@ let stockUpdateInterval = null;
 let reportPollInterval = null;
 let currentReportPeriod = null;
 
+// Only products whose stock changed since this version are downloaded
+let stockVersion = null;
+
+async function pollStockChanges() {
+    try {
+        const url = stockVersion
+            ? `/api/products/stock/?since=${encodeURIComponent(stockVersion)}`
+            : '/api/products/stock/';
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`${url} returned ${response.status}`);
+        }
+        const data = await response.json();
+        stockVersion = data.version;
+
+        let changed = false;
+        let unknownProduct = false;
+        Object.entries(data.products || {}).forEach(([id, info]) => {
+            const product = products.find(p => p.id === Number(id));
+            if (!product) {
+                unknownProduct = true;
+                return;
+            }
+            if (product.stock !== info.stock) {
+                product.stock = info.stock;
+                changed = true;
+            }
+            product.is_active = info.is_active;
+            product.show_in_all_menu = info.show_in_all_menu;
+        });
+
+        if (unknownProduct) {
+            // A product was added elsewhere; fetch the full list once
+            await initializeProducts();
+        } else if (changed) {
+            renderAllProductsByCategory();
+            updateOutOfStockBadge();
+        }
+    } catch (error) {
+        console.error('Error polling stock changes:', error);
+    }
+}
+
 function startStockPolling() {
     // Clear any existing interval
     if (stockUpdateInterval) {
@@ -2146,9 +2235,7 @@ function startStockPolling() {
     stockUpdateInterval = setInterval(async () => {
         const activePage = document.querySelector('.page.active');
         if (activePage && activePage.id === 'products') {
-            // Refresh products to get latest stock
-            await initializeProducts();
-            updateOutOfStockBadge(); // Update badge after refresh
+            await pollStockChanges();
         }
     }, 5000); // Poll every 5 seconds
 }
@@ -2161,51 +2248,77 @@ function stopStockPolling() {
 }
 
 // Poll for new orders
+// Only orders created, updated or deleted since the last poll are downloaded
+let orderChangesToken = null;
+
 async function pollForNewOrders() {
     try {
-        const response = await fetch('/api/orders/all/', {
+        const url = orderChangesToken
+            ? `/api/orders/changes/?since=${encodeURIComponent(orderChangesToken)}`
+            : '/api/orders/changes/';
+        const response = await fetch(url, {
             credentials: 'include'
         });
-        if (response.ok) {
-            const ordersData = await response.json();
-            
-            // Convert to frontend format
-            const currentOrderIds = new Set(ordersData.map(order => order.order_id));
-            
-            // Check for new orders (only if we have previous orders to compare)
-            if (lastOrderIds.size > 0) {
-                const newOrderIds = [...currentOrderIds].filter(id => !lastOrderIds.has(id));
-                
-                if (newOrderIds.length > 0) {
-                    // New orders detected!
-                    const newOrders = ordersData.filter(order => newOrderIds.includes(order.order_id));
-                    
-                    // Update new orders count (only count unviewed new orders)
-                    const unviewedNewOrders = newOrderIds.filter(id => !viewedOrderIds.has(id));
-                    newOrdersCount += unviewedNewOrders.length;
-                    updateNewOrderBadge();
-                    
-                    console.log(`New orders detected: ${newOrderIds.length}, Total new orders: ${newOrdersCount}`);
-                    
-                    // Update last known orders immediately (before reloading)
-                    lastOrderCount = ordersData.length;
-                    lastOrderIds = new Set(ordersData.map(order => order.order_id));
-                    
-                    // Reload orders to show new ones on orders/history pages
-                    const activePage = document.querySelector('.page.active');
-                    if (activePage && (activePage.id === 'orders' || activePage.id === 'dashboard')) {
-                        await loadOrdersFromBackend();
-                        renderActiveOrders();
-                        renderOrderHistory();
-                        updateOrderCount();
-                        updateAnalytics();
-                    }
-                }
-            } else {
-                // First time loading - just update the last known orders
-                lastOrderCount = ordersData.length;
-                lastOrderIds = new Set(ordersData.map(order => order.order_id));
+        if (!response.ok) return;
+
+        const changes = await response.json();
+        const isFirstPoll = orderChangesToken === null;
+        orderChangesToken = changes.token;
+        if (isFirstPoll) return;
+
+        // Merge changed orders into the list we already have (newest first)
+        let listChanged = false;
+        const newOrderIds = [];
+        (changes.deleted_ids || []).forEach(orderId => {
+            const index = activeOrders.findIndex(existing => existing.id === orderId);
+            if (index !== -1) {
+                activeOrders.splice(index, 1);
+                listChanged = true;
             }
+            lastOrderIds.delete(orderId);
+        });
+        (changes.orders || []).forEach(order => {
+            const updated = toFrontendOrder(order);
+            const index = activeOrders.findIndex(existing => existing.id === updated.id);
+            if (index === -1) {
+                activeOrders.unshift(updated);
+                listChanged = true;
+            } else if (activeOrders[index].status !== updated.status) {
+                activeOrders[index] = updated;
+                listChanged = true;
+            }
+            // Only orders placed since the last poll are new; an edit to an older order
+            // that isn't paged in is not. The id set stops overlap re-sends counting twice.
+            if (order.created && !lastOrderIds.has(updated.id)) {
+                newOrderIds.push(updated.id);
+            }
+            lastOrderIds.add(updated.id);
+        });
+        lastOrderCount = lastOrderIds.size;
+
+        if (newOrderIds.length > 0) {
+            // Update new orders count (only count unviewed new orders)
+            const unviewedNewOrders = newOrderIds.filter(id => !viewedOrderIds.has(id));
+            newOrdersCount += unviewedNewOrders.length;
+            updateNewOrderBadge();
+
+            console.log(`New orders detected: ${newOrderIds.length}, Total new orders: ${newOrdersCount}`);
+        }
+
+        // Refresh orders/history pages when something actually changed
+        const activePage = document.querySelector('.page.active');
+        if (listChanged && activePage && (activePage.id === 'orders' || activePage.id === 'dashboard')) {
+            renderActiveOrders();
+            renderOrderHistory();
+            updateOrderCount();
+            if (newOrderIds.length > 0) {
+                updateAnalytics();
+            }
+        }
+
+        // Catch up straight away if the server had more changes than fit in one page
+        if (changes.has_more) {
+            await pollForNewOrders();
         }
     } catch (error) {
         console.error('Error polling for new orders:', error);
@@ -1,3 +1,1547 @@
-from django.test import TestCase
+from calendar import monthrange
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import hashlib
+import hmac
+import io
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import views
+from .backends import CachedModelBackend
+from .logging import QueueingHandler, get_logger
+from .models import (
+    DeletedOrder, EmailOutbox, Order, OrderItem, PasswordResetToken, PaymentIntentStatus, PendingSignup, Product,
+    ProductSalesSummary, SalesSummary,
+)
+from .utils import (
+    catalog, delivery_quotes, email_dispatch, email_templates, integrations, outbox, payments, report_cache,
+    sales_rollup,
+)
+from .utils.email import SendResult
+from .views import _decode_changes_token, _encode_changes_token, _reserve_order_items
+
+
+# Keep the suite out of the dev server's mysite/.django_cache: caches live in memory and
+# metrics files and report locks go to a scratch directory. Enabled for the whole module
+# rather than per class because the metrics flush thread keeps writing between tests.
+LOCAL_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-sessions'},
+}
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='hello-tests-')
+override_settings(
+    CACHES=LOCAL_CACHES,
+    METRICS_DIR=os.path.join(TEST_DATA_DIR, 'metrics'),
+    REPORTS_CACHE_LOCK_DIR=os.path.join(TEST_DATA_DIR, 'locks'),
+).enable()
+
+
+class HotQueryIndexTests(TestCase):
+    """EXPLAIN the hot lookups and check each one is served by its index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        for i in range(20):
+            order = Order.objects.create(
+                order_id=f'MJINDEX{i:03d}',
+                user=cls.user if i % 2 else None,
+                customer_name=f'Customer {i}',
+                order_type='pickup',
+                total_amount=100,
+                status='cancelled' if i % 5 == 0 else 'order_placed',
+            )
+            OrderItem.objects.create(
+                order=order, product_name=f'Product {i % 3}', quantity=1,
+                unit_price=100, total_price=100, size='M',
+            )
+        PasswordResetToken.objects.create(user=cls.user, token='reset-token')
+        Product.objects.create(name='Product 0', price=100, stock_quantity=10)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # Tables this small are cheaper to scan; make the planner show index choices
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+        elif connection.vendor != 'sqlite':
+            self.skipTest(f'No EXPLAIN expectations for {connection.vendor}')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f'{index_name} not used:\n{plan}')
+
+    def test_active_orders_newest_first(self):
+        self.assertUsesIndex(
+            Order.objects.exclude(status='cancelled').order_by('-created_at')[:50],
+            'hello_order_active_created_idx',
+        )
+
+    def test_orders_by_status(self):
+        self.assertUsesIndex(Order.objects.filter(status='preparing'), 'hello_order_status_idx')
+
+    def test_orders_in_date_range(self):
+        now = timezone.now()
+        self.assertUsesIndex(
+            Order.objects.filter(created_at__gte=now - timedelta(days=7), created_at__lt=now),
+            'hello_order_created_idx',
+        )
+
+    def test_latest_order_for_user(self):
+        self.assertUsesIndex(
+            Order.objects.filter(user=self.user).order_by('-created_at')[:1],
+            'hello_order_user_created_idx',
+        )
+
+    def test_password_reset_token_lookup(self):
+        self.assertUsesIndex(PasswordResetToken.objects.filter(token='reset-token'), 'hello_pwreset_token_idx')
+
+    def test_product_name_lookup(self):
+        self.assertUsesIndex(Product.objects.filter(name__in=['Product 0', 'Product 1']), 'hello_product_name_idx')
+
+    def test_product_sales_for_orders(self):
+        order_ids = list(Order.objects.values_list('pk', flat=True)[:5])
+        self.assertUsesIndex(
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values('product_name', 'size')
+            .annotate(total_quantity=Sum('quantity')),
+            'hello_orderitem_sales_idx',
+        )
+
+
+class AnalyticsQueryBudgetTests(TestCase):
+    """api_get_analytics must not issue queries per order."""
+
+    # Session and user lookups, the rollup totals, recent orders and their items
+    QUERY_BUDGET = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        orders = []
+        for i in range(60):
+            order = Order.objects.create(
+                order_id=f'MJBUDGET{i:03d}',
+                customer_name=f'Customer {i}', order_type='pickup', total_amount=150,
+                status='cancelled' if i % 10 == 0 else 'order_placed',
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_name='Pancit', quantity=2, unit_price=50, total_price=100, size='M'),
+                OrderItem(order=order, product_name='Lumpia', quantity=1, unit_price=50, total_price=50),
+            ])
+            orders.append(order)
+        sales_rollup.record_orders([order for order in orders if order.status != 'cancelled'])
+
+    def test_query_budget(self):
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_get_analytics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(
+            len(queries), self.QUERY_BUDGET,
+            '\n'.join(query['sql'] for query in queries.captured_queries),
+        )
+
+        data = response.json()
+        self.assertEqual(len(data['order_stats']), 50)
+        self.assertEqual(data['order_stats'][0]['items_count'], 3)
+        self.assertEqual(len(data['order_stats'][0]['items']), 2)
+        self.assertEqual(data['order_count'], 54)
+        self.assertEqual(data['total_products_sold'], 54 * 3)
+        self.assertEqual(data['total_sales'], 54 * 150.0)
+
+
+@override_settings(AUTH_USER_CACHE_TIMEOUT=300)
+class CachedUserBackendTests(TestCase):
+    """Request users come from cache, but revoked staff access must not."""
+
+    def setUp(self):
+        self.backend = CachedModelBackend()
+
+    def test_customer_served_from_cache(self):
+        customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.backend.get_user(customer.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.backend.get_user(customer.pk), customer)
+
+    def test_customer_evicted_on_save(self):
+        customer = User.objects.create_user('customer', 'customer@example.com', 'pw')
+        self.backend.get_user(customer.pk)
+        customer.is_active = False
+        customer.save()
+        self.assertIsNone(self.backend.get_user(customer.pk))
+
+    def test_staff_demoted_by_bulk_update(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.assertTrue(self.backend.get_user(staff.pk).is_staff)
+        User.objects.filter(pk=staff.pk).update(is_staff=False)
+        self.assertFalse(self.backend.get_user(staff.pk).is_staff)
+
+    def test_staff_deactivated_by_bulk_update(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_superuser=True)
+        self.assertIsNotNone(self.backend.get_user(staff.pk))
+        User.objects.filter(pk=staff.pk).update(is_active=False)
+        self.assertIsNone(self.backend.get_user(staff.pk))
+
+
+class ReserveOrderItemsTests(TestCase):
+    """Stock reservation: one locked fetch in pk order, clamped decrements."""
+
+    def setUp(self):
+        self.order = Order.objects.create(
+            order_id='MJSTOCK0001', customer_name='Customer', order_type='pickup', total_amount=300,
+        )
+        self.products = [
+            Product.objects.create(name=f'Product {i}', price=100, stock_quantity=10) for i in range(3)
+        ]
+
+    def test_decrements_and_merges_lines_for_one_product(self):
+        first, second, _ = self.products
+        updated = _reserve_order_items(self.order, [
+            {'product_id': first.pk, 'name': first.name, 'quantity': 2},
+            {'name': first.name, 'quantity': 3},
+            {'product_id': str(second.pk), 'quantity': 1},
+        ])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.stock_quantity, 5)
+        self.assertEqual(second.stock_quantity, 9)
+        self.assertEqual(updated[first.pk]['stock'], 5)
+        self.assertEqual(self.order.order_items.count(), 3)
+        # Lines without a price take the product's
+        self.assertEqual(self.order.order_items.get(product_name=second.name).unit_price, 100)
+
+    def test_stock_is_clamped_at_zero(self):
+        product = self.products[0]
+        updated = _reserve_order_items(self.order, [{'product_id': product.pk, 'quantity': 25}])
+        product.refresh_from_db()
+        self.assertEqual(product.stock_quantity, 0)
+        self.assertEqual(updated[product.pk]['stock'], 0)
+
+    def test_unknown_product_keeps_line_without_reserving(self):
+        with self.assertLogs('hello.views', 'WARNING'):
+            updated = _reserve_order_items(self.order, [{'name': 'Off-menu special', 'quantity': 1, 'price': 50}])
+        self.assertEqual(updated, {})
+        self.assertEqual(self.order.order_items.get().product_name, 'Off-menu special')
+        self.assertEqual(
+            list(Product.objects.order_by('pk').values_list('stock_quantity', flat=True)), [10, 10, 10],
+        )
+
+    def test_products_locked_and_updated_in_pk_order(self):
+        items = [{'product_id': product.pk, 'quantity': 1} for product in reversed(self.products)]
+        with CaptureQueriesContext(connection) as queries:
+            _reserve_order_items(self.order, items)
+
+        product_selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "hello_product"' in query['sql']
+        ]
+        self.assertEqual(len(product_selects), 1)
+        self.assertIn('ORDER BY "hello_product"."id" ASC', product_selects[0])
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', product_selects[0])
+
+        updated_ids = [
+            int(re.search(r'WHERE "hello_product"."id" = (\d+)', query['sql']).group(1))
+            for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "hello_product"')
+        ]
+        self.assertEqual(updated_ids, sorted(product.pk for product in self.products))
+
+
+class FailingTransport:
+    """Mail transport stand-in whose every send fails."""
+
+    def send_messages(self, messages):
+        return [SendResult(ConnectionRefusedError('provider down'), 5) for _ in messages]
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    EMAIL_OUTBOX_MAX_ATTEMPTS=3,
+    EMAIL_OUTBOX_RETRY_BASE_SECONDS=10,
+    EMAIL_OUTBOX_RETRY_MAX_SECONDS=60,
+)
+class EmailOutboxDeliveryTests(TestCase):
+    """Outbox sends, retries with backoff, and dead-letters after the last attempt."""
+
+    def setUp(self):
+        self.entry = outbox.enqueue_email('customer@example.com', 'Your receipt', 'Thanks!')
+
+    def test_retry_delay_doubles_with_jitter_and_caps(self):
+        for attempts, full_delay in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+            for _ in range(20):
+                delay = outbox.retry_delay_seconds(attempts)
+                self.assertGreaterEqual(delay, full_delay / 2)
+                self.assertLessEqual(delay, full_delay)
+
+    def test_sent(self):
+        result = outbox.deliver_batch()
+        self.assertEqual(result, {'sent': 1, 'retried': 0, 'dead': 0})
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, EmailOutbox.STATUS_SENT)
+        self.assertEqual(self.entry.attempts, 1)
+        self.assertIsNone(self.entry.locked_at)
+        self.assertEqual([message.to for message in mail.outbox], [['customer@example.com']])
+
+    def test_failure_is_retried_later(self):
+        before = timezone.now()
+        result = outbox.deliver_batch(transport=FailingTransport())
+        self.assertEqual(result, {'sent': 0, 'retried': 1, 'dead': 0})
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, EmailOutbox.STATUS_PENDING)
+        self.assertIn('provider down', self.entry.last_error)
+        self.assertGreaterEqual(self.entry.next_attempt_at, before + timedelta(seconds=5))
+        # Not due yet, so the next batch leaves it alone
+        self.assertEqual(outbox.deliver_batch(transport=FailingTransport()), {'sent': 0, 'retried': 0, 'dead': 0})
+
+    def test_dead_lettered_after_max_attempts(self):
+        outcomes = []
+        for _ in range(3):
+            EmailOutbox.objects.filter(pk=self.entry.pk).update(next_attempt_at=timezone.now())
+            outcomes.append(outbox.deliver_batch(transport=FailingTransport()))
+        self.assertEqual([result['retried'] for result in outcomes], [1, 1, 0])
+        self.assertEqual(outcomes[-1]['dead'], 1)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.status, EmailOutbox.STATUS_DEAD)
+        self.assertEqual(self.entry.attempts, 3)
+        EmailOutbox.objects.filter(pk=self.entry.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.deliver_batch(transport=FailingTransport()), {'sent': 0, 'retried': 0, 'dead': 0})
+
+    @override_settings(EMAIL_OUTBOX_LOCK_TIMEOUT=300)
+    def test_stale_claim_is_picked_up_again(self):
+        EmailOutbox.objects.filter(pk=self.entry.pk).update(
+            status=EmailOutbox.STATUS_SENDING, locked_at=timezone.now() - timedelta(seconds=301), attempts=1,
+        )
+        self.assertEqual(outbox.deliver_batch()['sent'], 1)
+
+    def test_claim_taken_over_mid_batch_is_not_sent_twice(self):
+        second = outbox.enqueue_email('other@example.com', 'Your receipt', 'Thanks!')
+
+        class TakeOverTransport:
+            def send_messages(self, messages):
+                # Another worker re-claims the second row while the first is being sent
+                EmailOutbox.objects.filter(pk=second.pk).update(locked_at=timezone.now() + timedelta(seconds=1))
+                return [SendResult(None, 5) for _ in messages]
+
+        self.assertEqual(outbox.deliver_batch(transport=TakeOverTransport()), {'sent': 1, 'retried': 0, 'dead': 0})
+        second.refresh_from_db()
+        self.assertEqual(second.status, EmailOutbox.STATUS_SENDING)
+
+
+@override_settings(ORDER_CHANGES_OVERLAP_SECONDS=5, ORDER_CHANGES_PAGE_SIZE=2)
+class OrderChangesFeedTests(TestCase):
+    """The admin poller's delta feed: tokens, overlap window, tie-safe paging, tombstones."""
+
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.client.force_login(self.staff)
+        self.now = timezone.now()
+
+    def make_order(self, number, updated_at):
+        order = Order.objects.create(
+            order_id=f'MJFEED{number:03d}', customer_name='Customer', order_type='pickup', total_amount=100,
+        )
+        Order.objects.filter(pk=order.pk).update(updated_at=updated_at)
+        return order
+
+    def poll(self, since=None):
+        response = self.client.get(reverse('api_get_order_changes'), {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_poll_only_returns_a_token(self):
+        self.make_order(1, self.now)
+        data = self.poll()
+        self.assertEqual(data['orders'], [])
+        self.assertFalse(data['has_more'])
+        moment, pk = _decode_changes_token(data['token'])
+        self.assertIsNone(pk)
+        self.assertGreaterEqual(moment, self.now - timedelta(seconds=1))
+
+    def test_requires_staff_and_a_valid_token(self):
+        self.assertEqual(self.client.get(reverse('api_get_order_changes'), {'since': 'nope'}).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('api_get_order_changes')).status_code, 403)
+
+    def test_overlap_window_resends_recent_changes_only(self):
+        self.make_order(1, self.now - timedelta(seconds=10))
+        self.make_order(2, self.now - timedelta(seconds=3))
+        self.make_order(3, self.now + timedelta(seconds=1))
+        data = self.poll(_encode_changes_token(self.now))
+        self.assertEqual([order['order_id'] for order in data['orders']], ['MJFEED002', 'MJFEED003'])
+
+    def test_updates_to_older_orders_are_not_flagged_created(self):
+        old = self.make_order(1, self.now)
+        Order.objects.filter(pk=old.pk).update(created_at=self.now - timedelta(days=3))
+        self.make_order(2, self.now)
+        token = _encode_changes_token(self.now - timedelta(minutes=1))
+        flags = {order['order_id']: order['created'] for order in self.poll(token)['orders']}
+        self.assertEqual(flags, {'MJFEED001': False, 'MJFEED002': True})
+
+    def test_idle_poll_moves_token_to_poll_time(self):
+        since = self.now - timedelta(minutes=5)
+        data = self.poll(_encode_changes_token(since))
+        self.assertEqual(data['orders'], [])
+        self.assertGreater(_decode_changes_token(data['token'])[0], since)
+
+    def test_pages_through_rows_sharing_one_updated_at(self):
+        created = [self.make_order(number, self.now) for number in range(5)]
+        token = _encode_changes_token(self.now - timedelta(minutes=1))
+        seen = []
+        for _ in range(5):
+            data = self.poll(token)
+            seen.extend(order['order_id'] for order in data['orders'])
+            token = data['token']
+            if not data['has_more']:
+                break
+        else:
+            self.fail('changes feed kept reporting has_more')
+        self.assertEqual(sorted(seen), sorted(order.order_id for order in created))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_deleted_orders_are_reported(self):
+        self.make_order(1, self.now)
+        token = self.poll()['token']
+        self.client.post(reverse('api_delete_order', args=['MJFEED001']))
+        data = self.poll(token)
+        self.assertEqual(data['deleted_ids'], ['MJFEED001'])
+        self.assertEqual(data['orders'], [])
+
+    def test_delete_all_writes_tombstones_in_one_insert(self):
+        for number in range(5):
+            self.make_order(number, self.now)
+        token = self.poll()['token']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('api_delete_all_orders'))
+        inserts = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "hello_deletedorder"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(sorted(self.poll(token)['deleted_ids']), [f'MJFEED{number:03d}' for number in range(5)])
+
+    def test_purge_drops_only_old_tombstones(self):
+        DeletedOrder.objects.record(['MJOLD', 'MJNEW'])
+        DeletedOrder.objects.filter(order_id='MJOLD').update(deleted_at=self.now - timedelta(days=8))
+        with override_settings(ORDER_CHANGES_TOMBSTONE_DAYS=7):
+            self.assertEqual(DeletedOrder.objects.purge(), 1)
+        self.assertEqual(list(DeletedOrder.objects.values_list('order_id', flat=True)), ['MJNEW'])
+
+
+class SalesRollupParityTests(TestCase):
+    """Incremental rollup updates must always match a rebuild from the orders table."""
+
+    def setUp(self):
+        now = timezone.now()
+        self.orders = []
+        for i in range(12):
+            order = Order.objects.create(
+                order_id=f'MJROLL{i:03d}', customer_name='Customer', order_type='pickup', total_amount=100 + i,
+            )
+            # Spread over weeks, months and a year boundary
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=i * 23))
+            order.refresh_from_db()
+            OrderItem.objects.create(
+                order=order, product_name=f'Product {i % 3}', quantity=i % 4 + 1,
+                unit_price=10, total_price=10 * (i % 4 + 1), size=None if i % 2 else 'M',
+            )
+            self.orders.append(order)
+        sales_rollup.record_orders(Order.objects.prefetch_related('order_items'))
+
+    def snapshot(self):
+        return (
+            sorted(
+                SalesSummary.objects.filter(order_count__gt=0)
+                .values_list('period_type', 'period_start', 'total_amount', 'order_count', 'products_sold')
+            ),
+            sorted(
+                ProductSalesSummary.objects.filter(order_count__gt=0)
+                .values_list('period_type', 'period_start', 'product_name', 'size', 'quantity', 'revenue', 'order_count')
+            ),
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        sales_rollup.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_recorded_orders(self):
+        self.assertEqual(SalesSummary.objects.filter(period_type=SalesSummary.PERIOD_DAY).count(), 12)
+        self.assertMatchesRebuild()
+
+    def test_cancel_and_reinstate(self):
+        order = Order.objects.get(pk=self.orders[3].pk)
+        order.status = 'cancelled'
+        order.save()
+        self.assertMatchesRebuild()
+        order.status = 'preparing'
+        order.save()
+        self.assertMatchesRebuild()
+
+    def test_bulk_transition(self):
+        Order.objects.transition(Order.objects.filter(pk__in=[o.pk for o in self.orders[:5]]), 'cancelled')
+        self.assertMatchesRebuild()
+        Order.objects.transition(Order.objects.filter(pk__in=[o.pk for o in self.orders[:2]]), 'preparing')
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        order = self.orders[4]
+        sales_rollup.reverse_orders([order])
+        order.delete()
+        self.assertMatchesRebuild()
+
+    def test_rebuild_periods_after_an_edit(self):
+        edited = self.orders[5]
+        Order.objects.filter(pk=edited.pk).update(total_amount=999)
+        edited.order_items.all().delete()
+        sales_rollup.rebuild_periods([sales_rollup.order_day(edited)])
+        self.assertMatchesRebuild()
+
+    def test_rebuild_periods_updates_rows_in_place(self):
+        day = sales_rollup.order_day(self.orders[0])
+        starts = sales_rollup.period_starts(day)
+        before = {
+            period_type: SalesSummary.objects.get(period_type=period_type, period_start=period_start).pk
+            for period_type, period_start in starts.items()
+        }
+        Order.objects.filter(pk=self.orders[0].pk).update(status='cancelled')
+        sales_rollup.rebuild_periods([day])
+        # The day row goes with its only order; periods that still have sales keep their rows
+        after = {
+            period_type: SalesSummary.objects.filter(period_type=period_type, period_start=period_start)
+            .values_list('pk', flat=True).first()
+            for period_type, period_start in starts.items()
+        }
+        self.assertIsNone(after[SalesSummary.PERIOD_DAY])
+        self.assertIsNotNone(after[SalesSummary.PERIOD_YEAR])
+        for period_type, pk in after.items():
+            if pk is not None:
+                self.assertEqual(pk, before[period_type])
+        self.assertMatchesRebuild()
+
+    def test_delta_applied_when_a_row_is_deleted_before_the_lock(self):
+        order = Order.objects.create(
+            order_id='MJROLLNEW', customer_name='Customer', order_type='pickup', total_amount=50,
+        )
+        OrderItem.objects.create(order=order, product_name='Product 0', quantity=1, unit_price=50, total_price=50, size='M')
+        day_row = SalesSummary.objects.get(period_type=SalesSummary.PERIOD_DAY, period_start=sales_rollup.order_day(order))
+        lock_rows = sales_rollup._lock_rows
+        calls = []
+
+        def delete_then_lock(model, match):
+            # A rebuild emptying the period and deleting its row between our insert and lock
+            if not calls:
+                SalesSummary.objects.filter(pk=day_row.pk).delete()
+            calls.append(model)
+            return lock_rows(model, match)
+
+        with mock.patch.object(sales_rollup, '_lock_rows', delete_then_lock):
+            sales_rollup.record_orders(Order.objects.filter(pk=order.pk).prefetch_related('order_items'))
+        self.assertEqual(calls.count(SalesSummary), 2)
+        row = SalesSummary.objects.get(period_type=SalesSummary.PERIOD_DAY, period_start=day_row.period_start)
+        self.assertEqual((row.total_amount, row.order_count), (order.total_amount, 1))
+
+
+class OrderStatusTransitionTests(TestCase):
+    """Status changes stamp their tracking timestamp once and skip orders already there."""
+
+    def make_order(self, number, **fields):
+        return Order.objects.create(
+            order_id=f'MJSTATUS{number:03d}', customer_name='Customer', order_type='pickup', total_amount=100, **fields
+        )
+
+    def test_transition_stamps_missing_timestamps_only(self):
+        earlier = timezone.now() - timedelta(hours=1)
+        fresh = self.make_order(1)
+        stamped = self.make_order(2, preparing_at=earlier)
+        changed = Order.objects.transition(Order.objects.filter(pk__in=[fresh.pk, stamped.pk]), 'preparing')
+        self.assertEqual(changed, 2)
+        fresh.refresh_from_db()
+        stamped.refresh_from_db()
+        self.assertEqual(fresh.status, 'preparing')
+        self.assertIsNotNone(fresh.preparing_at)
+        self.assertEqual(stamped.preparing_at, earlier)
+
+    def test_transition_to_same_status_is_a_no_op(self):
+        order = self.make_order(1, status='preparing')
+        updated_at = Order.objects.get(pk=order.pk).updated_at
+        self.assertEqual(Order.objects.transition(Order.objects.filter(pk=order.pk), 'preparing'), 0)
+        order.refresh_from_db()
+        self.assertEqual(order.updated_at, updated_at)
+        self.assertIsNone(order.preparing_at)
+
+    def test_save_stamps_timestamp_without_rereading_status(self):
+        self.make_order(1)
+        order = Order.objects.get(order_id='MJSTATUS001')
+        order.status = 'ready_for_pickup'
+        with CaptureQueriesContext(connection) as queries:
+            order.save(update_fields=['status'])
+        # The old status comes from the loaded row, not a SELECT before the UPDATE
+        self.assertFalse(any('FROM "hello_order" ' in query['sql'] for query in queries.captured_queries))
+        order.refresh_from_db()
+        self.assertIsNotNone(order.ready_at)
+
+    def test_save_with_unchanged_status_keeps_timestamps_empty(self):
+        self.make_order(1, status='preparing')
+        order = Order.objects.get(order_id='MJSTATUS001')
+        order.customer_name = 'Renamed'
+        order.save()
+        order.refresh_from_db()
+        self.assertIsNone(order.preparing_at)
+
+    def test_transition_rejects_unknown_status(self):
+        order = self.make_order(1)
+        with self.assertRaises(ValueError):
+            Order.objects.transition(Order.objects.filter(pk=order.pk), 'completed')
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'order_placed')
+
+    def test_admin_actions_use_real_statuses(self):
+        pickup = self.make_order(1)
+        delivery = Order.objects.create(
+            order_id='MJSTATUS002', customer_name='Customer', order_type='delivery', total_amount=100,
+        )
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        changelist = reverse('admin:hello_order_changelist')
+        selected = [pickup.pk, delivery.pk]
+        self.client.post(changelist, {'action': 'mark_completed', '_selected_action': selected})
+        self.assertEqual(
+            dict(Order.objects.values_list('order_id', 'status')),
+            {'MJSTATUS001': 'picked_up', 'MJSTATUS002': 'delivered'},
+        )
+        self.client.post(changelist, {'action': 'mark_pending', '_selected_action': selected})
+        self.assertEqual(set(Order.objects.values_list('status', flat=True)), {'order_placed'})
+
+
+class OrdersCursorPaginationTests(TestCase):
+    """api_get_orders pages newest first by (created_at, order_id) without gaps or repeats."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True))
+        now = timezone.now()
+        for i in range(11):
+            order = Order.objects.create(
+                order_id=f'MJPAGE{i:03d}', customer_name='Customer', order_type='pickup' if i % 2 else 'delivery',
+                total_amount=100,
+            )
+            # Orders placed in the same instant (several share each created_at)
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=i // 4))
+            OrderItem.objects.create(
+                order=order, product_name='Pancit', quantity=1, unit_price=100, total_price=100,
+            )
+
+    def fetch_all(self, **params):
+        seen = []
+        cursor = None
+        for _ in range(20):
+            query = dict(params, limit=3, **({'cursor': cursor} if cursor else {}))
+            response = self.client.get(reverse('api_get_orders'), query)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen.extend(order['order_id'] for order in data['orders'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                return seen
+        self.fail('pagination never finished')
+
+    def test_pages_cover_every_order_once_in_order(self):
+        seen = self.fetch_all()
+        expected = list(Order.objects.order_by('-created_at', '-order_id').values_list('order_id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_filters_apply_across_pages(self):
+        seen = self.fetch_all(order_type='pickup')
+        self.assertEqual(sorted(seen), sorted(Order.objects.filter(order_type='pickup').values_list('order_id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_items_count_on_each_order(self):
+        response = self.client.get(reverse('api_get_orders'), {'limit': 2})
+        self.assertEqual([order['items_count'] for order in response.json()['orders']], [1, 1])
+
+    def test_rejects_bad_parameters(self):
+        for params in ({'limit': 0}, {'cursor': 'garbage'}, {'date_from': '2026-13-40'}):
+            self.assertEqual(self.client.get(reverse('api_get_orders'), params).status_code, 400, params)
+
+
+@override_settings(PAYMONGO_WEBHOOK_SECRET='whsk_test', PAYMONGO_MODE='test', PAYMONGO_WEBHOOK_TOLERANCE_SECONDS=300)
+class PaymongoWebhookTests(TestCase):
+    """Webhook signatures are checked, and a final intent status never moves back."""
+
+    def post_event(self, event_type='payment.paid', intent_id='pi_test', secret='whsk_test', timestamp=None):
+        body = json.dumps({'data': {'attributes': {
+            'type': event_type,
+            'data': {'attributes': {'payment_intent_id': intent_id}},
+        }}}).encode('utf-8')
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        signature = hmac.new(secret.encode('utf-8'), timestamp.encode('utf-8') + b'.' + body, hashlib.sha256).hexdigest()
+        return self.client.post(
+            reverse('api_paymongo_webhook'), body, content_type='application/json',
+            headers={'Paymongo-Signature': f't={timestamp},te={signature},li='},
+        )
+
+    def test_valid_signature_records_status(self):
+        response = self.post_event()
+        self.assertEqual(response.status_code, 200)
+        record = PaymentIntentStatus.objects.get(payment_intent_id='pi_test')
+        self.assertEqual(record.status, PaymentIntentStatus.STATUS_SUCCEEDED)
+        self.assertEqual(record.source, PaymentIntentStatus.SOURCE_WEBHOOK)
+
+    def test_rejects_wrong_secret_and_missing_header(self):
+        self.assertEqual(self.post_event(secret='whsk_other').status_code, 401)
+        response = self.client.post(reverse('api_paymongo_webhook'), b'{}', content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(PaymentIntentStatus.objects.exists())
+
+    def test_timestamp_tolerance(self):
+        self.assertEqual(self.post_event(timestamp=int(time.time()) - 250).status_code, 200)
+        self.assertEqual(self.post_event(intent_id='pi_old', timestamp=int(time.time()) - 400).status_code, 401)
+        self.assertFalse(PaymentIntentStatus.objects.filter(payment_intent_id='pi_old').exists())
+
+    def test_paid_intent_is_not_downgraded(self):
+        self.post_event('payment.paid')
+        self.assertEqual(self.post_event('payment.failed').status_code, 200)
+        payments.record_status('pi_test', 'awaiting_next_action', PaymentIntentStatus.SOURCE_API)
+        self.assertEqual(
+            PaymentIntentStatus.objects.get(payment_intent_id='pi_test').status,
+            PaymentIntentStatus.STATUS_SUCCEEDED,
+        )
+
+    def test_failed_intent_keeps_final_status_but_can_succeed(self):
+        self.post_event('payment.failed')
+        payments.record_status('pi_test', 'awaiting_payment_method', PaymentIntentStatus.SOURCE_API)
+        self.assertEqual(PaymentIntentStatus.objects.get(payment_intent_id='pi_test').status, PaymentIntentStatus.STATUS_FAILED)
+        self.post_event('payment.paid')
+        self.assertEqual(PaymentIntentStatus.objects.get(payment_intent_id='pi_test').status, PaymentIntentStatus.STATUS_SUCCEEDED)
+
+
+class SkippedStatusEmailTests(TestCase):
+    """Jumping an order over statuses sends one email listing each skipped step."""
+
+    def make_order(self, order_type, status='order_placed'):
+        order = Order.objects.create(
+            order_id=f'MJSKIP{order_type[:3].upper()}', customer_name='Customer', customer_email='customer@example.com',
+            order_type=order_type, total_amount=150, status=status,
+        )
+        OrderItem.objects.create(order=order, product_name='Pancit', quantity=2, unit_price=75, total_price=150, size='M')
+        return order
+
+    def update_status(self, order, status):
+        with self.assertLogs('hello.views', 'INFO'):
+            response = self.client.post(
+                reverse('api_update_order_status', args=[order.order_id]),
+                json.dumps({'status': status}), content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        return EmailOutbox.objects.filter(order=order, kind=EmailOutbox.KIND_ORDER_STATUS)
+
+    def test_skipped_statuses_by_order_type(self):
+        self.assertEqual(views._skipped_statuses('pickup', 'order_placed', 'picked_up'), ['preparing', 'ready_for_pickup'])
+        self.assertEqual(views._skipped_statuses('delivery', 'preparing', 'delivered'), ['ready_for_delivery', 'out_for_delivery'])
+        self.assertEqual(views._skipped_statuses('pickup', 'preparing', 'ready_for_pickup'), [])
+        self.assertEqual(views._skipped_statuses('dine-in', 'order_placed', 'picked_up'), [])
+
+    def test_jump_sends_one_email_with_timeline(self):
+        order = self.make_order('pickup')
+        emails = self.update_status(order, 'picked_up')
+        self.assertEqual(emails.count(), 1)
+        email = emails.get()
+        self.assertIn('Status: Picked Up', email.subject)
+        self.assertIn('Status Timeline:\n- Preparing Order\n- Ready for Pickup\n- Picked Up\n', email.body_text)
+        self.assertIn('Pancit x 2 (Size: M)', email.body_text)
+        self.assertIn('- Preparing Order<br>- Ready for Pickup<br>- Picked Up', email.body_html)
+        order.refresh_from_db()
+        self.assertIsNotNone(order.preparing_at)
+        self.assertIsNotNone(order.ready_at)
+        self.assertIsNotNone(order.picked_up_at)
+
+    def test_single_step_has_no_timeline(self):
+        order = self.make_order('delivery', status='preparing')
+        email = self.update_status(order, 'ready_for_delivery').get()
+        self.assertIn('Status: Ready for Delivery', email.subject)
+        self.assertNotIn('Status Timeline', email.body_text)
+
+    def test_timeline_keeps_existing_timestamps(self):
+        order = self.make_order('delivery', status='preparing')
+        earlier = timezone.now() - timedelta(hours=1)
+        Order.objects.filter(pk=order.pk).update(preparing_at=earlier)
+        email = self.update_status(order, 'delivered').get()
+        self.assertIn('- Ready for Delivery\n- Out for Delivery\n- Delivered', email.body_text)
+        order.refresh_from_db()
+        self.assertEqual(order.preparing_at, earlier)
+        self.assertIsNotNone(order.ready_at)
+
+
+@override_settings(OTP_RESEND_WINDOW_SECONDS=60, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SignupOtpResendTests(TestCase):
+    """Resends inside the window reuse the code on its way; the status endpoint is per-session."""
+
+    email = 'newcomer@gmail.com'
+
+    def sign_up(self, client=None):
+        return (client or self.client).post(reverse('signup'), json.dumps({
+            'first_name': 'New', 'last_name': 'Comer', 'username': 'newcomer', 'email': self.email,
+            'password1': 'Sup3r-secret!', 'password2': 'Sup3r-secret!', 'agreement': True,
+        }), content_type='application/json')
+
+    def resend(self):
+        return self.client.post(
+            reverse('verify_signup_otp'), json.dumps({'email': self.email, 'action': 'resend'}),
+            content_type='application/json',
+        )
+
+    def otp_emails(self):
+        return EmailOutbox.objects.filter(kind=EmailOutbox.KIND_SIGNUP_OTP, to_email=self.email)
+
+    def test_resend_inside_window_keeps_code(self):
+        self.assertEqual(self.sign_up().status_code, 200)
+        code = PendingSignup.objects.get(email=self.email).otp_code
+        data = self.resend().json()
+        self.assertTrue(data['success'])
+        self.assertGreater(data['resend_in'], 0)
+        self.assertEqual(self.otp_emails().count(), 1)
+        self.assertEqual(PendingSignup.objects.get(email=self.email).otp_code, code)
+
+    def test_signing_up_again_inside_window_keeps_code(self):
+        self.sign_up()
+        self.assertEqual(self.sign_up().status_code, 200)
+        self.assertEqual(self.otp_emails().count(), 1)
+
+    def test_resend_after_window_queues_new_code(self):
+        self.sign_up()
+        self.otp_emails().update(created_at=timezone.now() - timedelta(seconds=61))
+        data = self.resend().json()
+        self.assertEqual(data['resend_in'], 60)
+        self.assertEqual(self.otp_emails().count(), 2)
+        pending = PendingSignup.objects.select_related('otp_email').get(email=self.email)
+        self.assertEqual(pending.otp_email, self.otp_emails().latest('created_at'))
+        self.assertIn(pending.otp_code, pending.otp_email.body_text)
+
+    def test_dead_lettered_code_can_be_replaced_at_once(self):
+        self.sign_up()
+        self.otp_emails().update(status=EmailOutbox.STATUS_DEAD)
+        self.resend()
+        self.assertEqual(self.otp_emails().count(), 2)
+
+    def test_status_endpoint_reports_only_this_sessions_signup(self):
+        self.sign_up()
+        response = self.client.get(reverse('api_signup_otp_status'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['otp_status'], EmailOutbox.STATUS_PENDING)
+
+        stranger = Client()
+        self.assertEqual(stranger.get(reverse('api_signup_otp_status'), {'email': self.email}).status_code, 404)
+        self.assertEqual(stranger.get(reverse('api_signup_otp_status'), {'email': 'nobody@gmail.com'}).status_code, 404)
+
+
+@override_settings(REQUEST_TIMING_HEADER=True)
+class ServerTimingHeaderTests(TestCase):
+    """Only staff see the Server-Timing breakdown; slow requests are logged for everyone."""
+
+    def get(self):
+        return self.client.get(reverse('api_signup_otp_status'))
+
+    def test_anonymous_and_customers_get_no_header(self):
+        self.assertNotIn('Server-Timing', self.get())
+        self.client.force_login(User.objects.create_user('customer', 'customer@example.com', 'pw'))
+        self.assertNotIn('Server-Timing', self.get())
+
+    def test_staff_and_superusers_get_header(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        self.client.force_login(staff)
+        header = self.get()['Server-Timing']
+        self.assertRegex(header, r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", ext;dur=[\d.]+;desc="0 calls"$')
+
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        self.assertIn('Server-Timing', self.get())
+
+    def test_header_can_be_switched_off(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True))
+        with self.settings(REQUEST_TIMING_HEADER=False):
+            self.assertNotIn('Server-Timing', self.get())
+
+    def test_slow_request_is_logged_without_header(self):
+        with self.settings(REQUEST_SLOW_QUERIES=0), self.assertLogs('hello.requests', 'WARNING') as logs:
+            response = self.get()
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(logs.records[0].fields['view'], 'api_signup_otp_status')
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsEndpointTests(TestCase):
+    """/metrics is for staff and the scrape token, wherever the request appears to come from."""
+
+    def get(self, **headers):
+        return self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1', headers=headers)
+
+    def test_localhost_alone_is_not_enough(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(Authorization='Bearer wrong').status_code, 403)
+
+    def test_token_and_staff_are_allowed(self):
+        response = self.get(Authorization='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hello_email_outbox_oldest_pending_seconds', response.content.decode())
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True))
+        self.assertEqual(self.get().status_code, 200)
+
+    def test_unset_token_allows_staff_only(self):
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.get(Authorization='Bearer ').status_code, 403)
+
+    def test_oldest_pending_age(self):
+        self.assertEqual(outbox.oldest_pending_seconds(), 0)
+        for age in (30, 600):
+            EmailOutbox.objects.create(
+                to_email='customer@example.com', from_email='shop@example.com', subject='s', body_text='b',
+            )
+            EmailOutbox.objects.filter(pk=EmailOutbox.objects.latest('pk').pk).update(
+                created_at=timezone.now() - timedelta(seconds=age),
+            )
+        EmailOutbox.objects.create(
+            to_email='customer@example.com', from_email='shop@example.com', subject='s', body_text='b',
+            status=EmailOutbox.STATUS_SENT,
+        )
+        EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).update(created_at=timezone.now() - timedelta(days=1))
+        with self.assertNumQueries(1):
+            self.assertAlmostEqual(outbox.oldest_pending_seconds(), 600, delta=2)
+
+
+class EmailTemplateOutputTests(TestCase):
+    """The compiled layouts reproduce the old f-string emails byte for byte, and escape HTML."""
+
+    RECEIPT = {
+        'order_id': 'MJ20261018001', 'customer_name': 'Maria Santos', 'order_type': 'Delivery',
+        'payment_method': 'GCash', 'total_amount': '1234.50',
+        'items': ['- Pancit Bihon x 2 (Size: L) - Php 900.00', '- Turon x 3 - Php 334.50'],
+    }
+    STATUS = {
+        'order_id': 'MJ20261018001', 'customer_name': 'Maria Santos', 'order_type': 'Delivery',
+        'status': 'Out for Delivery', 'total_amount': '1234.50',
+        'items': ['- Pancit Bihon x 2 (Size: L) - ₱900.00', '- Turon x 3 - ₱334.50'],
+    }
+
+    def expected(self, name):
+        # Captured from the f-string builders the registry replaced
+        directory = os.path.join(os.path.dirname(__file__), 'testdata', 'emails')
+        parts = []
+        for extension in ('txt', 'html'):
+            with open(os.path.join(directory, f'{name}.{extension}'), encoding='utf-8', newline='') as handle:
+                parts.append(handle.read())
+        return parts
+
+    def assertRendersAsBefore(self, name, subject, **context):
+        email = email_templates.render(name, **context)
+        text, html = self.expected(name)
+        self.assertEqual(email.subject, subject)
+        self.assertEqual(email.text, text)
+        self.assertEqual(email.html, html)
+
+    def test_order_receipt(self):
+        self.assertRendersAsBefore('order_receipt', '[E-RECEIPT] Order MJ20261018001 - Mother Julie', **self.RECEIPT)
+
+    def test_order_status(self):
+        self.assertRendersAsBefore(
+            'order_status', '[ORDER UPDATE] Order MJ20261018001 - Status: Out for Delivery', **self.STATUS
+        )
+
+    def test_password_reset(self):
+        self.assertRendersAsBefore(
+            'password_reset', 'Reset Your Password - Mother Julie',
+            reset_url='https://example.com/reset-password/abc123/',
+        )
+
+    def test_signup_otp(self):
+        self.assertRendersAsBefore('signup_otp', 'Mother Julie account verification code', otp_code='042137')
+
+    def test_user_fields_are_escaped_in_html_only(self):
+        email = email_templates.render(
+            'order_status', **dict(self.STATUS, customer_name='<b>Tom</b> & "Jerry"', items=['- <i>Turon</i> x 1']),
+        )
+        self.assertIn('<p>Dear &lt;b&gt;Tom&lt;/b&gt; &amp; "Jerry",</p>', email.html)
+        self.assertIn('- &lt;i&gt;Turon&lt;/i&gt; x 1', email.html)
+        self.assertNotIn('<b>Tom</b>', email.html)
+        self.assertIn('Dear <b>Tom</b> & "Jerry",', email.text)
+
+    def test_attribute_slots_escape_quotes(self):
+        url = 'https://example.com/reset/"><script>x</script>'
+        email = email_templates.render('password_reset', reset_url=url)
+        self.assertIn('href="https://example.com/reset/&quot;&gt;&lt;script&gt;x&lt;/script&gt;"', email.html)
+        self.assertNotIn('<script>', email.html)
+        self.assertEqual(email.text, f'Reset your password here: {url}')
+
+
+@override_settings(ORDER_EVENTS_POLL_INTERVAL=0.01, ORDER_EVENTS_HEARTBEAT_INTERVAL=60, ORDER_EVENTS_STREAM_TIMEOUT=2)
+class OrderEventStreamTests(TestCase):
+    """Tracking pages get status changes over SSE, with the JSON status endpoint as fallback."""
+
+    def setUp(self):
+        cache.clear()
+        self.order = Order.objects.create(
+            order_id='MJSSE001', customer_name='Customer', order_type='pickup', total_amount=100,
+        )
+
+    def open_stream(self, **headers):
+        response = self.client.get(reverse('api_order_events', args=[self.order.order_id]), headers=headers)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return iter(response.streaming_content)
+
+    def read_event(self, stream):
+        message = next(stream).decode()
+        data = next(line for line in message.splitlines() if line.startswith('data: '))
+        return json.loads(data[len('data: '):])
+
+    def set_status(self, status):
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = status
+        # The post_save publisher waits for the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    def test_stream_pushes_status_changes_until_terminal(self):
+        stream = self.open_stream()
+        self.assertTrue(next(stream).startswith(b'retry: '))
+        self.assertEqual(self.read_event(stream)['status'], 'order_placed')
+        self.set_status('ready_for_pickup')
+        self.assertEqual(self.read_event(stream)['status'], 'ready_for_pickup')
+        self.set_status('picked_up')
+        self.assertEqual(self.read_event(stream)['status'], 'picked_up')
+        self.assertEqual(list(stream), [])
+
+    def test_reconnect_skips_the_event_already_seen(self):
+        stream = self.open_stream()
+        next(stream)
+        event_id = next(stream).decode().splitlines()[0][len('id: '):]
+        stream = self.open_stream(**{'Last-Event-ID': event_id})
+        next(stream)
+        self.set_status('preparing')
+        self.assertEqual(self.read_event(stream)['status'], 'preparing')
+
+    def test_write_that_skipped_save_is_picked_up_on_connect(self):
+        self.open_stream()
+        Order.objects.filter(pk=self.order.pk).update(status='preparing', updated_at=timezone.now())
+        stream = self.open_stream()
+        next(stream)
+        self.assertEqual(self.read_event(stream)['status'], 'preparing')
+
+    def test_fallback_endpoint_matches_stream_payload(self):
+        stream = self.open_stream()
+        next(stream)
+        streamed = self.read_event(stream)
+        response = self.client.get(reverse('api_get_order_status', args=[self.order.order_id]))
+        self.assertEqual(response.json(), streamed)
+        self.assertEqual(self.client.get(reverse('api_order_events', args=['MJMISSING'])).status_code, 404)
+
+
+class MonthlyReportSeriesTests(TestCase):
+    """The monthly report's daily series equals the old one-aggregate-per-day sums."""
+
+    @classmethod
+    def setUpTestData(cls):
+        local = timezone.get_current_timezone()
+        placed = [
+            (datetime(2026, 3, 1, 0, 5), 120),    # just after local midnight
+            (datetime(2026, 3, 1, 23, 50), 80),
+            (datetime(2026, 3, 14, 12, 0), 450),
+            (datetime(2026, 3, 31, 23, 59), 60),
+            (datetime(2026, 2, 28, 23, 55), 999),  # previous month
+            (datetime(2026, 4, 1, 0, 1), 999),     # next month
+        ]
+        for number, (moment, amount) in enumerate(placed):
+            order = Order.objects.create(
+                order_id=f'MJMONTH{number:03d}', customer_name='Customer', order_type='pickup', total_amount=amount,
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=moment.replace(tzinfo=local))
+        cancelled = Order.objects.create(
+            order_id='MJMONTHX', customer_name='Customer', order_type='pickup', total_amount=500, status='cancelled',
+        )
+        Order.objects.filter(pk=cancelled.pk).update(created_at=datetime(2026, 3, 14, 9, 0, tzinfo=local))
+        sales_rollup.rebuild()
+        cls.admin = User.objects.create_superuser('root', 'root@example.com', 'pw')
+
+    def per_day_sums(self, year, month):
+        # What the endpoint used to run: one aggregate per day of the month
+        sums = {}
+        for day in range(1, monthrange(year, month)[1] + 1):
+            start = timezone.make_aware(datetime(year, month, day))
+            total = (
+                Order.objects.exclude(status='cancelled')
+                .filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+                .aggregate(total=Sum('total_amount'))['total']
+            )
+            sums[str(day)] = float(total or 0)
+        return sums
+
+    def test_daily_series_matches_per_day_sums(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('api_get_monthly_reports_specific', args=[2026, 3]))
+        data = response.json()
+        self.assertEqual(data['daily_sales'], self.per_day_sums(2026, 3))
+        self.assertEqual(data['daily_sales']['1'], 200.0)
+        self.assertEqual(data['total_sales'], 710.0)
+        self.assertEqual((data['highest_sales_day'], data['highest_sales_amount']), (14, 450.0))
+        self.assertEqual(
+            [(entry['year'], entry['month']) for entry in data['available_months']],
+            [(2026, 4), (2026, 3), (2026, 2)],
+        )
+
+    def test_query_count_does_not_grow_with_days(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('api_get_monthly_reports_specific', args=[2026, 3]))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('api_get_monthly_reports_specific', args=[2026, 3]))
+        report_queries = [q for q in queries.captured_queries if 'hello_salessummary' in q['sql']]
+        self.assertEqual(len(report_queries), 2)
+
+
+class PublicCatalogCacheTests(TestCase):
+    """The public menu is served per catalog version with an ETag, and stock changes invalidate it."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._public_catalogs.clear()
+        self.product = Product.objects.create(name='Pancit', price=100, stock_quantity=10, show_in_all_menu=True)
+
+    def get(self, etag=None):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(reverse('api_get_products_public'), headers=headers)
+
+    def product_queries(self, etag=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(etag)
+        return response, [q for q in queries.captured_queries if 'hello_product' in q['sql']]
+
+    def test_etag_answers_304_without_touching_products(self):
+        first = self.get()
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.content)[0]['stock'], 10)
+        for etag in (first['ETag'], 'W/' + first['ETag'], f'"stale", {first["ETag"]}'):
+            response, queries = self.product_queries(etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], first['ETag'])
+            self.assertEqual(queries, [])
+
+    def test_unchanged_catalog_is_served_from_memory(self):
+        self.get()
+        response, queries = self.product_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_product_save_invalidates(self):
+        etag = self.get()['ETag']
+        self.product.stock_quantity = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)[0]['stock'], 4)
+
+    def test_stock_reservation_invalidates(self):
+        etag = self.get()['ETag']
+        order = Order.objects.create(order_id='MJCAT001', customer_name='Customer', order_type='pickup', total_amount=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            _reserve_order_items(order, [{'product_id': self.product.pk, 'quantity': 3}])
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)[0]['stock'], 7)
+
+
+@override_settings(STOCK_CHANGES_OVERLAP_SECONDS=5, PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StockChangesFeedTests(TestCase):
+    """The admin stock poller only downloads products changed since its version token."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True))
+        self.products = [Product.objects.create(name=f'Product {i}', price=100, stock_quantity=10) for i in range(3)]
+
+    def poll(self, since=None):
+        response = self.client.get(reverse('api_get_stock_changes'), {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_poll_returns_every_product(self):
+        data = self.poll()
+        self.assertEqual(set(data['products']), {str(product.pk) for product in self.products})
+        self.assertGreaterEqual(int(data['version']), max(product.stock_version for product in self.products))
+
+    def test_only_changed_products_since_token(self):
+        version = int(self.poll()['version'])
+        # Everything so far is older than the overlap window
+        Product.objects.update(stock_version=version - 10_000_000)
+        changed = self.products[1]
+        changed.stock_quantity = 3
+        changed.save()
+        data = self.poll(version)
+        self.assertEqual(data['products'], {str(changed.pk): {'stock': 3, 'is_active': True, 'show_in_all_menu': True}})
+        self.assertGreater(int(data['version']), version)
+
+    def test_overlap_resends_recent_changes(self):
+        version = int(self.poll()['version'])
+        Product.objects.filter(pk=self.products[0].pk).update(stock_version=version - 2_000_000)
+        Product.objects.exclude(pk=self.products[0].pk).update(stock_version=version - 10_000_000)
+        self.assertEqual(list(self.poll(version)['products']), [str(self.products[0].pk)])
+
+    def test_rejects_bad_token_and_customers(self):
+        self.assertEqual(self.client.get(reverse('api_get_stock_changes'), {'since': 'abc'}).status_code, 400)
+        self.client.force_login(User.objects.create_user('customer', 'customer@example.com', 'pw'))
+        self.assertEqual(self.client.get(reverse('api_get_stock_changes')).status_code, 403)
+
+
+class ReportCacheTests(TestCase):
+    """Reports are computed once per window and stamp, and concurrent misses coalesce."""
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        return {'total': self.computed}
+
+    def test_hit_after_miss(self):
+        self.assertEqual(report_cache.get_or_compute('weekly', self.today, self.compute), ({'total': 1}, False))
+        self.assertEqual(report_cache.get_or_compute('weekly', self.today, self.compute), ({'total': 1}, True))
+        # Each period has its own entry
+        self.assertEqual(report_cache.get_or_compute('daily', self.today, self.compute), ({'total': 2}, False))
+
+    def test_invalidated_day_recomputes_covering_windows(self):
+        for period in ('daily', 'monthly'):
+            report_cache.get_or_compute(period, self.today, self.compute)
+        report_cache.invalidate_days([self.today - timedelta(days=3)])
+        self.assertTrue(report_cache.get_or_compute('daily', self.today, self.compute)[1])
+        self.assertFalse(report_cache.get_or_compute('monthly', self.today, self.compute)[1])
+
+    def test_missing_stamp_is_a_miss(self):
+        report_cache.get_or_compute('weekly', self.today, self.compute)
+        start_day, _ = report_cache.report_window('weekly', self.today)
+        _, stamp_key, _ = report_cache._keys('weekly', start_day)
+        cache.delete(stamp_key)
+        self.assertEqual(report_cache.get_or_compute('weekly', self.today, self.compute), ({'total': 2}, False))
+
+    @override_settings(
+        CACHES=dict(LOCAL_CACHES, default={
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(TEST_DATA_DIR, 'reports-cache'),
+        }),
+        REPORTS_CACHE_WAIT_INTERVAL=0.01,
+    )
+    def test_lock_taken_after_another_worker_finished_is_a_hit(self):
+        real_lock = report_cache._compute_lock
+        start_day, _ = report_cache.report_window('weekly', self.today)
+        data_key, stamp_key, _ = report_cache._keys('weekly', start_day)
+
+        @contextmanager
+        def lock_after_other_worker(lock_key):
+            # Another request computes and releases between our lookup and our lock
+            cache.set(stamp_key, 1)
+            cache.set(data_key, {'stamp': 1, 'data': self.compute()})
+            with real_lock(lock_key) as acquired:
+                yield acquired
+
+        with mock.patch.object(report_cache, '_compute_lock', lock_after_other_worker):
+            result = report_cache.get_or_compute('weekly', self.today, self.compute)
+        self.assertEqual(result, ({'total': 1}, True))
+        self.assertEqual(self.computed, 1)
+
+    def test_concurrent_misses_compute_once_under_flock(self):
+        cache.clear()
+        started = threading.Barrier(6)
+        results = []
+
+        def slow_compute():
+            self.computed += 1
+            time.sleep(0.3)
+            return {'total': 42}
+
+        def request():
+            started.wait()
+            results.append(report_cache.get_or_compute('monthly', self.today, slow_compute))
+
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.computed, 1)
+        self.assertEqual(sorted(hit for _, hit in results), [False] + [True] * 5)
+        self.assertTrue(all(data == {'total': 42} for data, _ in results))
+
+
+class FakeResponse:
+    """Just enough of a requests.Response for the integration call sites."""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+        self.content = json.dumps(data).encode('utf-8')
+
+    def json(self):
+        return self._data
+
+
+@override_settings(LALAMOVE_API_KEY='pk_test', LALAMOVE_API_SECRET='sk_test', DELIVERY_QUOTE_GEOHASH_PRECISION=8)
+class DeliveryQuoteCacheTests(TestCase):
+    """Customers in the same geohash cells share a quoted fee, never the quotation itself."""
+
+    ORIGIN = {'lat': 14.5995, 'lng': 120.9842}
+
+    def setUp(self):
+        cache.clear()
+
+    def quote(self, destination):
+        response = self.client.post(
+            reverse('api_calculate_delivery_fee'),
+            json.dumps({'origin': self.ORIGIN, 'destination': destination}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_nearby_customer_gets_fee_only(self):
+        first_address, neighbour = {'lat': 14.6090, 'lng': 121.0222}, {'lat': 14.60905, 'lng': 121.02225}
+        quotation = {'totalFee': 185, 'quotationId': 'QUOTE-FOR-FIRST-CUSTOMER'}
+        with mock.patch.object(views.integrations, 'request', return_value=FakeResponse(201, quotation)) as request:
+            first = self.quote(first_address)
+            second = self.quote(neighbour)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual((first['deliveryFee'], first['cached']), (185.0, False))
+        self.assertEqual(first['raw']['quotationId'], 'QUOTE-FOR-FIRST-CUSTOMER')
+        self.assertEqual((second['deliveryFee'], second['cached'], second['estimate']), (185.0, True, True))
+        self.assertNotIn('raw', second)
+        self.assertNotIn('QUOTE-FOR-FIRST-CUSTOMER', json.dumps(second))
+
+        cached = cache.get(delivery_quotes.quote_cache_key(self.ORIGIN, first_address, 'MOTORCYCLE'))
+        self.assertEqual(set(cached), {'deliveryFee', 'distanceKm'})
+
+    def test_other_cell_asks_lalamove_again(self):
+        with mock.patch.object(views.integrations, 'request') as request:
+            request.return_value = FakeResponse(201, {'totalFee': 185})
+            self.quote({'lat': 14.6091, 'lng': 121.0223})
+            request.return_value = FakeResponse(201, {'totalFee': 240})
+            far = self.quote({'lat': 14.6500, 'lng': 121.0500})
+        self.assertEqual(request.call_count, 2)
+        self.assertEqual((far['deliveryFee'], far['cached']), (240.0, False))
+
+    def test_fallback_fee_is_not_cached(self):
+        with mock.patch.object(views.integrations, 'request', return_value=FakeResponse(500, {'message': 'down'})) as request:
+            self.assertEqual(self.quote({'lat': 14.6091, 'lng': 121.0223})['source'], 'local_fallback')
+            self.quote({'lat': 14.6091, 'lng': 121.0223})
+        self.assertEqual(request.call_count, 2)
+
+
+@override_settings(INTEGRATION_BREAKER_THRESHOLD=3, INTEGRATION_BREAKER_COOLDOWN=30)
+class CircuitBreakerTests(TestCase):
+    """A failing provider is cut off after the threshold and retried with one trial call."""
+
+    def setUp(self):
+        self.session = mock.Mock()
+        patches = [
+            mock.patch.dict(integrations._breakers, {integrations.LALAMOVE: integrations.CircuitBreaker()}),
+            mock.patch.object(integrations, 'get_session', return_value=self.session),
+            mock.patch.object(integrations, '_record'),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.breaker = integrations._breakers[integrations.LALAMOVE]
+
+    def elapse(self, seconds):
+        # Age the breaker's timestamps rather than patching the clock every thread shares
+        if self.breaker.opened_at is not None:
+            self.breaker.opened_at -= seconds
+        if self.breaker.trial_started_at is not None:
+            self.breaker.trial_started_at -= seconds
+
+    def call(self):
+        return integrations.request(integrations.LALAMOVE, 'POST', 'https://lalamove.test/quotations')
+
+    def fail(self, times):
+        self.session.request.return_value = FakeResponse(503, {})
+        for _ in range(times):
+            self.call()
+
+    def test_opens_after_threshold_failures(self):
+        self.fail(2)
+        self.assertEqual(self.breaker.state, 'closed')
+        self.fail(1)
+        self.assertEqual(self.breaker.state, 'open')
+
+        with self.assertRaises(integrations.IntegrationUnavailable) as raised:
+            self.call()
+        self.assertAlmostEqual(raised.exception.retry_after, 30, delta=1)
+        self.assertEqual(self.session.request.call_count, 3)
+
+    def test_connection_errors_count_as_failures(self):
+        self.session.request.side_effect = integrations.requests.ConnectionError('refused')
+        for _ in range(3):
+            with self.assertRaises(integrations.requests.ConnectionError):
+                self.call()
+        self.assertEqual(self.breaker.state, 'open')
+
+    def test_success_resets_the_failure_count(self):
+        self.fail(2)
+        self.session.request.return_value = FakeResponse(200, {})
+        self.call()
+        self.fail(2)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_lets_one_trial_through_and_closes_on_success(self):
+        self.fail(3)
+        self.elapse(30)
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertIsNone(self.breaker.before_call())
+        # A second caller is refused while the trial is in flight
+        self.assertIsNotNone(self.breaker.before_call())
+        self.breaker.record_success()
+
+        self.session.request.return_value = FakeResponse(200, {})
+        self.assertEqual(self.call().status_code, 200)
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_failed_trial_reopens_for_another_cooldown(self):
+        self.fail(3)
+        self.elapse(30)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, 'open')
+        self.elapse(29)
+        with self.assertRaises(integrations.IntegrationUnavailable):
+            self.call()
+        self.elapse(1)
+        self.assertEqual(self.breaker.state, 'half_open')
+        self.assertEqual(self.session.request.call_count, 4)
+
+
+class BoundedExecutorTests(TestCase):
+    """The dispatch pool runs a fixed number of tasks, queues a few more and rejects the rest."""
+
+    def setUp(self):
+        self.pool = email_dispatch.BoundedExecutor(max_workers=1, max_queue=1, name='tests-pool')
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.ran = []
+        self.addCleanup(self.release.set)
+
+    def blocking_task(self, label):
+        self.started.set()
+        self.release.wait(5)
+        self.ran.append(label)
+
+    def test_queues_then_rejects_when_full(self):
+        self.assertTrue(self.pool.submit(self.blocking_task, 'running'))
+        self.assertTrue(self.started.wait(5))
+        self.assertTrue(self.pool.submit(self.ran.append, 'queued'))
+        self.assertFalse(self.pool.submit(self.ran.append, 'rejected'))
+        self.assertEqual(self.pool.stats()['in_flight'], 1)
+        self.assertEqual(self.pool.stats()['queued'], 1)
+
+        self.release.set()
+        self.assertTrue(self.pool.drain(5))
+        self.assertEqual(self.ran, ['running', 'queued'])
+        stats = self.pool.stats()
+        self.assertEqual((stats['completed'], stats['rejected'], stats['in_flight'], stats['queued']), (2, 1, 0, 0))
+
+    def test_drain_waits_for_accepted_work_and_stops_new_work(self):
+        self.pool.submit(self.blocking_task, 'running')
+        self.assertTrue(self.started.wait(5))
+        threading.Timer(0.1, self.release.set).start()
+        self.assertTrue(self.pool.drain(5))
+        self.assertEqual(self.ran, ['running'])
+        self.assertFalse(self.pool.submit(self.ran.append, 'late'))
+        self.assertEqual(self.pool.stats()['rejected'], 1)
+
+    def test_drain_gives_up_after_timeout(self):
+        self.pool.submit(self.blocking_task, 'running')
+        self.assertTrue(self.started.wait(5))
+        self.assertFalse(self.pool.drain(0.05))
+
+    def test_failing_task_is_counted_and_logged(self):
+        def broken():
+            raise RuntimeError('smtp down')
+
+        with self.assertLogs('hello.utils.email_dispatch', 'ERROR') as logs:
+            self.pool.submit(broken)
+            self.assertTrue(self.pool.drain(5))
+        self.assertEqual(logs.records[0].fields['pool'], 'tests-pool')
+        self.assertEqual(self.pool.stats()['failed'], 1)
+
+
+class StalledStream:
+    """A stdout whose writes hang until released, like a full pipe."""
+
+    def __init__(self):
+        self.writing = threading.Event()
+        self.release = threading.Event()
+        self.lines = []
+
+    def write(self, text):
+        self.writing.set()
+        self.release.wait(5)
+        self.lines.append(text)
+
+    def flush(self):
+        pass
+
+
+class QueueingHandlerTests(TestCase):
+    """Log lines are formatted with their fields on the caller and written by the listener thread."""
+
+    def make_logger(self, stream, maxsize=10000):
+        with mock.patch('sys.stdout', stream):
+            handler = QueueingHandler(maxsize)
+        self.addCleanup(handler.close)
+        logger = logging.getLogger(f'tests.queueing.{self._testMethodName}')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return get_logger(logger.name), handler
+
+    def test_writes_structured_line(self):
+        stream = io.StringIO()
+        log, handler = self.make_logger(stream)
+        log.info("order created", order_id='MJ1234', note='two words', coupon=None)
+        try:
+            raise ValueError('bad total')
+        except ValueError:
+            log.exception("order failed", order_id='MJ1234')
+        handler.stop_listener()
+
+        created, failed = stream.getvalue().split('\n', 1)
+        self.assertRegex(created, r'^\S+ INFO tests\.queueing\.\S+ order created order_id=MJ1234 note="two words"$')
+        self.assertRegex(failed, r'^\S+ ERROR tests\.queueing\.\S+ order failed order_id=MJ1234\nTraceback \(most recent')
+        self.assertIn('ValueError: bad total', failed)
+
+    def test_full_queue_drops_lines_instead_of_blocking(self):
+        stream = StalledStream()
+        log, handler = self.make_logger(stream, maxsize=2)
+        log.info("first")
+        self.assertTrue(stream.writing.wait(5))
+
+        def flood():
+            for number in range(10):
+                log.info("flood", number=number)
+
+        caller = threading.Thread(target=flood)
+        caller.start()
+        caller.join(2)
+        self.assertFalse(caller.is_alive())
+
+        stream.release.set()
+        handler.stop_listener()
+        output = ''.join(stream.lines)
+        self.assertIn('first', output)
+        self.assertEqual(re.findall(r'number=(\d+)', output), ['0', '1'])
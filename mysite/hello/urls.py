@@ -8,6 +8,7 @@ urlpatterns = [
     path('login/', RedirectView.as_view(pattern_name='signin', permanent=False)),
     path('signup/', views.signup_view, name='signup'),
     path('signup/verify-otp/', views.verify_signup_otp, name='verify_signup_otp'),
+    path('api/signup/otp-status/', views.api_signup_otp_status, name='api_signup_otp_status'),
     path('terms/', views.terms_view, name='terms'),
     path('dashboard/', views.dashboard_view, name='dashboard'),
     path('account/edit/', views.edit_account_view, name='edit_account'),
@@ -31,10 +32,12 @@ urlpatterns = [
     path('api/orders/', views.api_create_order, name='api_create_order'),
     path('api/calculate-delivery-fee/', views.api_calculate_delivery_fee, name='api_calculate_delivery_fee'),
     path('api/orders/<str:order_id>/status/', views.api_get_order_status, name='api_get_order_status'),
+    path('api/orders/<str:order_id>/events/', views.api_order_events, name='api_order_events'),
     path('api/orders/<str:order_id>/update-status/', views.api_update_order_status, name='api_update_order_status'),
     path('api/orders/<str:order_id>/delete/', views.api_delete_order, name='api_delete_order'),
     path('api/orders/delete-all/', views.api_delete_all_orders, name='api_delete_all_orders'),
     path('api/orders/all/', views.api_get_orders, name='api_get_orders'),
+    path('api/orders/changes/', views.api_get_order_changes, name='api_get_order_changes'),
 
     # PayMongo QR PH APIs
     path('api/payment-intent/', views.api_create_payment_intent, name='api_create_payment_intent'),
@@ -42,6 +45,9 @@ urlpatterns = [
     path('api/qrph/generate/', views.api_generate_qrph, name='api_generate_qrph'),
     path('api/payment-intent/attach/', views.api_attach_payment_method, name='api_attach_payment_method'),
     path('api/payment-intent/<str:payment_intent_id>/status/', views.api_check_payment_status, name='api_check_payment_status'),
+    path('api/paymongo/webhook/', views.api_paymongo_webhook, name='api_paymongo_webhook'),
+    path('api/integrations/stats/', views.api_get_integration_stats, name='api_get_integration_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
 
     # Admin Dashboard Backend
     path('admin_dashboard/', views.admin_dashboard, name='admin_dashboard'),
@@ -52,6 +58,7 @@ urlpatterns = [
     path('api/analytics/', views.api_get_analytics, name='api_get_analytics'),
     path('api/products/', views.api_get_products, name='api_get_products'),
     path('api/products/public/', views.api_get_products_public, name='api_get_products_public'),
+    path('api/products/stock/', views.api_get_stock_changes, name='api_get_stock_changes'),
     path('api/products/<int:product_id>/stock/', views.api_get_product_stock, name='api_get_product_stock'),
     path('api/products/create/', views.api_create_product, name='api_create_product'),
     path('api/products/<int:product_id>/update/', views.api_update_product, name='api_update_product'),
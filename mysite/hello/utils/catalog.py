@@ -0,0 +1,74 @@
+from django.core.cache import cache
+from django.db import transaction
+import hashlib
+import json
+import threading
+import time
+
+from hello.utils import metrics
+
+
+CATALOG_VERSION_KEY = 'catalog-version'
+
+# Map category names to match frontend expectations
+PUBLIC_CATEGORY_MAP = {
+    'spud': 'spuds',
+    'pasta_bread': 'pasta',
+    'appetizers': 'appetizers',
+    'wrap': 'wrap',
+    'desserts': 'desserts',
+}
+
+# Serialized public catalogs for this process, keyed by site root (image URLs are absolute)
+_public_catalogs = {}
+_public_catalogs_lock = threading.Lock()
+
+
+def get_catalog_version():
+    """Current catalog version, shared by every worker through the Django cache."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Cache was cleared or expired: start a fresh version every process agrees on
+        cache.add(CATALOG_VERSION_KEY, str(time.time_ns()), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def _set_new_version():
+    cache.set(CATALOG_VERSION_KEY, str(time.time_ns()), None)
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog once the current transaction commits."""
+    transaction.on_commit(_set_new_version)
+
+
+def public_catalog_etag(site_root, version=None):
+    """ETag for the public catalog as served under ``site_root``.
+
+    It depends only on the version, so a 304 can be answered from the
+    shared cache without building anything.
+    """
+    version = version or get_catalog_version()
+    site = hashlib.md5(site_root.encode('utf-8')).hexdigest()[:8]
+    return f'"{version}-{site}"'
+
+
+def get_public_catalog(site_root, build, version=None):
+    """Return ``(etag, body)`` for the public catalog at the current version.
+
+    ``build`` is called with no arguments to produce the product list only
+    when this process has nothing cached for the current version.
+    """
+    version = version or get_catalog_version()
+    entry = _public_catalogs.get(site_root)
+    hit = bool(entry) and entry[0] == version
+    metrics.record_cache('catalog', hit)
+    if hit:
+        return entry[1], entry[2]
+
+    body = json.dumps(build()).encode('utf-8')
+    etag = public_catalog_etag(site_root, version)
+    with _public_catalogs_lock:
+        _public_catalogs[site_root] = (version, etag, body)
+    return etag, body
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from hello.utils import metrics
+
+
+_GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat, lng, precision):
+    """Standard base-32 geohash of a coordinate (precision 8 is a ~38 m x 19 m cell)."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, longitude first
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def quote_cache_key(origin, destination, service_type):
+    """Quotes are shared by every request whose endpoints fall in the same cells."""
+    precision = settings.DELIVERY_QUOTE_GEOHASH_PRECISION
+    return "delivery-quote:{}:{}:{}:{}".format(
+        settings.LALAMOVE_MODE,
+        service_type,
+        geohash(origin['lat'], origin['lng'], precision),
+        geohash(destination['lat'], destination['lng'], precision),
+    )
+
+
+def get_cached_quote(origin, destination, service_type):
+    """Return a cached ``{'deliveryFee', 'distanceKm'}`` quote, or None."""
+    quote = cache.get(quote_cache_key(origin, destination, service_type))
+    metrics.record_cache('delivery_quote', quote is not None)
+    return quote
+
+
+def cache_quote(origin, destination, service_type, delivery_fee, distance_km):
+    """Keep a Lalamove fee for as long as Lalamove honours the quote it came from.
+
+    Only the fee and distance are shared with other customers in the same
+    cells; the quotation itself (its id, stops and expiry) belongs to the
+    customer it was requested for and is never cached.
+    """
+    cache.set(
+        quote_cache_key(origin, destination, service_type),
+        {'deliveryFee': delivery_fee, 'distanceKm': distance_km},
+        settings.DELIVERY_QUOTE_CACHE_TTL,
+    )
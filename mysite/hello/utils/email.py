@@ -1,51 +1,108 @@
-import importlib
-from django.core.mail import send_mail
+from collections import namedtuple
+import smtplib
+import threading
+import time
+
+from django.core.mail import get_connection
 from django.conf import settings
 
 
-def send_otp_email(to_email, otp):
-    subject = "Your Verification Code"
-    html_content = f"""
-    <h2>Verify your account</h2>
-    <p>Your OTP code is:</p>
-    <h1>{otp}</h1>
+SendResult = namedtuple('SendResult', ['error', 'duration_ms'])
+
+# Errors that mean the connection is gone rather than the message being refused
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class ConnectionFailed(Exception):
+    """The email backend connection could not be opened."""
+
+
+class MailTransport:
+    """One email backend connection per process, reused across messages.
+
+    The connection is opened on first use and closed after sitting idle for
+    EMAIL_CONNECTION_IDLE_TIMEOUT seconds, or as soon as a send fails on it.
+    A message whose send finds the connection dropped is retried once on a
+    fresh connection. Sends are serialized, since SMTP connections aren't
+    thread-safe.
     """
-    plain_content = (
-        "Verify your account\n\n"
-        f"Your OTP code is: {otp}"
-    )
-
-    try:
-        if settings.BREVO_API_KEY:
-            sib_api_v3_sdk = importlib.import_module("sib_api_v3_sdk")
-            configuration = sib_api_v3_sdk.Configuration()
-            configuration.api_key["api-key"] = settings.BREVO_API_KEY
-            api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-                sib_api_v3_sdk.ApiClient(configuration)
-            )
-            send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-                to=[{"email": to_email}],
-                sender={
-                    "name": "Mother Julie",
-                    "email": settings.DEFAULT_FROM_EMAIL
-                },
-                subject=subject,
-                html_content=html_content
-            )
-            api_instance.send_transac_email(send_smtp_email)
-            return True
-    except Exception as e:
-        print("Brevo error:", e)
-
-    try:
-        send_mail(
-            subject,
-            plain_content,
-            settings.DEFAULT_FROM_EMAIL,
-            [to_email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print("OTP fallback email error:", e)
-        return False
\ No newline at end of file
+
+    def __init__(self):
+        self._connection = None
+        self._backend = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        idle = time.monotonic() - self._last_used
+        # Also start over if EMAIL_BACKEND was changed (tests override it)
+        if self._connection is not None and (
+            idle > settings.EMAIL_CONNECTION_IDLE_TIMEOUT or self._backend != settings.EMAIL_BACKEND
+        ):
+            self._close()
+        if self._connection is None:
+            connection = get_connection(fail_silently=False)
+            try:
+                connection.open()
+            except Exception as exc:
+                raise ConnectionFailed(f"connection failed: {exc}") from exc
+            self._connection = connection
+            self._backend = settings.EMAIL_BACKEND
+        return self._connection
+
+    def _close(self):
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _send_one(self, message):
+        connection = self._open()
+        message.connection = connection
+        try:
+            connection.send_messages([message])
+        except CONNECTION_ERRORS:
+            # The server dropped an idle connection; the message never got through
+            self._close()
+            connection = self._open()
+            message.connection = connection
+            connection.send_messages([message])
+
+    def send_messages(self, messages):
+        """Send ``messages`` over the shared connection; return a SendResult for each."""
+        results = []
+        with self._lock:
+            open_error = None
+            for message in messages:
+                if open_error is not None:
+                    # No point waiting out the same connect timeout for every message
+                    results.append(SendResult(open_error, 0))
+                    continue
+                started = time.perf_counter()
+                try:
+                    self._send_one(message)
+                    error = None
+                except ConnectionFailed as exc:
+                    open_error = error = exc
+                except Exception as exc:
+                    # Don't trust a connection that just failed for the next message
+                    self._close()
+                    error = exc
+                results.append(SendResult(error, int((time.perf_counter() - started) * 1000)))
+                self._last_used = time.monotonic()
+        return results
+
+    def send(self, message):
+        """Send one message, raising its error if it could not be delivered."""
+        result = self.send_messages([message])[0]
+        if result.error is not None:
+            raise result.error
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+mail_transport = MailTransport()
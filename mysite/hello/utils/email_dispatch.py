@@ -0,0 +1,143 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from hello.logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+class BoundedExecutor:
+    """A fixed-size thread pool that refuses work instead of queueing without limit.
+
+    At most ``max_workers`` tasks run at once and ``max_queue`` more wait;
+    anything beyond that is rejected and counted. ``drain()`` stops new
+    work and waits (up to a timeout) for what was accepted to finish.
+    """
+
+    def __init__(self, max_workers, max_queue, name):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._name = name
+        self._executor = None
+        self._condition = threading.Condition()
+        self._accepting = True
+        self._queued = 0
+        self._in_flight = 0
+        self._counts = {'completed': 0, 'failed': 0, 'rejected': 0}
+
+    def submit(self, fn, *args):
+        """Run ``fn(*args)`` on the pool; return False if it was full or draining."""
+        with self._condition:
+            if not self._accepting or self._queued + self._in_flight >= self.max_workers + self.max_queue:
+                self._counts['rejected'] += 1
+                return False
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self._name)
+            self._queued += 1
+            self._executor.submit(self._run, fn, args)
+            return True
+
+    def reject(self):
+        """Count work turned away before it reached ``submit``."""
+        with self._condition:
+            self._counts['rejected'] += 1
+
+    def _run(self, fn, args):
+        with self._condition:
+            self._queued -= 1
+            self._in_flight += 1
+        outcome = 'completed'
+        try:
+            fn(*args)
+        except Exception:
+            outcome = 'failed'
+            log.exception("background task failed", pool=self._name)
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._counts[outcome] += 1
+                self._condition.notify_all()
+
+    def drain(self, timeout):
+        """Stop accepting work and wait up to ``timeout`` seconds for accepted work to finish.
+
+        Returns True if everything finished; tasks still waiting afterwards are dropped.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            self._accepting = False
+            while self._queued + self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            drained = not (self._queued + self._in_flight)
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return drained
+
+    def stats(self):
+        with self._condition:
+            return {
+                'workers': self.max_workers,
+                'queue_size': self.max_queue,
+                'queued': self._queued,
+                'in_flight': self._in_flight,
+                **self._counts,
+            }
+
+
+executor = BoundedExecutor(
+    settings.EMAIL_DISPATCH_WORKERS,
+    settings.EMAIL_DISPATCH_QUEUE_SIZE,
+    name='email-dispatch',
+)
+
+# Outbox rows committed in this process that no dispatch task has picked up yet
+_pending_ids = []
+_pending_lock = threading.Lock()
+
+
+def _deliver_pending():
+    from hello.utils.outbox import deliver_batch
+
+    with _pending_lock:
+        ids = _pending_ids[:]
+        del _pending_ids[:]
+    if not ids:
+        return
+    close_old_connections()
+    try:
+        deliver_batch(len(ids), ids=ids)
+    finally:
+        close_old_connections()
+
+
+def dispatch_soon(entry_id):
+    """Try to send a committed outbox row right away instead of waiting for the worker.
+
+    Rows committed before a dispatch task starts go out together, up to
+    EMAIL_OUTBOX_BATCH_SIZE. When that batch or the pool is full the row is
+    simply left for ``run_email_worker``, which picks up anything still
+    pending.
+    """
+    with _pending_lock:
+        if len(_pending_ids) >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+            executor.reject()
+            return
+        _pending_ids.append(entry_id)
+        schedule = len(_pending_ids) == 1
+    if schedule and not executor.submit(_deliver_pending):
+        with _pending_lock:
+            del _pending_ids[:]
+
+
+def drain(timeout=None):
+    """Finish in-flight dispatches before the process exits (gunicorn ``worker_exit``)."""
+    return executor.drain(settings.EMAIL_DISPATCH_DRAIN_TIMEOUT if timeout is None else timeout)
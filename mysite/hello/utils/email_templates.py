@@ -0,0 +1,326 @@
+from collections import namedtuple
+import html
+import re
+
+
+RenderedEmail = namedtuple('RenderedEmail', ['subject', 'text', 'html'])
+
+# {name} marks a slot; everything else in a layout is copied through verbatim
+_SLOT = re.compile(r'\{(\w+)\}')
+
+
+def _escape_text(value):
+    """Escape a value for HTML element content (most values need nothing)."""
+    if '&' in value or '<' in value or '>' in value:
+        return html.escape(value, quote=False)
+    return value
+
+
+def _escape_attribute(value):
+    """Escape a value for a double-quoted HTML attribute."""
+    if '&' in value or '<' in value or '>' in value or '"' in value or "'" in value:
+        return html.escape(value)
+    return value
+
+
+class _CompiledLayout:
+    """A layout split once into static segments and the slots between them.
+
+    Slots inside an attribute value (``="{name}"``) are looked up as
+    ``name__attr`` so the HTML part can escape quotes there as well.
+    """
+
+    def __init__(self, source):
+        self.segments = []
+        self.slots = []
+        self.attribute_names = set()
+        position = 0
+        for match in _SLOT.finditer(source):
+            literal = source[position:match.start()]
+            self.segments.append(literal)
+            name = match.group(1)
+            if literal.endswith('="'):
+                self.attribute_names.add(name)
+                name += '__attr'
+            self.slots.append((len(self.segments), name))
+            self.segments.append('')
+            position = match.end()
+        self.segments.append(source[position:])
+
+    def fill(self, values):
+        parts = self.segments.copy()
+        for index, name in self.slots:
+            parts[index] = values[name]
+        return ''.join(parts)
+
+
+class EmailTemplate:
+    """Subject, plain text and HTML layouts for one kind of email.
+
+    Slot values are strings, or lists of lines that are joined with newlines
+    in the subject and text parts and with ``<br>`` in the HTML part. Values
+    are HTML-escaped for the HTML part only.
+    """
+
+    def __init__(self, subject, text, html_source):
+        self.subject = _CompiledLayout(subject)
+        self.text = _CompiledLayout(text)
+        self.html = _CompiledLayout(html_source)
+
+    def render(self, **context):
+        text_values = {}
+        html_values = {}
+        for name, value in context.items():
+            if isinstance(value, (list, tuple)):
+                value = '\n'.join(value)
+                text_values[name] = value
+                html_values[name] = _escape_text(value).replace('\n', '<br>')
+            else:
+                value = str(value)
+                text_values[name] = value
+                html_values[name] = _escape_text(value)
+        for name in self.html.attribute_names:
+            html_values[name + '__attr'] = _escape_attribute(text_values[name])
+        return RenderedEmail(
+            self.subject.fill(text_values),
+            self.text.fill(text_values),
+            self.html.fill(html_values),
+        )
+
+
+_registry = {}
+
+
+def register(name, subject, text, html_source):
+    """Compile a layout and make it available to ``render(name, ...)``."""
+    _registry[name] = EmailTemplate(subject, text, html_source)
+    return _registry[name]
+
+
+def render(name, **context):
+    """Render the subject, text and HTML parts of a registered email in one go."""
+    return _registry[name].render(**context)
+
+
+# ---------------------------------------------------------------------------
+# Layouts (compiled once, when this module is first imported)
+# ---------------------------------------------------------------------------
+
+register(
+    'order_receipt',
+    subject='[E-RECEIPT] Order {order_id} - Mother Julie',
+    text="""Dear {customer_name},
+
+Thank you for your order with Mother Julie. Here is your e-receipt:
+
+Order ID: {order_id}
+Order Type: {order_type}
+Payment Method: {payment_method}
+Status: Order Placed
+Total Amount: Php {total_amount}
+
+Order Items:
+{items}
+
+Please keep this email for your reference.""",
+    html_source="""<!doctype html>
+<html>
+  <body style="margin:0;padding:0;background:#f7f7f8;font-family:Inter,Segoe UI,Roboto,Arial,sans-serif;color:#111;">
+    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
+      <tr>
+        <td align="center" style="padding:24px;">
+          <table role="presentation" cellpadding="0" cellspacing="0" width="560" style="background:#ffffff;border-radius:12px;box-shadow:0 2px 12px rgba(0,0,0,.06);overflow:hidden;">
+            <tr>
+              <td align="center" style="padding:28px 28px 8px 28px;">
+                <h1 style="margin:16px 0 0 0;font-size:22px;line-height:28px;color:#d63384;">Your E-Receipt</h1>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                <p>Dear {customer_name},</p>
+                <p>Thank you for your order with Mother Julie. Here is your e-receipt:</p>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                <div style="background-color:#f8f9fa;padding:15px;border-radius:5px;margin:20px 0;">
+                  <p style="margin:8px 0;"><strong>Order ID:</strong> {order_id}</p>
+                  <p style="margin:8px 0;"><strong>Order Type:</strong> {order_type}</p>
+                  <p style="margin:8px 0;"><strong>Payment Method:</strong> {payment_method}</p>
+                  <p style="margin:8px 0;"><strong>Status:</strong> <span style="color:#d63384;font-weight:bold;">Order Placed</span></p>
+                  <p style="margin:8px 0;"><strong>Total Amount:</strong> Php {total_amount}</p>
+                </div>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                <h4 style="color:#333;margin-top:20px;margin-bottom:10px;">Order Items:</h4>
+                <div style="background-color:#ffffff;padding:10px;border-left:3px solid #d63384;margin-top:10px;">
+                  {items}
+                </div>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 24px 28px;font-size:14px;line-height:22px;color:#333;">
+                <p>Please keep this email for your reference.</p>
+              </td>
+            </tr>
+          </table>
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>""",
+)
+
+_ORDER_STATUS_TEXT = """Dear {customer_name},
+
+Your order status has been updated:
+
+Order ID: {order_id}
+Order Type: {order_type}
+Status: {status}
+Total Amount: ₱{total_amount}
+
+Order Items:
+{items}
+
+Thank you for choosing Mother Julie!
+
+---
+This is an automated email. Please do not reply to this message."""
+
+_ORDER_STATUS_HTML = """<!doctype html>
+<html>
+  <body style="margin:0;padding:0;background:#f7f7f8;font-family:Inter,Segoe UI,Roboto,Arial,sans-serif;color:#111;">
+    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
+      <tr>
+        <td align="center" style="padding:24px;">
+          <table role="presentation" cellpadding="0" cellspacing="0" width="560" style="background:#ffffff;border-radius:12px;box-shadow:0 2px 12px rgba(0,0,0,.06);overflow:hidden;">
+            <tr>
+              <td align="center" style="padding:28px 28px 8px 28px;">
+                <h1 style="margin:16px 0 0 0;font-size:22px;line-height:28px;color:#d63384;">Order Status Update</h1>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                <p>Dear {customer_name},</p>
+                <p>Your order status has been updated:</p>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
+                  <p style="margin:8px 0;"><strong>Order ID:</strong> {order_id}</p>
+                  <p style="margin:8px 0;"><strong>Order Type:</strong> {order_type}</p>
+                  <p style="margin:8px 0;"><strong>Status:</strong> <span style="color: #d63384; font-weight: bold;">{status}</span></p>
+                  <p style="margin:8px 0;"><strong>Total Amount:</strong> ₱{total_amount}</p>
+                </div>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                <h4 style="color: #333; margin-top: 20px; margin-bottom: 10px;">Order Items:</h4>
+                <div style="background-color: #ffffff; padding: 10px; border-left: 3px solid #d63384; margin-top: 10px;">
+                  {items}
+                </div>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 24px 28px;font-size:14px;line-height:22px;color:#333;">
+                <p>Thank you for choosing Mother Julie!</p>
+              </td>
+            </tr>
+          </table>
+          <div style="padding:14px 0 0 0;font-size:11px;color:#9aa0a6;">
+            Sent by Mother Julie • Please do not reply to this automated message.
+          </div>
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>"""
+
+register(
+    'order_status',
+    subject='[ORDER UPDATE] Order {order_id} - Status: {status}',
+    text=_ORDER_STATUS_TEXT,
+    html_source=_ORDER_STATUS_HTML,
+)
+
+# Same email with the statuses an order jumped through listed above its items
+register(
+    'order_status_timeline',
+    subject='[ORDER UPDATE] Order {order_id} - Status: {status}',
+    text=_ORDER_STATUS_TEXT.replace(
+        'Order Items:\n',
+        'Status Timeline:\n{timeline}\n\nOrder Items:\n',
+    ),
+    html_source=_ORDER_STATUS_HTML.replace(
+        '                <h4 style="color: #333; margin-top: 20px; margin-bottom: 10px;">Order Items:</h4>\n',
+        '''                <h4 style="color: #333; margin-top: 20px; margin-bottom: 10px;">Status Timeline:</h4>
+                <div style="background-color: #ffffff; padding: 10px; border-left: 3px solid #d63384; margin-top: 10px;">
+                  {timeline}
+                </div>
+                <h4 style="color: #333; margin-top: 20px; margin-bottom: 10px;">Order Items:</h4>
+''',
+    ),
+)
+
+register(
+    'password_reset',
+    subject='Reset Your Password - Mother Julie',
+    text='Reset your password here: {reset_url}',
+    html_source="""
+<!doctype html>
+<html>
+  <body style="margin:0;padding:0;background:#f7f7f8;font-family:Inter,Segoe UI,Roboto,Arial,sans-serif;color:#111;">
+    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
+      <tr>
+        <td align="center" style="padding:24px;">
+          <table role="presentation" cellpadding="0" cellspacing="0" width="560" style="background:#ffffff;border-radius:12px;box-shadow:0 2px 12px rgba(0,0,0,.06);overflow:hidden;">
+            <tr>
+              <td align="center" style="padding:28px 28px 8px 28px;">
+                <h1 style="margin:16px 0 0 0;font-size:22px;line-height:28px;color:#ff5b89;">Reset your password</h1>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
+                We received a request to reset the password for your account. If you didn’t request this, ignore this email.
+              </td>
+            </tr>
+            <tr>
+              <td align="center" style="padding:24px 28px 8px 28px;">
+                <a href="{reset_url}" style="display:inline-block;background:#ff5b89;color:#fff;text-decoration:none;padding:12px 18px;border-radius:8px;font-weight:600;">Reset Password</a>
+              </td>
+            </tr>
+            <tr>
+              <td style="padding:6px 28px 20px 28px;font-size:12px;line-height:18px;color:#666;">Link expires in 1 hour.</td>
+            </tr>
+            <tr>
+              <td style="padding:0 28px 24px 28px;font-size:12px;line-height:18px;color:#666;">If button doesn't work, visit: <a href="{reset_url}" style="color:#ff5b89;word-break:break-all;">{reset_url}</a></td>
+            </tr>
+          </table>
+          <div style="padding:14px 0 0 0;font-size:11px;color:#9aa0a6;">Sent by Mother Julie • Do not reply.</div>
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>
+""",
+)
+
+register(
+    'signup_otp',
+    subject='Mother Julie account verification code',
+    text="""Welcome to Mother Julie!
+
+Your verification code is: {otp_code}
+This code expires in 10 minutes.""",
+    html_source="""
+    <h2>Welcome to Mother Julie!</h2>
+    <p>Your verification code is:</p>
+    <h1>{otp_code}</h1>
+    <p>This code expires in 10 minutes.</p>
+    """,
+)
@@ -0,0 +1,173 @@
+import threading
+import time
+
+from django.conf import settings
+
+from hello.utils import metrics, request_metrics
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+
+PAYMONGO = 'paymongo'
+LALAMOVE = 'lalamove'
+PROVIDERS = (PAYMONGO, LALAMOVE)
+
+
+class IntegrationUnavailable(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+    def __init__(self, provider, retry_after):
+        super().__init__(f'{provider} is temporarily unavailable')
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stop calling a provider after repeated failures, then let one trial call through.
+
+    The breaker opens after INTEGRATION_BREAKER_THRESHOLD consecutive
+    failures. Once INTEGRATION_BREAKER_COOLDOWN seconds have passed, a
+    single call is allowed: success closes the breaker, failure opens it
+    for another cooldown.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < settings.INTEGRATION_BREAKER_COOLDOWN:
+            return 'open'
+        return 'half_open'
+
+    def before_call(self):
+        """Return seconds until the next trial if the call must be refused, else ``None``."""
+        with self._lock:
+            if self.opened_at is None:
+                return None
+            now = time.monotonic()
+            cooldown = settings.INTEGRATION_BREAKER_COOLDOWN
+            remaining = self.opened_at + cooldown - now
+            if remaining > 0:
+                return remaining
+            # One trial at a time; a trial that never reported back frees up after a cooldown
+            if self.trial_started_at is not None and now - self.trial_started_at < cooldown:
+                return cooldown - (now - self.trial_started_at)
+            self.trial_started_at = now
+            return None
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_started_at = None
+            if self.opened_at is not None or self.failures >= settings.INTEGRATION_BREAKER_THRESHOLD:
+                self.opened_at = time.monotonic()
+
+
+def _empty_stats():
+    return {'calls': 0, 'errors': 0, 'rejected': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+
+# Per-process clients, breakers and counters (each worker keeps its own connection pool)
+_sessions = {}
+_sessions_lock = threading.Lock()
+_breakers = {provider: CircuitBreaker() for provider in PROVIDERS}
+_stats = {provider: _empty_stats() for provider in PROVIDERS}
+_stats_lock = threading.Lock()
+
+
+def get_session(provider):
+    """The pooled ``requests.Session`` this process uses for ``provider``."""
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+    with _sessions_lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            # No transparent retries: payment calls are not idempotent, and the breaker handles outages
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.INTEGRATION_POOL_MAXSIZE,
+                max_retries=0,
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[provider] = session
+    return session
+
+
+def _record(provider, elapsed_ms, failed=False, rejected=False):
+    outcome = 'rejected' if rejected else 'error' if failed else 'success'
+    metrics.inc('hello_external_requests_total', provider=provider, outcome=outcome)
+    if not rejected:
+        request_metrics.record_external(elapsed_ms)
+        metrics.observe('hello_external_request_duration_seconds', elapsed_ms / 1000, provider=provider)
+    with _stats_lock:
+        stats = _stats[provider]
+        if rejected:
+            stats['rejected'] += 1
+            return
+        stats['calls'] += 1
+        stats['errors'] += int(failed)
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+
+def request(provider, method, url, **kwargs):
+    """Send a request to ``provider`` through its pooled session and circuit breaker.
+
+    Uses INTEGRATION_CONNECT_TIMEOUT / INTEGRATION_READ_TIMEOUT unless a
+    ``timeout`` is given. Connection errors, timeouts and 5xx responses
+    count as failures; other responses are returned to the caller as-is.
+    Raises IntegrationUnavailable while the breaker is open.
+    """
+    breaker = _breakers[provider]
+    retry_after = breaker.before_call()
+    if retry_after is not None:
+        _record(provider, 0, rejected=True)
+        raise IntegrationUnavailable(provider, retry_after)
+
+    kwargs.setdefault('timeout', (settings.INTEGRATION_CONNECT_TIMEOUT, settings.INTEGRATION_READ_TIMEOUT))
+    started = time.perf_counter()
+    try:
+        response = get_session(provider).request(method, url, **kwargs)
+    except requests.RequestException:
+        _record(provider, (time.perf_counter() - started) * 1000, failed=True)
+        breaker.record_failure()
+        raise
+
+    failed = response.status_code >= 500
+    _record(provider, (time.perf_counter() - started) * 1000, failed=failed)
+    if failed:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def get_stats():
+    """Call counters and breaker state for each provider in this process."""
+    with _stats_lock:
+        snapshot = {provider: dict(stats) for provider, stats in _stats.items()}
+    for provider, stats in snapshot.items():
+        stats['avg_ms'] = round(stats['total_ms'] / stats['calls'], 1) if stats['calls'] else 0.0
+        stats['total_ms'] = round(stats['total_ms'], 1)
+        stats['max_ms'] = round(stats['max_ms'], 1)
+        stats['breaker'] = _breakers[provider].state
+    return snapshot
@@ -0,0 +1,287 @@
+"""Counters and histograms shared by every worker process, rendered for Prometheus.
+
+Each process keeps its own values in memory (``inc`` / ``observe`` only
+take a lock) and a background thread writes them to
+``METRICS_DIR/<pid>.json`` every METRICS_FLUSH_INTERVAL seconds. ``render``
+adds up the files of all processes, so counters keep counting across
+gunicorn workers and worker restarts. METRICS_DIR must be on a disk shared
+by the workers of one instance; it is reset on deploy.
+
+When a worker exits, ``mark_process_dead`` folds its file into
+``aggregate.json`` (like prometheus_client's multiprocess mode), so dead
+workers' files don't pile up and a new process that happens to get the
+same pid can't overwrite them and make totals go backwards.
+"""
+import atexit
+import bisect
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'hello_http_request_duration_seconds': ('histogram', 'Request wall time by view', LATENCY_BUCKETS),
+    'hello_http_request_queries': ('histogram', 'Database queries per request by view', QUERY_BUCKETS),
+    'hello_http_request_db_seconds_total': ('counter', 'Time spent in database queries by view', None),
+    'hello_external_request_duration_seconds': ('histogram', 'PayMongo/Lalamove call time', LATENCY_BUCKETS),
+    'hello_external_requests_total': ('counter', 'PayMongo/Lalamove calls by outcome (success, error, rejected)', None),
+    'hello_email_send_duration_seconds': ('histogram', 'Time to hand one outbox email to the mail backend', LATENCY_BUCKETS),
+    'hello_emails_total': ('counter', 'Outbox send attempts by kind and outcome (sent, retried, dead)', None),
+    'hello_orders_created_total': ('counter', 'Orders placed by order type and initial status', None),
+    'hello_stock_conflicts_total': ('counter', 'Order lines asking for more stock than was left (clamped at zero)', None),
+    'hello_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit, miss)', None),
+}
+
+_counters = {}
+_histograms = {}
+_lock = threading.Lock()
+# Serializes writes of this process's file with merging it into the aggregate
+_flush_lock = threading.RLock()
+_flusher_pid = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+AGGREGATE_FILENAME = 'aggregate.json'
+
+
+def _process_path(pid):
+    return os.path.join(settings.METRICS_DIR, f'{pid}.json')
+
+
+@contextmanager
+def _directory_lock(exclusive):
+    """Keep readers from seeing a dead process's values twice (or not at all) while they are merged."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _ensure_flusher():
+    """Start this process's flush thread (again after a fork)."""
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        if _flusher_pid is not None:
+            # Forked from a process that already recorded: those values are in the parent's file
+            _counters.clear()
+            _histograms.clear()
+        _flusher_pid = pid
+    # A file under our pid belongs to an earlier process that died without being merged
+    _merge_into_aggregate(pid)
+    threading.Thread(target=_flush_loop, name='metrics-flush', daemon=True).start()
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+    _ensure_flusher()
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        histogram['buckets'][bisect.bisect_left(buckets, value)] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+    _ensure_flusher()
+
+
+def record_cache(cache_name, hit):
+    inc('hello_cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+def _snapshot():
+    with _lock:
+        return {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [
+                [name, list(labels), {**histogram, 'buckets': list(histogram['buckets'])}]
+                for (name, labels), histogram in _histograms.items()
+            ],
+        }
+
+
+def _write(path, data):
+    """Replace ``path`` atomically, so readers never see half a file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def flush():
+    """Write this process's values to METRICS_DIR."""
+    with _flush_lock:
+        data = _snapshot()
+        path = _process_path(os.getpid())
+        if not data['counters'] and not data['histograms'] and not os.path.exists(path):
+            return
+        _write(path, data)
+
+
+def _merge_into_aggregate(pid):
+    """Add a finished process's file to aggregate.json and delete it."""
+    path = _process_path(pid)
+    if not os.path.exists(path):
+        return
+    with _directory_lock(exclusive=True):
+        counters, histograms = {}, {}
+        for filename in (AGGREGATE_FILENAME, os.path.basename(path)):
+            _add_file(os.path.join(settings.METRICS_DIR, filename), counters, histograms)
+        _write(os.path.join(settings.METRICS_DIR, AGGREGATE_FILENAME), {
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'histograms': [[name, list(labels), histogram] for (name, labels), histogram in histograms.items()],
+        })
+        os.remove(path)
+
+
+def mark_process_dead(pid=None):
+    """Fold a worker's values into aggregate.json as it exits (gunicorn's worker_exit hook)."""
+    pid = pid or os.getpid()
+    if pid != os.getpid():
+        _merge_into_aggregate(pid)
+        return
+    with _flush_lock:
+        flush()
+        with _lock:
+            # Now counted in the aggregate; anything recorded from here on starts a new file
+            _counters.clear()
+            _histograms.clear()
+        _merge_into_aggregate(pid)
+
+
+def _flush_loop():
+    pid = os.getpid()
+    while _flusher_pid == pid:
+        time.sleep(settings.METRICS_FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+@atexit.register
+def _flush_at_exit():
+    if _flusher_pid == os.getpid():
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def _add_file(path, counters, histograms):
+    """Add the values in one metrics file to ``counters`` and ``histograms``."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    for name, labels, value in data['counters']:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, histogram in data['histograms']:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        total = histograms.get(key)
+        if total is None:
+            histograms[key] = {**histogram, 'buckets': list(histogram['buckets'])}
+            continue
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+        total['sum'] += histogram['sum']
+        total['count'] += histogram['count']
+
+
+def _collect():
+    """Add up the values written by every process, live or merged."""
+    counters = {}
+    histograms = {}
+    directory = settings.METRICS_DIR
+    if not os.path.isdir(directory):
+        return counters, histograms
+    with _directory_lock(exclusive=False):
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                _add_file(os.path.join(directory, filename), counters, histograms)
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(gauges=()):
+    """Prometheus text exposition of every process's metrics plus ``gauges``.
+
+    ``gauges`` is an iterable of ``(name, help, [(labels_dict, value), ...])``
+    computed at scrape time (queue depth, orders per status, ...).
+    """
+    flush()
+    counters, histograms = _collect()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = counters if kind == 'counter' else histograms
+        keys = sorted(key for key in series if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key in keys:
+            labels = key[1]
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_number(series[key])}')
+                continue
+            histogram = series[key]
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), histogram['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels((*labels, ("le", bound)))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(histogram["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} {histogram["count"]}')
+    for name, help_text, samples in gauges:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in samples:
+            lines.append(f'{name}{_labels(sorted(labels.items()))} {_number(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+import json
+import time
+
+
+# Statuses after which a tracking page has nothing left to wait for
+TERMINAL_ORDER_STATUSES = ('delivered', 'picked_up', 'cancelled')
+
+
+def _event_key(order_id):
+    return f"order-events:{order_id}"
+
+
+def get_order_event(order_id):
+    """Return the latest published ``{'version', 'payload'}`` entry for an order, or None."""
+    return cache.get(_event_key(order_id))
+
+
+def publish_order_event(order_id, payload, updated_at=None):
+    """Store a new status snapshot so open tracking streams push it to the browser.
+
+    The snapshot lives in the shared Django cache, so every worker process
+    serving an event stream sees it without querying the database.
+    ``updated_at`` is the order's row version the snapshot was built from;
+    new streams compare it with the database before trusting the snapshot.
+    """
+    entry = {'version': str(time.time_ns()), 'payload': payload, 'updated_at': updated_at}
+    cache.set(_event_key(order_id), entry, settings.ORDER_EVENTS_CACHE_TIMEOUT)
+    return entry
+
+
+def order_status_payload(order):
+    """Serialize an order the way the delivery/pickup tracking pages expect it."""
+    return {
+        'order_id': order.order_id,
+        'customer_name': order.customer_name,
+        'order_type': order.order_type,
+        'status': order.status,
+        'total_amount': float(order.total_amount),
+        'order_placed': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+        'preparing_at': timezone.localtime(order.preparing_at).strftime('%Y-%m-%d %H:%M:%S') if order.preparing_at else None,
+        'ready_at': timezone.localtime(order.ready_at).strftime('%Y-%m-%d %H:%M:%S') if order.ready_at else None,
+        'picked_up_at': timezone.localtime(order.picked_up_at).strftime('%Y-%m-%d %H:%M:%S') if order.picked_up_at else None,
+        'items': [
+            {
+                'name': item.product_name,
+                'quantity': item.quantity,
+                'price': float(item.unit_price),
+                'size': getattr(item, 'size', '')
+            } for item in order.order_items.all()
+        ]
+    }
+
+
+def publish_order_status(order):
+    """Publish an order's current status once the surrounding transaction commits."""
+    payload = order_status_payload(order)
+    updated_at = order.updated_at
+    transaction.on_commit(lambda: publish_order_event(order.order_id, payload, updated_at))
+
+
+def _release_db_connections():
+    """Close this thread's database connections before a stream goes idle.
+
+    ``request_finished`` (which normally closes them) only fires when the
+    stream ends, and CONN_MAX_AGE would otherwise keep a Postgres
+    connection open for every tracking tab.
+    """
+    for connection in connections.all(initialized_only=True):
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def format_sse(payload, event_id=None, event='status'):
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(payload, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_order_events(order_id, initial_entry, last_event_id=None):
+    """Yield SSE messages for an order until it finishes or the stream times out.
+
+    Only the cache is consulted while the connection is open; the database is
+    never touched after the initial snapshot.
+    """
+    # Runs once the response (and every middleware) has finished with the database
+    _release_db_connections()
+
+    poll_interval = settings.ORDER_EVENTS_POLL_INTERVAL
+    heartbeat_interval = settings.ORDER_EVENTS_HEARTBEAT_INTERVAL
+    deadline = time.monotonic() + settings.ORDER_EVENTS_STREAM_TIMEOUT
+
+    yield f"retry: {int(settings.ORDER_EVENTS_RETRY_MS)}\n\n"
+
+    last_version = initial_entry['version']
+    if last_event_id != last_version:
+        yield format_sse(initial_entry['payload'], event_id=last_version)
+    if initial_entry['payload'].get('status') in TERMINAL_ORDER_STATUSES:
+        return
+
+    last_write = time.monotonic()
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        entry = get_order_event(order_id)
+        if entry and entry['version'] != last_version:
+            last_version = entry['version']
+            last_write = time.monotonic()
+            yield format_sse(entry['payload'], event_id=last_version)
+            if entry['payload'].get('status') in TERMINAL_ORDER_STATUSES:
+                return
+        elif time.monotonic() - last_write >= heartbeat_interval:
+            last_write = time.monotonic()
+            # Comment lines keep proxies from closing an idle connection
+            yield ": keep-alive\n\n"
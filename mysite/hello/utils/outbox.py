@@ -0,0 +1,195 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from hello.models import EmailOutbox
+from hello.utils import email_dispatch, metrics
+from hello.utils.email import ConnectionFailed, SendResult, mail_transport
+
+
+def enqueue_email(to_email, subject, body_text, body_html='', kind=EmailOutbox.KIND_OTHER, order=None):
+    """Queue an email for the outbox worker.
+
+    Call this inside the transaction that makes the change the email
+    describes: if that transaction rolls back, the email is never sent.
+    Once it commits, the row is handed to this process's dispatch pool
+    (EMAIL_DISPATCH_IMMEDIATE); the worker still sends anything the pool
+    couldn't take.
+    """
+    entry = EmailOutbox.objects.create(
+        kind=kind,
+        order=order,
+        to_email=to_email,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        subject=subject,
+        body_text=body_text,
+        body_html=body_html,
+    )
+    if settings.EMAIL_DISPATCH_IMMEDIATE:
+        transaction.on_commit(lambda: email_dispatch.dispatch_soon(entry.pk))
+    return entry
+
+
+def retry_delay_seconds(attempts):
+    """Exponential backoff with jitter for a message that has failed ``attempts`` times."""
+    delay = min(
+        settings.EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+        settings.EMAIL_OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)),
+    )
+    # Keep half the delay and randomize the rest so failed batches don't retry in lockstep
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim_batch(batch_size, ids=None):
+    """Mark up to ``batch_size`` due messages as sending and return them.
+
+    Messages stuck in ``sending`` longer than EMAIL_OUTBOX_LOCK_TIMEOUT
+    (e.g. the worker was killed mid-send) are picked up again. ``ids``
+    limits the claim to those rows; any the worker already took are skipped.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.EMAIL_OUTBOX_LOCK_TIMEOUT)
+    with transaction.atomic():
+        due = (
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=now)
+                | Q(status=EmailOutbox.STATUS_SENDING, locked_at__lt=stale_before)
+            )
+            .order_by('next_attempt_at', 'pk')
+        )
+        if ids is not None:
+            due = due.filter(pk__in=ids)
+        ids = list(due.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return []
+        EmailOutbox.objects.filter(pk__in=ids).update(
+            status=EmailOutbox.STATUS_SENDING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+        EmailOutbox.objects.filter(pk__in=ids, first_attempt_at__isnull=True).update(first_attempt_at=now)
+    return list(EmailOutbox.objects.filter(pk__in=ids).order_by('next_attempt_at', 'pk'))
+
+
+def _build_message(entry):
+    message = EmailMultiAlternatives(
+        subject=entry.subject,
+        body=entry.body_text,
+        from_email=entry.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=[entry.to_email],
+    )
+    if entry.body_html:
+        message.attach_alternative(entry.body_html, "text/html")
+    return message
+
+
+def _mark_sent(entry, duration_ms):
+    sent_at = timezone.now()
+    latency_ms = int((sent_at - entry.created_at).total_seconds() * 1000)
+    EmailOutbox.objects.filter(pk=entry.pk).update(
+        status=EmailOutbox.STATUS_SENT,
+        sent_at=sent_at,
+        locked_at=None,
+        last_error='',
+        send_duration_ms=duration_ms,
+        latency_ms=max(latency_ms, 0),
+    )
+
+
+def _mark_failed(entry, error):
+    if entry.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        EmailOutbox.objects.filter(pk=entry.pk).update(
+            status=EmailOutbox.STATUS_DEAD,
+            locked_at=None,
+            last_error=error,
+        )
+        return EmailOutbox.STATUS_DEAD
+    EmailOutbox.objects.filter(pk=entry.pk).update(
+        status=EmailOutbox.STATUS_PENDING,
+        locked_at=None,
+        last_error=error,
+        next_attempt_at=timezone.now() + timedelta(seconds=retry_delay_seconds(entry.attempts)),
+    )
+    return EmailOutbox.STATUS_PENDING
+
+
+def _renew_claim(entry):
+    """Restart the claim's lock timeout just before sending; False if the claim was lost.
+
+    A batch can take longer than EMAIL_OUTBOX_LOCK_TIMEOUT as a whole, so
+    the lock is renewed per message. If another worker already re-claimed
+    the row as stale, its ``locked_at`` no longer matches and we skip it.
+    """
+    now = timezone.now()
+    renewed = EmailOutbox.objects.filter(
+        pk=entry.pk, status=EmailOutbox.STATUS_SENDING, locked_at=entry.locked_at,
+    ).update(locked_at=now)
+    entry.locked_at = now
+    return renewed == 1
+
+
+def deliver_batch(batch_size=None, transport=None, ids=None):
+    """Send one batch of due messages over the process-wide mail connection.
+
+    ``ids`` restricts the batch to those rows (see ``claim_batch``).
+    Returns a dict with the number of messages sent, retried and dead-lettered.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    entries = claim_batch(batch_size, ids=ids)
+    result = {'sent': 0, 'retried': 0, 'dead': 0}
+    if not entries:
+        return result
+
+    transport = transport or mail_transport
+    open_error = None
+    for entry in entries:
+        if open_error is not None:
+            # No point waiting out the same connect timeout for every message
+            send = SendResult(open_error, 0)
+        elif not _renew_claim(entry):
+            continue
+        else:
+            send = transport.send_messages([_build_message(entry)])[0]
+            if isinstance(send.error, ConnectionFailed):
+                open_error = send.error
+        if send.error is not None:
+            outcome = 'dead' if _mark_failed(entry, str(send.error)) == EmailOutbox.STATUS_DEAD else 'retried'
+            result[outcome] += 1
+            metrics.inc('hello_emails_total', kind=entry.kind, outcome=outcome)
+            continue
+        _mark_sent(entry, send.duration_ms)
+        result['sent'] += 1
+        metrics.inc('hello_emails_total', kind=entry.kind, outcome='sent')
+        metrics.observe('hello_email_send_duration_seconds', send.duration_ms / 1000, kind=entry.kind)
+    return result
+
+
+def min_lock_timeout_seconds():
+    """Longest one message can hold its claim: a connect, a send and a send retried on a fresh connection."""
+    return settings.EMAIL_TIMEOUT * 4
+
+
+def oldest_pending_seconds():
+    """Age of the oldest unsent message in whole seconds (0 when the queue is empty), with one query."""
+    oldest = EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).aggregate(oldest=Min('created_at'))['oldest']
+    return int((timezone.now() - oldest).total_seconds()) if oldest else 0
+
+
+def outbox_stats():
+    """Queue depth and recent throughput for monitoring."""
+    hour_ago = timezone.now() - timedelta(hours=1)
+    sent_last_hour = EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT, sent_at__gte=hour_ago)
+    return {
+        'pending': EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count(),
+        'sending': EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENDING).count(),
+        'dead': EmailOutbox.objects.filter(status=EmailOutbox.STATUS_DEAD).count(),
+        'sent_last_hour': sent_last_hour.count(),
+        'oldest_pending_seconds': oldest_pending_seconds(),
+    }
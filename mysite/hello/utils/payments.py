@@ -0,0 +1,84 @@
+from datetime import timedelta
+import hashlib
+import hmac
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from hello.models import PaymentIntentStatus
+
+
+# Webhook event types and the intent status each one settles on
+WEBHOOK_EVENT_STATUSES = {
+    'payment.paid': PaymentIntentStatus.STATUS_SUCCEEDED,
+    'payment.failed': PaymentIntentStatus.STATUS_FAILED,
+}
+
+
+def verify_webhook_signature(body, header):
+    """Check a ``Paymongo-Signature`` header against the raw request body.
+
+    The header looks like ``t=<timestamp>,te=<test signature>,li=<live signature>``;
+    the signature is an HMAC-SHA256 of ``"<timestamp>.<body>"`` keyed with
+    PAYMONGO_WEBHOOK_SECRET. Events older than PAYMONGO_WEBHOOK_TOLERANCE_SECONDS
+    are rejected so a captured request can't be replayed later.
+    """
+    secret = settings.PAYMONGO_WEBHOOK_SECRET
+    if not secret or not header:
+        return False
+
+    parts = dict(part.split('=', 1) for part in header.split(',') if '=' in part)
+    timestamp = parts.get('t', '')
+    signature = parts.get('li' if settings.PAYMONGO_MODE == 'production' else 'te', '')
+    if not timestamp.isdigit() or not signature:
+        return False
+    if abs(time.time() - int(timestamp)) > settings.PAYMONGO_WEBHOOK_TOLERANCE_SECONDS:
+        return False
+
+    expected = hmac.new(secret.encode('utf-8'), timestamp.encode('utf-8') + b'.' + body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def get_local_status(payment_intent_id):
+    """Stored status for an intent if it can be served without asking PayMongo, else ``None``.
+
+    Final statuses are always served; others only while younger than
+    PAYMENT_STATUS_STALE_SECONDS.
+    """
+    record = PaymentIntentStatus.objects.filter(payment_intent_id=payment_intent_id).first()
+    if record is None:
+        return None
+    fresh_after = timezone.now() - timedelta(seconds=settings.PAYMENT_STATUS_STALE_SECONDS)
+    if record.is_final or record.updated_at >= fresh_after:
+        return record
+    return None
+
+
+def record_status(payment_intent_id, status, source, payment_data=None):
+    """Store the latest status for an intent and return the stored record.
+
+    A final status is never replaced by a non-final one, so a late poll
+    result can't undo a webhook that already reported the payment.
+    """
+    defaults = {'status': status, 'source': source, 'payment_data': payment_data or {}}
+    with transaction.atomic():
+        record = PaymentIntentStatus.objects.select_for_update().filter(payment_intent_id=payment_intent_id).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    return PaymentIntentStatus.objects.create(payment_intent_id=payment_intent_id, **defaults)
+            except IntegrityError:
+                # A webhook and a poll created it at the same time
+                record = PaymentIntentStatus.objects.select_for_update().get(payment_intent_id=payment_intent_id)
+
+        if record.is_final and status not in PaymentIntentStatus.FINAL_STATUSES:
+            return record
+        # A paid intent stays paid even if an earlier attempt's failure arrives late
+        if record.status == PaymentIntentStatus.STATUS_SUCCEEDED and status != record.status:
+            return record
+        for field, value in defaults.items():
+            setattr(record, field, value)
+        record.save()
+        return record
@@ -0,0 +1,133 @@
+from contextlib import contextmanager
+from datetime import timedelta
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.utils import timezone
+
+from hello.utils import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+
+# Number of whole local days, ending today, covered by each report period
+REPORT_PERIOD_DAYS = {'daily': 1, 'weekly': 7, 'monthly': 30, 'yearly': 365}
+
+
+def report_window(period, today):
+    """Return ``(start_day, previous_start_day)`` for a report period ending ``today``."""
+    days = REPORT_PERIOD_DAYS[period]
+    start_day = today - timedelta(days=days - 1)
+    return start_day, start_day - timedelta(days=days)
+
+
+def _keys(period, start_day):
+    suffix = f"{period}:{start_day.isoformat()}"
+    return f"reports:{suffix}", f"reports-stamp:{suffix}", f"reports-lock:{suffix}"
+
+
+@contextmanager
+def _compute_lock(lock_key):
+    """Try to become the one process computing a report; yields whether it did.
+
+    FileBasedCache.add() is a has_key() followed by a set(), so with the
+    default cache every worker that misses at once would win it. There the
+    lock is an flock() on a file next to the cache, which the kernel grants
+    to exactly one process and releases if that process dies. Redis and
+    Memcached (and locmem) add atomically, so their ``add`` is used as is.
+    """
+    if fcntl is None or not isinstance(caches['default'], FileBasedCache):
+        acquired = cache.add(lock_key, 1, settings.REPORTS_CACHE_LOCK_TIMEOUT)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+        return
+
+    os.makedirs(settings.REPORTS_CACHE_LOCK_DIR, exist_ok=True)
+    filename = hashlib.sha1(lock_key.encode()).hexdigest() + '.lock'
+    with open(os.path.join(settings.REPORTS_CACHE_LOCK_DIR, filename), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _lookup(data_key, stamp_key):
+    """Return ``(data, stamp)``, with ``data`` ``None`` unless the entry is current."""
+    values = cache.get_many([data_key, stamp_key])
+    stamp = values.get(stamp_key)
+    entry = values.get(data_key)
+    # An entry computed before the last invalidation carries an older stamp.
+    # A missing stamp (expired or culled) can't vouch for anything.
+    if entry is not None and stamp is not None and entry['stamp'] == stamp:
+        return entry['data'], stamp
+    return None, stamp
+
+
+def get_or_compute(period, today, compute):
+    """Return ``(data, cache_hit)`` for a report, computing it at most once at a time.
+
+    Results are cached per period and window start. When several requests
+    miss together, one takes a short lock and computes while the rest wait
+    for its result; if the lock holder takes longer than
+    REPORTS_CACHE_LOCK_TIMEOUT the waiters compute it themselves.
+    """
+    start_day, _ = report_window(period, today)
+    data_key, stamp_key, lock_key = _keys(period, start_day)
+    deadline = time.monotonic() + settings.REPORTS_CACHE_LOCK_TIMEOUT
+
+    while True:
+        data, stamp = _lookup(data_key, stamp_key)
+        if data is not None:
+            metrics.record_cache('reports', True)
+            return data, True
+
+        with _compute_lock(lock_key) as acquired:
+            if acquired:
+                # The previous holder may have stored the report since the lookup above
+                data, stamp = _lookup(data_key, stamp_key)
+                if data is not None:
+                    metrics.record_cache('reports', True)
+                    return data, True
+                metrics.record_cache('reports', False)
+                if stamp is None:
+                    cache.add(stamp_key, time.time_ns(), settings.REPORTS_CACHE_TIMEOUT * 2)
+                    stamp = cache.get(stamp_key)
+                data = compute()
+                cache.set(data_key, {'stamp': stamp, 'data': data}, settings.REPORTS_CACHE_TIMEOUT)
+                return data, False
+
+        if time.monotonic() >= deadline:
+            metrics.record_cache('reports', False)
+            return compute(), False
+        time.sleep(settings.REPORTS_CACHE_WAIT_INTERVAL)
+
+
+def invalidate_days(days):
+    """Drop cached reports whose current or previous window contains any of ``days``."""
+    today = timezone.localdate()
+    for period in REPORT_PERIOD_DAYS:
+        start_day, previous_start_day = report_window(period, today)
+        if any(previous_start_day <= day <= today for day in days):
+            _, stamp_key, _ = _keys(period, start_day)
+            # Stamps outlive the entries they guard, so a stale entry is never trusted
+            cache.set(stamp_key, time.time_ns(), settings.REPORTS_CACHE_TIMEOUT * 2)
+
+
+def invalidate_all():
+    """Drop every cached report for the current windows."""
+    invalidate_days([timezone.localdate()])
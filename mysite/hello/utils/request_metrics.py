@@ -0,0 +1,94 @@
+from collections import Counter
+import contextvars
+import threading
+import time
+
+
+class RequestTimer:
+    """Wall, database and external-HTTP time for one request.
+
+    Installed as a database execute wrapper by RequestTimingMiddleware;
+    ``integrations.request`` adds its call time through ``record_external``.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_ms = 0.0
+        self.queries = 0
+        self.external_ms = 0.0
+        self.external_calls = 0
+        # SQL is parametrized at this point, so repeats of one query share a key
+        self.sql_counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+            self.sql_counts[sql] += 1
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def repeated_sql(self, limit=3):
+        """The most repeated statements as ``(count, sql)``, only those run more than once."""
+        return [(count, sql) for sql, count in self.sql_counts.most_common(limit) if count > 1]
+
+
+_current = contextvars.ContextVar('request_timer', default=None)
+
+
+def start():
+    """Begin timing the current request; pass the returned token to ``finish``."""
+    timer = RequestTimer()
+    return timer, _current.set(timer)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def record_external(elapsed_ms):
+    """Add an outbound HTTP call to the current request's timer, if there is one."""
+    timer = _current.get()
+    if timer is not None:
+        timer.external_ms += elapsed_ms
+        timer.external_calls += 1
+
+
+def _empty_stats():
+    return {'requests': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'db_ms': 0.0, 'queries': 0, 'external_ms': 0.0}
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record_request(view_name, timer, total_ms):
+    with _stats_lock:
+        stats = _stats.get(view_name)
+        if stats is None:
+            stats = _stats[view_name] = _empty_stats()
+        stats['requests'] += 1
+        stats['total_ms'] += total_ms
+        stats['max_ms'] = max(stats['max_ms'], total_ms)
+        stats['db_ms'] += timer.db_ms
+        stats['queries'] += timer.queries
+        stats['external_ms'] += timer.external_ms
+
+
+def get_stats():
+    """Per-view request counts and average timings for this process."""
+    with _stats_lock:
+        snapshot = {name: dict(stats) for name, stats in _stats.items()}
+    for stats in snapshot.values():
+        count = stats['requests']
+        stats['avg_ms'] = round(stats['total_ms'] / count, 1)
+        stats['avg_db_ms'] = round(stats['db_ms'] / count, 1)
+        stats['avg_queries'] = round(stats['queries'] / count, 1)
+        stats['avg_external_ms'] = round(stats['external_ms'] / count, 1)
+        for key in ('total_ms', 'max_ms', 'db_ms', 'external_ms'):
+            stats[key] = round(stats[key], 1)
+    return snapshot
@@ -0,0 +1,332 @@
+from collections import defaultdict
+from datetime import datetime, time as datetime_time, timedelta
+from decimal import Decimal
+from functools import reduce
+import operator
+
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from hello.models import Order, OrderItem, ProductSalesSummary, SalesSummary
+from hello.utils import report_cache
+
+
+# Orders in this status are left out of every sales figure
+EXCLUDED_STATUS = 'cancelled'
+
+SUMMARY_KEY = ('period_type', 'period_start')
+PRODUCT_KEY = SUMMARY_KEY + ('product_name', 'size')
+SUMMARY_FIELDS = ('total_amount', 'order_count', 'products_sold')
+PRODUCT_FIELDS = ('quantity', 'revenue', 'order_count')
+
+# Rounds of insert-then-lock before giving up on rows that keep vanishing
+LOCK_ATTEMPTS = 3
+
+
+def order_day(order):
+    """The local calendar day an order's sales are booked on."""
+    return timezone.localtime(order.created_at).date()
+
+
+def period_starts(day):
+    """Map each period type to the first day of the period containing ``day``."""
+    return {
+        SalesSummary.PERIOD_DAY: day,
+        SalesSummary.PERIOD_WEEK: day - timedelta(days=day.weekday()),
+        SalesSummary.PERIOD_MONTH: day.replace(day=1),
+        SalesSummary.PERIOD_YEAR: day.replace(month=1, day=1),
+    }
+
+
+def _empty(fields):
+    return {field: Decimal('0') if field in ('total_amount', 'revenue') else 0 for field in fields}
+
+
+def _order_deltas(orders, sign):
+    """Collect summary and per-product deltas for ``orders`` keyed by row identity."""
+    summary = defaultdict(lambda: _empty(SUMMARY_FIELDS))
+    products = defaultdict(lambda: _empty(PRODUCT_FIELDS))
+
+    for order in orders:
+        starts = period_starts(order_day(order))
+        lines = defaultdict(lambda: [0, Decimal('0')])
+        for item in order.order_items.all():
+            line = lines[(item.product_name, item.size or '')]
+            line[0] += item.quantity
+            line[1] += item.total_price
+        items_sold = sum(quantity for quantity, _ in lines.values())
+
+        for period_type, period_start in starts.items():
+            row = summary[(period_type, period_start)]
+            row['total_amount'] += sign * order.total_amount
+            row['order_count'] += sign
+            row['products_sold'] += sign * items_sold
+            for (product_name, size), (quantity, revenue) in lines.items():
+                product_row = products[(period_type, period_start, product_name, size)]
+                product_row['quantity'] += sign * quantity
+                product_row['revenue'] += sign * revenue
+                product_row['order_count'] += sign
+    return summary, products
+
+
+def _row_key(row, key_fields):
+    return tuple(getattr(row, field) for field in key_fields)
+
+
+def _match(key_fields, keys):
+    return reduce(operator.or_, (Q(**dict(zip(key_fields, key))) for key in keys))
+
+
+def _insert_missing(model, key_fields, keys):
+    """Insert zero rows for ``keys``, leaving any that a concurrent insert created alone."""
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in keys],
+        ignore_conflicts=True,
+    )
+
+
+def _lock_rows(model, match):
+    """Lock the rows matching ``match`` in primary-key order and return them."""
+    return list(model.objects.select_for_update().filter(match).order_by('pk'))
+
+
+def _apply(model, key_fields, value_fields, deltas):
+    """Add ``deltas`` to the matching rollup rows with a fixed number of queries.
+
+    Missing rows are inserted as zeros first (ignoring conflicts with a
+    concurrent insert), then every affected row is locked in primary-key
+    order, adjusted and written back with one bulk update. A row can be
+    deleted between the insert and the lock (``rebuild_periods`` drops rows
+    whose period is now empty), so both steps repeat until every row is held.
+    """
+    if not deltas:
+        return
+    keys = sorted(deltas)
+    match = _match(key_fields, keys)
+    missing = keys
+    for _ in range(LOCK_ATTEMPTS):
+        _insert_missing(model, key_fields, missing)
+        rows = _lock_rows(model, match)
+        locked = {_row_key(row, key_fields) for row in rows}
+        missing = [key for key in keys if key not in locked]
+        if not missing:
+            break
+    else:
+        raise DatabaseError(f"{model.__name__} rows {missing} were deleted before they could be locked")
+
+    now = timezone.now()
+    for row in rows:
+        delta = deltas[_row_key(row, key_fields)]
+        for field in value_fields:
+            setattr(row, field, getattr(row, field) + delta[field])
+        row.updated_at = now
+    model.objects.bulk_update(rows, list(value_fields) + ['updated_at'])
+
+
+def _apply_orders(orders, sign):
+    orders = list(orders)
+    if not orders:
+        return
+    summary, products = _order_deltas(orders, sign)
+    days = {order_day(order) for order in orders}
+    with transaction.atomic():
+        _apply(SalesSummary, SUMMARY_KEY, SUMMARY_FIELDS, summary)
+        _apply(ProductSalesSummary, PRODUCT_KEY, PRODUCT_FIELDS, products)
+        transaction.on_commit(lambda: report_cache.invalidate_days(days))
+
+
+def record_orders(orders):
+    """Add orders to the rollups (new orders, or orders taken out of cancelled).
+
+    Callers pass only orders that count towards sales; prefetch
+    ``order_items`` when passing several.
+    """
+    _apply_orders(orders, 1)
+
+
+def reverse_orders(orders):
+    """Remove orders from the rollups (orders being cancelled or deleted)."""
+    _apply_orders(orders, -1)
+
+
+def apply_status_change(queryset, new_status):
+    """Adjust the rollups for a bulk status change before ``queryset`` is updated."""
+    if new_status == EXCLUDED_STATUS:
+        affected = queryset.exclude(status=EXCLUDED_STATUS)
+        reverse_orders(affected.prefetch_related('order_items'))
+    else:
+        affected = queryset.filter(status=EXCLUDED_STATUS)
+        # Counted once they're back, so give them their new status first
+        orders = list(affected.prefetch_related('order_items'))
+        for order in orders:
+            order.status = new_status
+        record_orders(orders)
+
+
+def clear():
+    """Empty both rollup tables (used when every order is deleted)."""
+    ProductSalesSummary.objects.all().delete()
+    SalesSummary.objects.all().delete()
+    transaction.on_commit(report_cache.invalidate_all)
+
+
+def _roll_up(day_rows, key_fields, value_fields):
+    """Fold per-day rows into rows for every period type."""
+    rows = defaultdict(lambda: _empty(value_fields))
+    for day_row in day_rows:
+        for period_type, period_start in period_starts(day_row['day']).items():
+            key = (period_type, period_start) + tuple(day_row[field] for field in key_fields)
+            for field in value_fields:
+                rows[key][field] += day_row[field] or 0
+    return rows
+
+
+def _rolled_up_rows(orders, items):
+    """Summary and product rollup rows for the given (non-cancelled) orders and their items."""
+    local_tz = timezone.get_current_timezone()
+    order_days = (
+        orders.annotate(day=TruncDate('created_at', tzinfo=local_tz))
+        .values('day')
+        .annotate(total_amount=Sum('total_amount'), order_count=Count('id'))
+    )
+    sold_by_day = dict(
+        items.annotate(day=TruncDate('order__created_at', tzinfo=local_tz))
+        .values('day')
+        .annotate(products_sold=Sum('quantity'))
+        .values_list('day', 'products_sold')
+    )
+    summary_days = [
+        dict(row, products_sold=sold_by_day.get(row['day']) or 0)
+        for row in order_days
+    ]
+    product_days = (
+        items.annotate(day=TruncDate('order__created_at', tzinfo=local_tz))
+        .values('day', 'product_name', 'size')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('total_price'), order_count=Count('order', distinct=True))
+    )
+    # NULL and blank sizes share one row, as they do when orders are recorded
+    product_days = [dict(row, size=row['size'] or '') for row in product_days]
+
+    return _roll_up(summary_days, (), SUMMARY_FIELDS), _roll_up(product_days, ('product_name', 'size'), PRODUCT_FIELDS)
+
+
+def _create_rows(summary_rows, product_rows):
+    SalesSummary.objects.bulk_create(
+        [
+            SalesSummary(period_type=period_type, period_start=period_start, **values)
+            for (period_type, period_start), values in summary_rows.items()
+        ],
+        batch_size=500,
+    )
+    ProductSalesSummary.objects.bulk_create(
+        [
+            ProductSalesSummary(
+                period_type=period_type,
+                period_start=period_start,
+                product_name=product_name,
+                size=size,
+                **values,
+            )
+            for (period_type, period_start, product_name, size), values in product_rows.items()
+        ],
+        batch_size=500,
+    )
+
+
+def rebuild():
+    """Recompute both rollup tables from the orders table.
+
+    Returns the number of summary and product rows written.
+    """
+    summary_rows, product_rows = _rolled_up_rows(
+        Order.objects.exclude(status=EXCLUDED_STATUS),
+        OrderItem.objects.exclude(order__status=EXCLUDED_STATUS),
+    )
+    with transaction.atomic():
+        clear()
+        _create_rows(summary_rows, product_rows)
+    return len(summary_rows), len(product_rows)
+
+
+def _period_end(period_type, period_start):
+    """First day after the period starting on ``period_start``."""
+    if period_type == SalesSummary.PERIOD_DAY:
+        return period_start + timedelta(days=1)
+    if period_type == SalesSummary.PERIOD_WEEK:
+        return period_start + timedelta(days=7)
+    if period_type == SalesSummary.PERIOD_MONTH:
+        return (period_start + timedelta(days=32)).replace(day=1)
+    return period_start.replace(year=period_start.year + 1)
+
+
+def _overwrite(model, key_fields, value_fields, rows, values_by_key):
+    """Set the locked ``rows`` to ``values_by_key`` in place; delete the ones with no values left."""
+    now = timezone.now()
+    changed = []
+    emptied = []
+    for row in rows:
+        values = values_by_key.get(_row_key(row, key_fields))
+        if values is None:
+            emptied.append(row.pk)
+            continue
+        for field in value_fields:
+            setattr(row, field, values[field])
+        row.updated_at = now
+        changed.append(row)
+    model.objects.bulk_update(changed, list(value_fields) + ['updated_at'], batch_size=500)
+    if emptied:
+        model.objects.filter(pk__in=emptied).delete()
+
+
+def rebuild_periods(days):
+    """Recompute just the rollup rows of the periods containing ``days``.
+
+    Used after edits the incremental updates can't follow (an order's
+    total or items changed in the admin) and by the scheduled
+    ``rebuild_sales_summary --days`` reconcile. The rows are locked, then
+    recomputed and overwritten in place rather than deleted and re-created,
+    so an order waiting on one of those locks finds the same row afterwards
+    and adds its delta to the recomputed values. Returns the rows written.
+    """
+    days = set(days)
+    periods = {period for day in days for period in period_starts(day).items()}
+    if not periods:
+        return 0, 0
+    first_day = min(period_start for _, period_start in periods)
+    end_day = max(_period_end(period_type, period_start) for period_type, period_start in periods)
+    local_tz = timezone.get_current_timezone()
+    start = datetime.combine(first_day, datetime_time.min, tzinfo=local_tz)
+    end = datetime.combine(end_day, datetime_time.min, tzinfo=local_tz)
+    match = _match(SUMMARY_KEY, periods)
+
+    with transaction.atomic():
+        for _ in range(LOCK_ATTEMPTS):
+            summaries = _lock_rows(SalesSummary, match)
+            products = _lock_rows(ProductSalesSummary, match)
+            summary_rows, product_rows = _rolled_up_rows(
+                Order.objects.exclude(status=EXCLUDED_STATUS).filter(created_at__gte=start, created_at__lt=end),
+                OrderItem.objects.exclude(order__status=EXCLUDED_STATUS).filter(
+                    order__created_at__gte=start, order__created_at__lt=end,
+                ),
+            )
+            # The range spans whole years, so keep only the periods being rebuilt
+            summary_rows = {key: values for key, values in summary_rows.items() if key in periods}
+            product_rows = {key: values for key, values in product_rows.items() if key[:2] in periods}
+
+            # Rows for periods that had no sales yet are created, locked and recomputed
+            # on the next round, so everything written below is held by this transaction
+            missing_summaries = set(summary_rows) - {_row_key(row, SUMMARY_KEY) for row in summaries}
+            missing_products = set(product_rows) - {_row_key(row, PRODUCT_KEY) for row in products}
+            if not missing_summaries and not missing_products:
+                break
+            _insert_missing(SalesSummary, SUMMARY_KEY, sorted(missing_summaries))
+            _insert_missing(ProductSalesSummary, PRODUCT_KEY, sorted(missing_products))
+        else:
+            raise DatabaseError("rollup rows were deleted before they could be locked")
+
+        _overwrite(SalesSummary, SUMMARY_KEY, SUMMARY_FIELDS, summaries, summary_rows)
+        _overwrite(ProductSalesSummary, PRODUCT_KEY, PRODUCT_FIELDS, products, product_rows)
+        transaction.on_commit(lambda: report_cache.invalidate_days(days))
+    return len(summary_rows), len(product_rows)
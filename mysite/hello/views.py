@@ -4,9 +4,8 @@ from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.models import User
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.core.mail import send_mail
 from django.conf import settings
 from django.utils.crypto import get_random_string
 from django.urls import reverse
@@ -17,9 +16,8 @@ import os
 import time
 import json
 import random
-import threading
+import logging
 import math
-import importlib
 try:
     import requests
 except ImportError:
@@ -28,15 +26,20 @@ import hmac
 import hashlib
 import base64
 
-from .models import SignupEvent, PasswordResetToken, PendingSignup, Product, Order, OrderItem, FrontendContent
-from django.db import transaction, close_old_connections
-from django.db.models import F
+from .logging import get_logger
+from .models import SignupEvent, PasswordResetToken, PendingSignup, Product, Order, OrderItem, FrontendContent, EmailOutbox, SalesSummary, ProductSalesSummary, PaymentIntentStatus, DeletedOrder, next_stock_version
+from .utils import catalog, delivery_quotes, email_dispatch, email_templates, integrations, metrics, order_events, outbox, payments, report_cache, sales_rollup
+from .utils.outbox import enqueue_email
+from django.db import transaction
+from django.db.models import Avg, Count, F, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.templatetags.static import static
-from django.core.mail import EmailMultiAlternatives
 from django.contrib.staticfiles import finders
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.contrib.auth.hashers import make_password
 
+log = get_logger(__name__)
+
 
 def _paymongo_auth_header(api_key):
     """Build valid PayMongo Basic auth header from key."""
@@ -44,6 +47,13 @@ def _paymongo_auth_header(api_key):
     return f"Basic {token}"
 
 
+def _integration_unavailable_response(exc):
+    """503 for a payment call refused because the provider's circuit breaker is open."""
+    response = JsonResponse({'success': False, 'error': 'Payment service is temporarily unavailable. Please try again shortly.'}, status=503)
+    response['Retry-After'] = str(max(1, math.ceil(exc.retry_after)))
+    return response
+
+
 def _haversine_distance_km(origin, destination):
     """Compute straight-line distance in kilometers between two lat/lng pairs."""
     lat1 = math.radians(float(origin['lat']))
@@ -67,76 +77,6 @@ def _calculate_local_delivery_fee(origin, destination, distance_km=None):
     return round(fee, 2), round(distance_km, 2)
 
 
-def _build_receipt_email_html(order_id, customer_name, order_type_display, payment_method, total_amount, items_text):
-    """Build HTML e-receipt email content."""
-    return f"""<!doctype html>
-<html>
-  <body style="margin:0;padding:0;background:#f7f7f8;font-family:Inter,Segoe UI,Roboto,Arial,sans-serif;color:#111;">
-    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
-      <tr>
-        <td align="center" style="padding:24px;">
-          <table role="presentation" cellpadding="0" cellspacing="0" width="560" style="background:#ffffff;border-radius:12px;box-shadow:0 2px 12px rgba(0,0,0,.06);overflow:hidden;">
-            <tr>
-              <td align="center" style="padding:28px 28px 8px 28px;">
-                <h1 style="margin:16px 0 0 0;font-size:22px;line-height:28px;color:#d63384;">Your E-Receipt</h1>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                <p>Dear {customer_name},</p>
-                <p>Thank you for your order with Mother Julie. Here is your e-receipt:</p>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                <div style="background-color:#f8f9fa;padding:15px;border-radius:5px;margin:20px 0;">
-                  <p style="margin:8px 0;"><strong>Order ID:</strong> {order_id}</p>
-                  <p style="margin:8px 0;"><strong>Order Type:</strong> {order_type_display}</p>
-                  <p style="margin:8px 0;"><strong>Payment Method:</strong> {payment_method}</p>
-                  <p style="margin:8px 0;"><strong>Status:</strong> <span style="color:#d63384;font-weight:bold;">Order Placed</span></p>
-                  <p style="margin:8px 0;"><strong>Total Amount:</strong> Php {total_amount:.2f}</p>
-                </div>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                <h4 style="color:#333;margin-top:20px;margin-bottom:10px;">Order Items:</h4>
-                <div style="background-color:#ffffff;padding:10px;border-left:3px solid #d63384;margin-top:10px;">
-                  {items_text.replace(chr(10), '<br>')}
-                </div>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 24px 28px;font-size:14px;line-height:22px;color:#333;">
-                <p>Please keep this email for your reference.</p>
-              </td>
-            </tr>
-          </table>
-        </td>
-      </tr>
-    </table>
-  </body>
-</html>"""
-
-
-def _build_receipt_email_plain(customer_name, order_id, order_type_display, payment_method, total_amount, items_text):
-    """Build plain text e-receipt email content."""
-    return f"""Dear {customer_name},
-
-Thank you for your order with Mother Julie. Here is your e-receipt:
-
-Order ID: {order_id}
-Order Type: {order_type_display}
-Payment Method: {payment_method}
-Status: Order Placed
-Total Amount: Php {total_amount:.2f}
-
-Order Items:
-{items_text}
-
-Please keep this email for your reference."""
-
-
 def _format_payment_method_display(payment_method):
     """Format payment method labels for customer-facing text."""
     normalized = str(payment_method or '').strip().lower().replace('_', ' ')
@@ -149,70 +89,43 @@ def _format_payment_method_display(payment_method):
     return payment_method_map.get(normalized, normalized.title())
 
 
-def _send_order_receipt_email_sync(subject, html_message, plain_message, customer_email, order_id):
-    """Send e-receipt email in a background thread."""
-    close_old_connections()
-    try:
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=plain_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[customer_email]
-        )
-        email.attach_alternative(html_message, "text/html")
-        email.send(fail_silently=False)
-        print(f"[RECEIPT] E-receipt sent to {customer_email} for order {order_id}")
-    except Exception as exc:
-        print(f"[RECEIPT ERROR] Failed to send e-receipt for order {order_id}: {exc}")
-
+def send_order_receipt_email(order, items):
+    """Queue the e-receipt email for an order that was just placed.
 
-def send_order_receipt_email(order, items, send_async=False):
-    """Send e-receipt email after an order is successfully placed."""
+    Call inside the order's transaction; the outbox worker delivers it.
+    """
     customer_email = (order.customer_email or '').strip()
     if not customer_email:
-        print(f"[RECEIPT] Skipping e-receipt for order {order.order_id}: no customer email")
+        log.info("e-receipt skipped, no customer email", order_id=order.order_id)
         return
 
-    items_list = []
+    items_lines = []
     for item in items:
         item_text = f"- {item.get('name', '')} x {int(item.get('quantity', 1))}"
         if item.get('size'):
             item_text += f" (Size: {item.get('size')})"
         item_text += f" - Php {float(item.get('total', 0)):.2f}"
-        items_list.append(item_text)
-    items_text = "\n".join(items_list)
-
-    order_type_display = dict(Order.ORDER_TYPE_CHOICES).get(order.order_type, order.order_type)
-    payment_method_display = _format_payment_method_display(order.payment_method)
-    subject = f"[E-RECEIPT] Order {order.order_id} - Mother Julie"
-    html_message = _build_receipt_email_html(
-        order.order_id,
-        order.customer_name,
-        order_type_display,
-        payment_method_display,
-        float(order.total_amount),
-        items_text
-    )
-    plain_message = _build_receipt_email_plain(
-        order.customer_name,
-        order.order_id,
-        order_type_display,
-        payment_method_display,
-        float(order.total_amount),
-        items_text
+        items_lines.append(item_text)
+
+    email = email_templates.render(
+        'order_receipt',
+        order_id=order.order_id,
+        customer_name=order.customer_name,
+        order_type=Order.ORDER_TYPE_LABELS.get(order.order_type, order.order_type),
+        payment_method=_format_payment_method_display(order.payment_method),
+        total_amount=f"{float(order.total_amount):.2f}",
+        items=items_lines,
     )
 
-    if send_async:
-        email_thread = threading.Thread(
-            target=_send_order_receipt_email_sync,
-            args=(subject, html_message, plain_message, customer_email, order.order_id),
-            daemon=False,
-            name=f"ReceiptEmailThread-{order.order_id}"
-        )
-        email_thread.start()
-        return
-
-    _send_order_receipt_email_sync(subject, html_message, plain_message, customer_email, order.order_id)
+    enqueue_email(
+        customer_email,
+        email.subject,
+        email.text,
+        email.html,
+        kind=EmailOutbox.KIND_RECEIPT,
+        order=order,
+    )
+    log.info("e-receipt queued", order_id=order.order_id, to=customer_email)
 
 @csrf_exempt
 def signin(request):
@@ -283,59 +196,25 @@ def signin(request):
     return render(request, "signin.html")
 
 
-def _send_signup_otp_email(recipient_email, otp_code):
-    subject = "Mother Julie account verification code"
-    html_content = f"""
-    <h2>Welcome to Mother Julie!</h2>
-    <p>Your verification code is:</p>
-    <h1>{otp_code}</h1>
-    <p>This code expires in 10 minutes.</p>
+def _queue_signup_otp(pending):
+    """Give ``pending`` a fresh code and queue its email; call inside a transaction and save after.
+
+    The email goes through the outbox, so the request never waits on the provider.
     """
-    plain_content = (
-        "Welcome to Mother Julie!\n\n"
-        f"Your verification code is: {otp_code}\n"
-        "This code expires in 10 minutes."
+    pending.otp_code = f"{random.randint(0, 999999):06d}"
+    pending.otp_expires_at = timezone.now() + timedelta(minutes=10)
+    pending.otp_attempts = 0
+    email = email_templates.render('signup_otp', otp_code=pending.otp_code)
+    pending.otp_email = enqueue_email(
+        pending.email, email.subject, email.text, email.html, kind=EmailOutbox.KIND_SIGNUP_OTP
     )
 
-    # Prefer Brevo transactional API when SDK + key are available.
-    try:
-        sib_api_v3_sdk = importlib.import_module("sib_api_v3_sdk")
-
-        if settings.BREVO_API_KEY:
-            configuration = sib_api_v3_sdk.Configuration()
-            configuration.api_key['api-key'] = settings.BREVO_API_KEY
-
-            api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-                sib_api_v3_sdk.ApiClient(configuration)
-            )
-
-            send_email = sib_api_v3_sdk.SendSmtpEmail(
-                to=[{"email": recipient_email}],
-                sender={
-                    "name": "Mother Julie",
-                    "email": settings.DEFAULT_FROM_EMAIL
-                },
-                subject=subject,
-                html_content=html_content
-            )
-            api_instance.send_transac_email(send_email)
-            return True
-    except Exception as e:
-        print("Brevo send failed, falling back to SMTP:", e)
 
-    # Fallback to Django email backend (SMTP/Brevo relay, Gmail, etc.).
-    try:
-        send_mail(
-            subject,
-            plain_content,
-            settings.DEFAULT_FROM_EMAIL,
-            [recipient_email],
-            fail_silently=False,
-        )
-        return True
-    except Exception as e:
-        print("OTP email fallback failed:", e)
-        return False
+def _otp_status_payload(pending):
+    return {
+        "otp_status": pending.otp_email.status if pending.otp_email else None,
+        "resend_in": pending.otp_resend_wait_seconds(),
+    }
 
 
 @csrf_exempt
@@ -398,31 +277,26 @@ def signup_view(request):
             return render(request, 'signup.html')
 
         try:
-            otp_code = f"{random.randint(0, 999999):06d}"
-            PendingSignup.objects.update_or_create(
-                email=email,
-                defaults={
-                    "first_name": first_name,
-                    "last_name": last_name,
-                    "username": username,
-                    "password_hash": make_password(password1),
-                    "otp_code": otp_code,
-                    "otp_expires_at": timezone.now() + timedelta(minutes=10),
-                    "otp_attempts": 0,
-                },
-            )
-
-            success = _send_signup_otp_email(email, otp_code)
-
-            if not success:
-                if is_json:
-                    return JsonResponse({"success": False, "message": "Failed to send OTP email."}, status=500)
-                messages.error(request, "Failed to send OTP email.")
-                return render(request, 'signup.html')
+            password_hash = make_password(password1)
+            with transaction.atomic():
+                pending = (
+                    PendingSignup.objects.select_for_update(of=('self',))
+                    .select_related('otp_email')
+                    .filter(email=email)
+                    .first()
+                ) or PendingSignup(email=email)
+                pending.first_name = first_name
+                pending.last_name = last_name
+                pending.username = username
+                pending.password_hash = password_hash
+                # Signing up again right after the first attempt keeps the code already on its way
+                if pending.otp_resend_wait_seconds() == 0:
+                    _queue_signup_otp(pending)
+                pending.save()
 
             request.session['pending_signup_email'] = email
             if is_json:
-                return JsonResponse({"success": True, "message": "OTP sent to your email.", "email": email})
+                return JsonResponse({"success": True, "message": "OTP sent to your email.", "email": email, **_otp_status_payload(pending)})
             messages.success(request, 'A verification code has been sent to your email.')
             return redirect('verify_signup_otp')
         except Exception as e:
@@ -465,15 +339,26 @@ def verify_signup_otp(request):
             return redirect('signup')
 
         if action == 'resend':
-            otp_code = f"{random.randint(0, 999999):06d}"
-            pending.otp_code = otp_code
-            pending.otp_expires_at = timezone.now() + timedelta(minutes=10)
-            pending.otp_attempts = 0
-            pending.save(update_fields=['otp_code', 'otp_expires_at', 'otp_attempts', 'updated_at'])
-            _send_signup_otp_email(email, otp_code)
+            with transaction.atomic():
+                pending = (
+                    PendingSignup.objects.select_for_update(of=('self',))
+                    .select_related('otp_email')
+                    .get(pk=pending.pk)
+                )
+                wait = pending.otp_resend_wait_seconds()
+                if wait == 0:
+                    _queue_signup_otp(pending)
+                    pending.save(update_fields=['otp_code', 'otp_expires_at', 'otp_attempts', 'otp_email', 'updated_at'])
             request.session['pending_signup_email'] = email
+            if wait:
+                # Repeated clicks while the last code is still fresh don't queue another email
+                message = f"A code was sent recently. You can request a new one in {wait} seconds."
+                if is_json:
+                    return JsonResponse({"success": True, "message": message, **_otp_status_payload(pending)})
+                messages.info(request, message)
+                return redirect('verify_signup_otp')
             if is_json:
-                return JsonResponse({"success": True, "message": "New OTP sent to your email."})
+                return JsonResponse({"success": True, "message": "New OTP sent to your email.", **_otp_status_payload(pending)})
             messages.success(request, 'A new verification code has been sent.')
             return redirect('verify_signup_otp')
 
@@ -544,6 +429,19 @@ def verify_signup_otp(request):
     return render(request, 'verify_signup_otp.html', {'email': prefill_email})
 
 
+def api_signup_otp_status(request):
+    """Delivery status of the current signup code, polled by the OTP page.
+
+    Only the signup started in this session is reported; taking the email
+    from the query string would tell anyone which addresses are signing up.
+    """
+    email = request.session.get('pending_signup_email')
+    pending = PendingSignup.objects.select_related('otp_email').filter(email=email).first() if email else None
+    if pending is None:
+        return JsonResponse({'error': 'Not found'}, status=404)
+    return JsonResponse(_otp_status_payload(pending))
+
+
 def logout_view(request):
     """Handle user logout"""
     logout(request)
@@ -611,50 +509,40 @@ def pickup_view(request):
 @login_required
 def redirect_to_order(request):
     """Redirect user to their appropriate order tracking page"""
-    print(f"DEBUG: redirect_to_order called for user: {request.user.username}")
-    
     try:
         # Get the user's most recent order
         latest_order = Order.objects.filter(
             user=request.user
         ).order_by('-created_at').first()
         
-        print(f"DEBUG: Latest order found: {latest_order}")
-        
         if not latest_order:
-            print("DEBUG: No orders found for user - redirecting to dashboard with message")
+            log.debug("redirect_to_order: no orders", user=request.user.username)
             messages.info(request, "📦 You don't have any orders yet. Click 'OUR MENU' to place your first order!")
             return redirect('dashboard')
 
         # If the latest order is already completed/cancelled, consider it as no active order
         completed_statuses = ['delivered', 'picked_up', 'cancelled']
         if latest_order.status in completed_statuses:
-            print(f"DEBUG: Latest order {latest_order.order_id} status is '{latest_order.status}' (completed). Showing no existing order.")
+            log.debug("redirect_to_order: latest order is finished", user=request.user.username, order_id=latest_order.order_id, status=latest_order.status)
             messages.info(request, "📦 No active orders at the moment. Click 'OUR MENU' to create a new order.")
             return redirect('dashboard')
 
         order_id = latest_order.order_id
         order_type = latest_order.order_type
-        
-        print(f"DEBUG: Order ID: {order_id}, Type: {order_type}")
+        log.debug("redirect_to_order", user=request.user.username, order_id=order_id, order_type=order_type)
         
         # Redirect based on order type
         if order_type == 'delivery':
-            print("DEBUG: Redirecting to DELIVERY")
             return redirect(f'/delivery/?orderId={order_id}')
         elif order_type == 'pickup':
-            print("DEBUG: Redirecting to PICKUP")
             return redirect(f'/pick_up/?orderId={order_id}')
         else:
             # Dine-in and unknown order types are not currently trackable in dedicated route
-            print(f"DEBUG: Order type '{order_type}' is not trackable; redirecting to dashboard")
             messages.info(request, "📦 No active trackable order found. Click 'OUR MENU' to place an order.")
             return redirect('dashboard')
             
-    except Exception as e:
-        print(f"DEBUG: Exception occurred: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        log.exception("redirect_to_order failed", user=request.user.username)
         messages.error(request, "❌ Could not load your orders. Please try again.")
         return redirect('dashboard')
     
@@ -712,77 +600,39 @@ def request_password_reset(request):
             messages.error(request, 'Please enter your email address.')
             return render(request, 'reset_password.html')
 
+        started = time.monotonic()
         user = User.objects.filter(email__iexact=email, is_active=True).first()
-        token = get_random_string(50)
-
         if user:
             try:
-                reset_token, _ = PasswordResetToken.objects.update_or_create(
-                    user=user,
-                    defaults={'token': token}
-                )
-
-                reset_url = request.build_absolute_uri(
-                    reverse('reset_password_confirm', kwargs={'token': token})
-                )
-
-                subject = 'Reset Your Password - Mother Julie'
-                html_message = f"""
-<!doctype html>
-<html>
-  <body style="margin:0;padding:0;background:#f7f7f8;font-family:Inter,Segoe UI,Roboto,Arial,sans-serif;color:#111;">
-    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
-      <tr>
-        <td align="center" style="padding:24px;">
-          <table role="presentation" cellpadding="0" cellspacing="0" width="560" style="background:#ffffff;border-radius:12px;box-shadow:0 2px 12px rgba(0,0,0,.06);overflow:hidden;">
-            <tr>
-              <td align="center" style="padding:28px 28px 8px 28px;">
-                <h1 style="margin:16px 0 0 0;font-size:22px;line-height:28px;color:#ff5b89;">Reset your password</h1>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                We received a request to reset the password for your account. If you didn’t request this, ignore this email.
-              </td>
-            </tr>
-            <tr>
-              <td align="center" style="padding:24px 28px 8px 28px;">
-                <a href="{reset_url}" style="display:inline-block;background:#ff5b89;color:#fff;text-decoration:none;padding:12px 18px;border-radius:8px;font-weight:600;">Reset Password</a>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:6px 28px 20px 28px;font-size:12px;line-height:18px;color:#666;">Link expires in 1 hour.</td>
-            </tr>
-            <tr>
-              <td style="padding:0 28px 24px 28px;font-size:12px;line-height:18px;color:#666;">If button doesn't work, visit: <a href="{reset_url}" style="color:#ff5b89;word-break:break-all;">{reset_url}</a></td>
-            </tr>
-          </table>
-          <div style="padding:14px 0 0 0;font-size:11px;color:#9aa0a6;">Sent by Mother Julie • Do not reply.</div>
-        </td>
-      </tr>
-    </table>
-  </body>
-</html>
-"""
-
-                msg = EmailMultiAlternatives(
-                    subject=subject,
-                    body=f"Reset your password here: {reset_url}",
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[user.email],
-                )
-                msg.attach_alternative(html_message, 'text/html')
-                msg.send(fail_silently=False)
-
-            except Exception as e:
-                # For debugging, log the exception (console + Django logs)
-                import traceback
-                traceback.print_exc()
-                error_message = str(e)
-                if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-                    return JsonResponse({'success': False, 'message': f'Unable to send reset email. {error_message}'})
-                messages.error(request, f'Unable to send reset email. {error_message}')
-                return render(request, 'reset_password.html')
+                with transaction.atomic():
+                    # A link queued moments ago is still valid; don't replace it on repeated clicks
+                    recently_sent = EmailOutbox.objects.filter(
+                        kind=EmailOutbox.KIND_PASSWORD_RESET,
+                        to_email=user.email,
+                        created_at__gte=timezone.now() - timedelta(seconds=settings.OTP_RESEND_WINDOW_SECONDS),
+                    ).exclude(status=EmailOutbox.STATUS_DEAD).exists()
+                    if not recently_sent:
+                        token = get_random_string(50)
+                        PasswordResetToken.objects.update_or_create(
+                            user=user,
+                            defaults={'token': token}
+                        )
+                        reset_url = request.build_absolute_uri(
+                            reverse('reset_password_confirm', kwargs={'token': token})
+                        )
+                        reset_email = email_templates.render('password_reset', reset_url=reset_url)
+                        enqueue_email(
+                            user.email, reset_email.subject, reset_email.text, reset_email.html,
+                            kind=EmailOutbox.KIND_PASSWORD_RESET,
+                        )
+            except Exception:
+                # Answer exactly as for an unknown address so the response doesn't reveal the account
+                log.exception("password reset email not queued", user_id=user.pk)
+
+        # The outbox keeps the provider out of the request; padding hides the remaining DB work
+        remaining = settings.PASSWORD_RESET_MIN_RESPONSE_SECONDS - (time.monotonic() - started)
+        if remaining > 0:
+            time.sleep(remaining)
 
         if request.headers.get('x-requested-with') == 'XMLHttpRequest':
             return JsonResponse({'success': True, 'message': 'If an account exists, a reset link has been sent.'})
@@ -869,7 +719,7 @@ def api_update_product_image(request, product_id):
                 if product.image:
                     image_url = request.build_absolute_uri(product.image.url)
             except Exception as e:
-                print(f"Error getting image URL: {e}")
+                log.warning("product image URL unavailable", product_id=product.id, error=e)
             return JsonResponse({
                 'success': True,
                 'image_url': image_url,
@@ -925,6 +775,95 @@ def admin_logout(request):
     return redirect('signin')
 
 
+def _reserve_order_items(order, items):
+    """Create the order lines and decrement stock for every product in the cart.
+
+    All referenced products are locked with a single SELECT ... FOR UPDATE in
+    primary-key order, so concurrent orders always take row locks in the same
+    order and cannot deadlock each other. Lines are written with one
+    bulk_create and each product gets one UPDATE that clamps stock at zero.
+    Must be called inside a transaction. Returns the updated stock info keyed
+    by product id.
+    """
+    lines = []
+    product_ids = set()
+    product_names = set()
+    for item in items:
+        product_id = item.get('product_id')
+        name = item.get('name', '')
+        try:
+            product_id = int(product_id) if product_id else None
+        except (TypeError, ValueError):
+            product_id = None
+        if product_id:
+            product_ids.add(product_id)
+        if name:
+            product_names.add(name)
+        lines.append((item, product_id, name))
+
+    products_by_id = {}
+    products_by_name = {}
+    if product_ids or product_names:
+        locked_products = Product.objects.select_for_update().filter(
+            Q(id__in=product_ids) | Q(name__in=product_names)
+        ).order_by('pk')
+        for product in locked_products:
+            products_by_id[product.id] = product
+            products_by_name.setdefault(product.name, product)
+
+    order_items = []
+    decrements = {}
+    for item, product_id, name in lines:
+        qty = int(item.get('quantity', 1))
+        unit_price = item.get('price', 0)
+        total_price = item.get('total', 0)
+        size = item.get('size', '')
+
+        # Match by ID first, then by name
+        product = products_by_id.get(product_id) or products_by_name.get(name)
+        if product:
+            # Use actual product data if not provided in request
+            if not name: name = product.name
+            if not unit_price: unit_price = product.price
+            if not total_price: total_price = float(unit_price) * qty
+            decrements[product.id] = decrements.get(product.id, 0) + qty
+        else:
+            log.warning("order item has no matching product, stock not reserved", order_id=order.order_id, product_id=product_id, name=name)
+
+        order_items.append(OrderItem(
+            order=order,
+            product_name=name,
+            quantity=qty,
+            unit_price=unit_price,
+            total_price=total_price,
+            size=size
+        ))
+
+    OrderItem.objects.bulk_create(order_items)
+
+    updated_stocks = {}
+    for product_id in sorted(decrements):
+        qty = decrements[product_id]
+        product = products_by_id[product_id]
+        if qty > product.stock_quantity:
+            metrics.inc('hello_stock_conflicts_total')
+        # The row is locked, so the clamped value computed here is what the UPDATE writes
+        Product.objects.filter(pk=product_id).update(
+            stock_quantity=Greatest(F('stock_quantity') - qty, Value(0)),
+            stock_version=next_stock_version(),
+        )
+        updated_stocks[product_id] = {
+            'name': product.name,
+            'stock': max(product.stock_quantity - qty, 0),
+            'is_active': product.is_active,
+            'show_in_all_menu': product.show_in_all_menu
+        }
+    if updated_stocks:
+        # Stock shows on the public menu, so cached catalogs are now stale
+        catalog.bump_catalog_version()
+    return updated_stocks
+
+
 @csrf_exempt
 def api_create_order(request):
     """Create an order from frontend JSON"""
@@ -932,17 +871,13 @@ def api_create_order(request):
         return JsonResponse({'success': False, 'error': 'Invalid method'}, status=405)
 
     try:
-        print("=== DEBUG: api_create_order called ===")  # ADD THIS
         data = json.loads(request.body.decode('utf-8'))
-        print("Received data:", data)  # ADD THIS
+        log.debug("api_create_order payload", data=data)
 
         items = data.get('items', [])
         total_amount = data.get('totalAmount', 0)
         order_type = data.get('orderType', '')
         payment_method = data.get('paymentMethod', 'Cash')
-
-        print(f"Items: {items}")  # ADD THIS
-        print(f"Total: {total_amount}, Type: {order_type}, Payment: {payment_method}")  # ADD THIS
         
         # Generate unique order ID
         order_id = 'MJ' + str(int(timezone.now().timestamp())) + str(random.randint(100, 999))
@@ -955,11 +890,8 @@ def api_create_order(request):
             customer_email = request.user.email
         else:
             customer_email = data.get('customerEmail', None)
-        print(f"Customer: {customer_name}, User: {request.user}, Email: {customer_email}")  # ADD THIS
-
 
         with transaction.atomic():
-            print("Creating order...")  # ADD THIS
             order = Order.objects.create(
                 order_id=order_id,
                 user=request.user if request.user.is_authenticated else None,
@@ -970,88 +902,24 @@ def api_create_order(request):
                 total_amount=total_amount,
                 status='order_placed'
             )
-            print(f"Order created: {order.order_id}")  # ADD THIS
-
-
-            for item in items:
-                product_id = item.get('product_id')
-                name = item.get('name', '')
-                qty = int(item.get('quantity', 1))
-                unit_price = item.get('price', 0)
-                total_price = item.get('total', 0)
-                size = item.get('size', '')
-
-                # Try to find product by ID first, then by name
-                product = None
-                if product_id:
-                    try:
-                        product = Product.objects.select_for_update().get(id=product_id)
-                    except Product.DoesNotExist:
-                        pass
-
-                if not product and name:
-                    try:
-                        product = Product.objects.select_for_update().get(name=name)
-                    except Product.DoesNotExist:
-                        pass
-
-                if product:
-                    # Use actual product data if not provided in request
-                    if not name: name = product.name
-                    if not unit_price: unit_price = product.price
-                    if not total_price: total_price = float(unit_price) * qty
-
-                print(f"Creating order item: {name} (ID: {product_id}) x {qty}")
-
-                # Save order line
-                OrderItem.objects.create(
-                    order=order,
-                    product_name=name,
-                    quantity=qty,
-                    unit_price=unit_price,
-                    total_price=total_price,
-                    size=size
-                )
 
-                # Decrement stock
-                if product:
-                    product.stock_quantity = F('stock_quantity') - qty
-                    product.save(update_fields=['stock_quantity'])
-                    product.refresh_from_db(fields=['stock_quantity'])
-                    if product.stock_quantity < 0:
-                        product.stock_quantity = 0
-                        product.save(update_fields=['stock_quantity'])
-                else:
-                    print(f"Product '{name}' (ID: {product_id}) not found, skipping stock update")
+            updated_stocks = _reserve_order_items(order, items)
+            sales_rollup.record_orders([order])
+            send_order_receipt_email(order, items)
 
-        print("=== DEBUG: Order creation SUCCESS ===")  # ADD THIS
-        
-        # Get updated stock information for all products in the order
-        updated_stocks = {}
-        for item in items:
-            name = item.get('name', '')
-            try:
-                product = Product.objects.get(name=name)
-                updated_stocks[product.id] = {
-                    'name': product.name,
-                    'stock': product.stock_quantity,
-                    'is_active': product.is_active,
-                    'show_in_all_menu': product.show_in_all_menu
-                }
-            except Product.DoesNotExist:
-                pass
+        metrics.inc('hello_orders_created_total', order_type=order_type, status=order.status)
+        log.info(
+            "order created", order_id=order_id, order_type=order_type, payment=payment_method,
+            items=len(items), total=total_amount, user=customer_name,
+        )
 
-        send_order_receipt_email(order, items, send_async=False)
-        
         return JsonResponse({
             'success': True, 
             'orderId': order_id,
             'updated_stocks': updated_stocks
         })
     except Exception as e:
-        print(f"=== DEBUG: ERROR - {str(e)} ===")  # ADD THIS
-        import traceback
-        traceback.print_exc()  # ADD THIS
+        log.exception("api_create_order failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 
@@ -1098,6 +966,21 @@ def api_calculate_delivery_fee(request):
                 'deliveryFee': fallback_fee,
                 'source': 'local_fallback',
                 'distanceKm': distance_km,
+                'cached': False,
+            })
+
+        # Nearby addresses (same ~50 m cells) reuse a quoted fee while Lalamove still honours it.
+        # It is an estimate: another customer's quotation payload is never handed out.
+        service_type = 'MOTORCYCLE'
+        cached_quote = delivery_quotes.get_cached_quote(origin, destination, service_type)
+        if cached_quote:
+            return JsonResponse({
+                'success': True,
+                'deliveryFee': cached_quote['deliveryFee'],
+                'source': 'lalamove',
+                'distanceKm': distance_km,
+                'cached': True,
+                'estimate': True,
             })
 
         host = 'https://rest.lalamove.com' if mode == 'production' else 'https://rest.sandbox.lalamove.com'
@@ -1109,7 +992,7 @@ def api_calculate_delivery_fee(request):
                 {'location': origin},
                 {'location': destination}
             ],
-            'serviceType': 'MOTORCYCLE',
+            'serviceType': service_type,
             'specialRequests': []
         }
 
@@ -1126,7 +1009,17 @@ def api_calculate_delivery_fee(request):
             'X-LLM-Signature': signature,
         }
 
-        response = requests.post(url, headers=headers, data=body_text, timeout=15)
+        try:
+            response = integrations.request(integrations.LALAMOVE, 'POST', url, headers=headers, data=body_text)
+        except integrations.IntegrationUnavailable:
+            return JsonResponse({
+                'success': True,
+                'deliveryFee': fallback_fee,
+                'source': 'local_fallback',
+                'distanceKm': distance_km,
+                'warning': 'Lalamove is temporarily unavailable. Using local fallback fee.',
+                'cached': False,
+            })
         response_data = response.json() if response.content else {}
 
         if response.status_code not in (200, 201):
@@ -1137,6 +1030,7 @@ def api_calculate_delivery_fee(request):
                 'distanceKm': distance_km,
                 'warning': 'Lalamove API returned an error. Using local fallback fee.',
                 'details': response_data,
+                'cached': False,
             })
 
         # Lalamove quotation response usually contains totalFee in PHP
@@ -1149,6 +1043,7 @@ def api_calculate_delivery_fee(request):
             source = 'local_fallback'
         else:
             source = 'lalamove'
+            delivery_quotes.cache_quote(origin, destination, service_type, round(float(delivery_fee), 2), distance_km)
 
         return JsonResponse({
             'success': True,
@@ -1156,11 +1051,11 @@ def api_calculate_delivery_fee(request):
             'source': source,
             'distanceKm': distance_km,
             'raw': response_data,
+            'cached': False,
         })
 
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_calculate_delivery_fee failed")
         try:
             fallback_fee, distance_km = _calculate_local_delivery_fee(origin, destination)
             return JsonResponse({
@@ -1169,6 +1064,7 @@ def api_calculate_delivery_fee(request):
                 'source': 'local_fallback',
                 'distanceKm': distance_km,
                 'warning': str(e),
+                'cached': False,
             })
         except Exception:
             return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -1218,17 +1114,28 @@ def api_create_payment_intent(request):
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = integrations.request(integrations.PAYMONGO, 'POST', url, headers=headers, json=payload)
         response_data = response.json() if response.content else {}
 
         if response.status_code not in (200, 201):
             return JsonResponse({'success': False, 'error': 'PayMongo API returned error', 'details': response_data}, status=response.status_code)
 
-        return JsonResponse({'success': True, 'paymentIntent': response_data.get('data', {})})
+        payment_intent = response_data.get('data', {})
+        if payment_intent.get('id'):
+            # Lets the first status polls for this intent be answered locally
+            payments.record_status(
+                payment_intent['id'],
+                payment_intent.get('attributes', {}).get('status', 'unknown'),
+                PaymentIntentStatus.SOURCE_API,
+                payment_intent,
+            )
+
+        return JsonResponse({'success': True, 'paymentIntent': payment_intent})
 
+    except integrations.IntegrationUnavailable as e:
+        return _integration_unavailable_response(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_create_payment_intent failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
@@ -1272,7 +1179,7 @@ def api_create_qr_payment_method(request):
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = integrations.request(integrations.PAYMONGO, 'POST', url, headers=headers, json=payload)
         response_data = response.json() if response.content else {}
 
         if response.status_code not in (200, 201):
@@ -1280,9 +1187,10 @@ def api_create_qr_payment_method(request):
 
         return JsonResponse({'success': True, 'paymentMethod': response_data.get('data', {})})
 
+    except integrations.IntegrationUnavailable as e:
+        return _integration_unavailable_response(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_create_qr_payment_method failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
@@ -1326,7 +1234,7 @@ def api_attach_payment_method(request):
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(url, headers=headers, json=payload, timeout=15)
+        response = integrations.request(integrations.PAYMONGO, 'POST', url, headers=headers, json=payload)
         response_data = response.json() if response.content else {}
 
         if response.status_code not in (200, 201):
@@ -1334,16 +1242,30 @@ def api_attach_payment_method(request):
 
         return JsonResponse({'success': True, 'result': response_data.get('data', {})})
 
+    except integrations.IntegrationUnavailable as e:
+        return _integration_unavailable_response(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_attach_payment_method failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
 @csrf_exempt
 def api_check_payment_status(request, payment_intent_id):
-    """Check PayMongo payment intent status"""
+    """Check PayMongo payment intent status.
+
+    Answered from PaymentIntentStatus (kept current by the PayMongo
+    webhook); PayMongo itself is only asked when the stored status is
+    missing or stale.
+    """
     try:
+        record = payments.get_local_status(payment_intent_id)
+        if record is not None:
+            return JsonResponse({
+                'success': True,
+                'status': record.status,
+                'payment_data': record.payment_data,
+            })
+
         secret_key = settings.PAYMONGO_SECRET_KEY
         mode = settings.PAYMONGO_MODE
 
@@ -1361,7 +1283,7 @@ def api_check_payment_status(request, payment_intent_id):
             'Content-Type': 'application/json'
         }
 
-        response = requests.get(url, headers=headers, timeout=15)
+        response = integrations.request(integrations.PAYMONGO, 'GET', url, headers=headers)
         response_data = response.json() if response.content else {}
 
         if response.status_code != 200:
@@ -1369,19 +1291,58 @@ def api_check_payment_status(request, payment_intent_id):
 
         payment_data = response_data.get('data', {})
         status = payment_data.get('attributes', {}).get('status', 'unknown')
+        # A webhook may have settled the intent meanwhile; the stored record wins then
+        record = payments.record_status(payment_intent_id, status, PaymentIntentStatus.SOURCE_API, payment_data)
 
         return JsonResponse({
             'success': True,
-            'status': status,
-            'payment_data': payment_data
+            'status': record.status,
+            'payment_data': record.payment_data
         })
 
+    except integrations.IntegrationUnavailable as e:
+        # Better an older answer than none while PayMongo is unreachable
+        record = PaymentIntentStatus.objects.filter(payment_intent_id=payment_intent_id).first()
+        if record is not None:
+            return JsonResponse({'success': True, 'status': record.status, 'payment_data': record.payment_data})
+        return _integration_unavailable_response(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_check_payment_status failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@csrf_exempt
+def api_paymongo_webhook(request):
+    """Receive PayMongo ``payment.paid`` / ``payment.failed`` events.
+
+    Register this URL in the PayMongo dashboard and set
+    PAYMONGO_WEBHOOK_SECRET to the webhook's secret key.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid method'}, status=405)
+
+    if not payments.verify_webhook_signature(request.body, request.headers.get('Paymongo-Signature', '')):
+        return JsonResponse({'success': False, 'error': 'Invalid signature'}, status=401)
+
+    try:
+        event = json.loads(request.body.decode('utf-8')).get('data', {}).get('attributes', {})
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid payload'}, status=400)
+
+    status = payments.WEBHOOK_EVENT_STATUSES.get(event.get('type'))
+    if status is None:
+        # Subscribed to something we don't track; acknowledge so PayMongo stops retrying
+        return JsonResponse({'success': True, 'ignored': True})
+
+    payment = event.get('data') or {}
+    payment_intent_id = (payment.get('attributes') or {}).get('payment_intent_id')
+    if not payment_intent_id:
+        return JsonResponse({'success': True, 'ignored': True})
+
+    payments.record_status(payment_intent_id, status, PaymentIntentStatus.SOURCE_WEBHOOK, payment)
+    return JsonResponse({'success': True})
+
+
 @csrf_exempt
 def api_generate_qrph(request):
     """Generate PayMongo QR PH code"""
@@ -1422,7 +1383,7 @@ def api_generate_qrph(request):
             'Content-Type': 'application/json'
         }
 
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
+        response = integrations.request(integrations.PAYMONGO, 'POST', url, json=payload, headers=headers)
         response_data = response.json() if response.content else {}
 
         if response.status_code not in (200, 201):
@@ -1444,205 +1405,128 @@ def api_generate_qrph(request):
 
         return JsonResponse({'success': True, 'qr_data': response_data})
 
+    except integrations.IntegrationUnavailable as e:
+        return _integration_unavailable_response(e)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_generate_qrph failed")
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
 
+@csrf_exempt
+def api_get_integration_stats(request):
+    """Per-provider call latency, error counts and breaker state for this worker process."""
+    if not request.user.is_authenticated or not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse({
+        'pid': os.getpid(),
+        'providers': integrations.get_stats(),
+        'email_dispatch': email_dispatch.executor.stats(),
+    })
+
+
+def _has_metrics_token(request):
+    """Whether the request carries ``Authorization: Bearer <METRICS_TOKEN>`` (never true while unset)."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        return False
+    scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(supplied.strip().encode('utf-8'), token.encode('utf-8'))
+
+
+def metrics_view(request):
+    """Prometheus metrics for every worker process on this instance, for staff or the scrape token."""
+    # Not keyed on REMOTE_ADDR: behind a proxy on the same host every request looks local
+    is_staff = request.user.is_authenticated and (request.user.is_superuser or request.user.is_staff)
+    if not is_staff and not _has_metrics_token(request):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    hour_ago = timezone.now() - timedelta(hours=1)
+    outbox_by_status = dict(EmailOutbox.objects.values_list('status').annotate(count=Count('pk')).order_by())
+    sent_last_hour = EmailOutbox.objects.filter(
+        status=EmailOutbox.STATUS_SENT, sent_at__gte=hour_ago
+    ).aggregate(latency=Avg('latency_ms'), duration=Avg('send_duration_ms'))
+    orders_by_status = dict(Order.objects.values_list('status').annotate(count=Count('pk')).order_by())
+    # The outbox worker runs as its own service, so email gauges come from the table, not process counters
+    gauges = [
+        (
+            'hello_email_outbox_messages', 'Outbox messages by status',
+            [({'status': status}, outbox_by_status.get(status, 0)) for status, _ in EmailOutbox.STATUS_CHOICES],
+        ),
+        (
+            'hello_email_outbox_oldest_pending_seconds', 'Age of the oldest unsent outbox message',
+            [({}, outbox.oldest_pending_seconds())],
+        ),
+        (
+            'hello_email_outbox_latency_seconds', 'Average enqueue-to-send time over the last hour',
+            [({}, (sent_last_hour['latency'] or 0) / 1000)],
+        ),
+        (
+            'hello_email_outbox_send_seconds', 'Average provider send time over the last hour',
+            [({}, (sent_last_hour['duration'] or 0) / 1000)],
+        ),
+        (
+            'hello_orders', 'Orders by current status',
+            [({'status': status}, orders_by_status.get(status, 0)) for status, _ in Order.ORDER_STATUS_CHOICES],
+        ),
+    ]
+    return HttpResponse(metrics.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @csrf_exempt
 def api_get_order_status(request, order_id):
     """Get order status for delivery/pickup tracking pages"""
     try:
         order = Order.objects.get(order_id=order_id)
-        order_data = {
-            'order_id': order.order_id,
-            'customer_name': order.customer_name,
-            'order_type': order.order_type,
-            'status': order.status,
-            'total_amount': float(order.total_amount),
-            'order_placed': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
-            'preparing_at': timezone.localtime(order.preparing_at).strftime('%Y-%m-%d %H:%M:%S') if order.preparing_at else None,
-            'ready_at': timezone.localtime(order.ready_at).strftime('%Y-%m-%d %H:%M:%S') if order.ready_at else None,
-            'picked_up_at': timezone.localtime(order.picked_up_at).strftime('%Y-%m-%d %H:%M:%S') if order.picked_up_at else None,
-            'items': [
-                {
-                    'name': item.product_name,
-                    'quantity': item.quantity,
-                    'price': float(item.unit_price),
-                    'size': getattr(item, 'size', '')
-                } for item in order.order_items.all()
-            ]
-        }
-        return JsonResponse(order_data)
+        return JsonResponse(order_events.order_status_payload(order))
     except Order.DoesNotExist:
         return JsonResponse({'error': 'Order not found'}, status=404)
 
 
-def _send_order_status_email_sync(order_id, customer_email, customer_name, order_type, new_status, total_amount, items_data, email_content_prepared=None):
-    """Internal function to send email synchronously - called from background thread with retry logic"""
-    import time
-    
-    # Close old database connections to ensure clean connection in thread
-    close_old_connections()
-    
-    # Retry logic for reliability - faster retries for delivery statuses
-    is_delivery_status = new_status in ['out_for_delivery', 'delivered']
-    max_retries = 3
-    retry_delay = 0.3 if is_delivery_status else 0.5  # Faster retries for delivery statuses
-    
-    # Use pre-prepared content if available (for faster sending)
-    if email_content_prepared:
-        subject, html_message, plain_message = email_content_prepared
-        # Get status display for logging
-        status_display = dict(Order.ORDER_STATUS_CHOICES).get(new_status, new_status.replace('_', ' ').title())
-    else:
-        # Get status display name
-        status_display = dict(Order.ORDER_STATUS_CHOICES).get(new_status, new_status.replace('_', ' ').title())
-        
-        # Format order items exactly as shown in the image
-        items_list = []
-        for item in items_data:
-            item_text = f"- {item['name']} x {item['quantity']}"
-            if item.get('size'):
-                item_text += f" (Size: {item['size']})"
-            item_text += f" - ₱{item['total_price']:.2f}"
-            items_list.append(item_text)
-        items_text = "\n".join(items_list)
-        
-        # Format order type
-        order_type_display = dict(Order.ORDER_TYPE_CHOICES).get(order_type, order_type)
-        
-        # Create email subject
-        subject = f'[ORDER UPDATE] Order {order_id} - Status: {status_display}'
-        
-        # Create HTML email content
-        html_message = _build_email_html(order_id, customer_name, order_type_display, status_display, total_amount, items_text)
-        
-        # Plain text version
-        plain_message = _build_email_plain(customer_name, order_id, order_type_display, status_display, total_amount, items_text)
-    
-    # Special logging for delivery statuses
-    if is_delivery_status:
-        print(f"[EMAIL] ⚠ DELIVERY STATUS EMAIL SEND (FAST MODE): {new_status} for order {order_id}")
-    
-    for attempt in range(1, max_retries + 1):
-        try:
-            print(f"[EMAIL] Attempt {attempt}/{max_retries}: Sending order status email to {customer_email} for order {order_id}")
-            if is_delivery_status:
-                print(f"[EMAIL] ⚠ Delivery status email attempt {attempt}: {new_status} -> {status_display}")
-            
-            # Create email object
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=plain_message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[customer_email]
-            )
-            email.attach_alternative(html_message, "text/html")
-            
-            # Send email with timeout handling
-            email.send(fail_silently=False)
-            
-            print(f"[EMAIL SUCCESS] Order status email sent successfully to {customer_email} for order {order_id}")
-            if is_delivery_status:
-                print(f"[EMAIL SUCCESS] ✓✓ DELIVERY STATUS EMAIL SENT: {new_status} for order {order_id}")
-            return  # Success - exit function
-            
-        except Exception as e:
-            import traceback
-            error_msg = str(e)
-            print(f"[EMAIL ERROR] Attempt {attempt}/{max_retries} failed: {error_msg}")
-            
-            if attempt < max_retries:
-                print(f"[EMAIL] Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 1.5 if is_delivery_status else 2  # Faster backoff for delivery statuses
-            else:
-                print(f"[EMAIL ERROR] All {max_retries} attempts failed for order {order_id}")
-                print(f"[EMAIL ERROR] Traceback: {traceback.format_exc()}")
-                # Don't fail the status update if email fails - just log the error
-
-
-def _build_email_html(order_id, customer_name, order_type_display, status_display, total_amount, items_text):
-    """Build HTML email content"""
-    return f"""<!doctype html>
-<html>
-  <body style="margin:0;padding:0;background:#f7f7f8;font-family:Inter,Segoe UI,Roboto,Arial,sans-serif;color:#111;">
-    <table role="presentation" cellpadding="0" cellspacing="0" width="100%">
-      <tr>
-        <td align="center" style="padding:24px;">
-          <table role="presentation" cellpadding="0" cellspacing="0" width="560" style="background:#ffffff;border-radius:12px;box-shadow:0 2px 12px rgba(0,0,0,.06);overflow:hidden;">
-            <tr>
-              <td align="center" style="padding:28px 28px 8px 28px;">
-                <h1 style="margin:16px 0 0 0;font-size:22px;line-height:28px;color:#d63384;">Order Status Update</h1>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                <p>Dear {customer_name},</p>
-                <p>Your order status has been updated:</p>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                <div style="background-color: #f8f9fa; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                  <p style="margin:8px 0;"><strong>Order ID:</strong> {order_id}</p>
-                  <p style="margin:8px 0;"><strong>Order Type:</strong> {order_type_display}</p>
-                  <p style="margin:8px 0;"><strong>Status:</strong> <span style="color: #d63384; font-weight: bold;">{status_display}</span></p>
-                  <p style="margin:8px 0;"><strong>Total Amount:</strong> ₱{total_amount:.2f}</p>
-                </div>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 0 28px;font-size:14px;line-height:22px;color:#333;">
-                <h4 style="color: #333; margin-top: 20px; margin-bottom: 10px;">Order Items:</h4>
-                <div style="background-color: #ffffff; padding: 10px; border-left: 3px solid #d63384; margin-top: 10px;">
-                  {items_text.replace(chr(10), '<br>')}
-                </div>
-              </td>
-            </tr>
-            <tr>
-              <td style="padding:12px 28px 24px 28px;font-size:14px;line-height:22px;color:#333;">
-                <p>Thank you for choosing Mother Julie!</p>
-              </td>
-            </tr>
-          </table>
-          <div style="padding:14px 0 0 0;font-size:11px;color:#9aa0a6;">
-            Sent by Mother Julie • Please do not reply to this automated message.
-          </div>
-        </td>
-      </tr>
-    </table>
-  </body>
-</html>"""
-
-
-def _build_email_plain(customer_name, order_id, order_type_display, status_display, total_amount, items_text):
-    """Build plain text email content"""
-    return f"""Dear {customer_name},
-
-Your order status has been updated:
-
-Order ID: {order_id}
-Order Type: {order_type_display}
-Status: {status_display}
-Total Amount: ₱{total_amount:.2f}
-
-Order Items:
-{items_text}
-
-Thank you for choosing Mother Julie!
-
----
-This is an automated email. Please do not reply to this message."""
-
-
-def send_order_status_email(order, new_status):
-    """Send email notification to customer when order status is updated (optimized for speed)"""
+def api_order_events(request, order_id):
+    """Stream order status changes to tracking pages as Server-Sent Events.
+
+    Status snapshots are published whenever an order's status is saved, so an
+    open stream only reads the shared cache. Each connection checks the
+    order's updated_at against the cached snapshot and rebuilds it if any
+    write got past the publishers.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Invalid method'}, status=405)
+
+    updated_at = Order.objects.filter(order_id=order_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return JsonResponse({'error': 'Order not found'}, status=404)
+    entry = order_events.get_order_event(order_id)
+    fresh = entry is not None and entry.get('updated_at') == updated_at
+    metrics.record_cache('order_events', fresh)
+    if not fresh:
+        order = Order.objects.prefetch_related('order_items').get(order_id=order_id)
+        entry = order_events.publish_order_event(order_id, order_events.order_status_payload(order), order.updated_at)
+
+    response = StreamingHttpResponse(
+        order_events.stream_order_events(
+            order_id,
+            entry,
+            last_event_id=request.headers.get('Last-Event-ID'),
+        ),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def send_order_status_email(order, new_status, passed_statuses=()):
+    """Queue an email notification telling the customer their order status changed.
+
+    ``passed_statuses`` are statuses the order went through on its way to
+    ``new_status``; they are listed as a timeline in the same email.
+    Call inside the transaction that saves the status; the outbox worker delivers it.
+    """
     # Skip email sending for dine-in orders
     if order.order_type == 'dine-in':
-        print(f"[EMAIL] ✗ Skipping email for dine-in order {order.order_id} - emails not sent for dine-in orders")
+        log.debug("status email skipped for dine-in order", order_id=order.order_id)
         return
     
     # Special handling for delivery statuses
@@ -1651,71 +1535,64 @@ def send_order_status_email(order, new_status):
     # Check if email exists - be more explicit about the check
     if not order.customer_email or order.customer_email.strip() == '':
         if is_delivery_status:
-            print(f"[EMAIL] ✗✗ CRITICAL: Cannot send delivery status email - NO EMAIL ADDRESS!")
+            log.warning("delivery status email not sent, no customer email", order_id=order.order_id, status=new_status)
         return
     
-    # Prepare all email content BEFORE threading for faster sending
-    try:
-        # Get status display name
-        status_display = dict(Order.ORDER_STATUS_CHOICES).get(new_status, new_status.replace('_', ' ').title())
-        
-        # Format order items
-        items_list = []
-        for item in order.order_items.all():
-            item_text = f"- {item.product_name} x {item.quantity}"
-            if item.size:
-                item_text += f" (Size: {item.size})"
-            item_text += f" - ₱{float(item.total_price):.2f}"
-            items_list.append(item_text)
-        items_text = "\n".join(items_list)
-        
-        # Format order type
-        order_type_display = dict(Order.ORDER_TYPE_CHOICES).get(order.order_type, order.order_type)
-        
-        # Create email subject
-        subject = f'[ORDER UPDATE] Order {order.order_id} - Status: {status_display}'
-        
-        # Build email content
-        html_message = _build_email_html(order.order_id, order.customer_name, order_type_display, status_display, float(order.total_amount), items_text)
-        plain_message = _build_email_plain(order.customer_name, order.order_id, order_type_display, status_display, float(order.total_amount), items_text)
-        
-        # Store data in variables to avoid database access in thread
-        order_id = order.order_id
-        customer_email = order.customer_email
-        customer_name = order.customer_name
-        order_type = order.order_type
-        total_amount = float(order.total_amount)
-        
-        # Pre-prepared email content for faster sending
-        email_content_prepared = (subject, html_message, plain_message)
-        
-        if is_delivery_status:
-            print(f"[EMAIL] ⚠ FAST MODE: Delivery status email prepared for {order_id}")
-        
-        # Send email in background thread - content already prepared for instant sending
-        email_thread = threading.Thread(
-            target=_send_order_status_email_sync,
-            args=(
-                order_id,
-                customer_email,
-                customer_name,
-                order_type,
-                new_status,
-                total_amount,
-                [],  # Empty items_data since content is pre-prepared
-                email_content_prepared  # Pass pre-prepared content
-            ),
-            daemon=False,
-            name=f"EmailThread-{order_id}-{order_type}"
-        )
-        email_thread.start()
-        
-        if is_delivery_status:
-            print(f"[EMAIL] ✓✓ FAST MODE: Delivery status email thread started immediately for {order_id}")
-    except Exception as e:
-        import traceback
-        print(f"[EMAIL ERROR] Error preparing email: {str(e)}")
-        print(f"[EMAIL ERROR] Traceback: {traceback.format_exc()}")
+    # Format order items
+    items_lines = []
+    for item in order.order_items.all():
+        item_text = f"- {item.product_name} x {item.quantity}"
+        if item.size:
+            item_text += f" (Size: {item.size})"
+        item_text += f" - ₱{float(item.total_price):.2f}"
+        items_lines.append(item_text)
+
+    def status_label(status):
+        return Order.ORDER_STATUS_LABELS.get(status, status.replace('_', ' ').title())
+
+    context = {
+        'order_id': order.order_id,
+        'customer_name': order.customer_name,
+        'order_type': Order.ORDER_TYPE_LABELS.get(order.order_type, order.order_type),
+        'status': status_label(new_status),
+        'total_amount': f"{float(order.total_amount):.2f}",
+        'items': items_lines,
+    }
+    if passed_statuses:
+        context['timeline'] = [f"- {status_label(status)}" for status in [*passed_statuses, new_status]]
+        email = email_templates.render('order_status_timeline', **context)
+    else:
+        email = email_templates.render('order_status', **context)
+
+    enqueue_email(
+        order.customer_email,
+        email.subject,
+        email.text,
+        email.html,
+        kind=EmailOutbox.KIND_ORDER_STATUS,
+        order=order,
+    )
+    log.info("status email queued", order_id=order.order_id, status=new_status, to=order.customer_email)
+
+
+def _skipped_statuses(order_type, old_status, new_status):
+    """Statuses an order passes through when staff jump it from ``old_status`` to ``new_status``."""
+    # For pickup orders: ready_for_pickup comes before picked_up
+    if order_type == 'pickup':
+        if old_status == 'preparing' and new_status == 'picked_up':
+            return ['ready_for_pickup']
+        if old_status == 'order_placed' and new_status == 'picked_up':
+            return ['preparing', 'ready_for_pickup']
+
+    # For delivery orders: ready_for_delivery comes before out_for_delivery
+    elif order_type == 'delivery':
+        if old_status == 'preparing' and new_status == 'out_for_delivery':
+            return ['ready_for_delivery']
+        if old_status == 'order_placed' and new_status == 'out_for_delivery':
+            return ['preparing', 'ready_for_delivery']
+        if old_status == 'preparing' and new_status == 'delivered':
+            return ['ready_for_delivery', 'out_for_delivery']
+    return []
 
 
 @csrf_exempt
@@ -1726,202 +1603,267 @@ def api_update_order_status(request, order_id):
             data = json.loads(request.body)
             new_status = data.get('status')
             
-            print(f"[ORDER UPDATE] Received status update request for order {order_id}: {new_status}")
-            
             # Use select_related to optimize database query
             order = Order.objects.select_related('user').prefetch_related('order_items').get(order_id=order_id)
             old_status = order.status
             
-            print(f"[ORDER UPDATE] Order found: ID={order.order_id}, Type={order.order_type}, Email={order.customer_email}, Current Status={old_status}")
-            
-            # Only update if status actually changed
-            if old_status != new_status:
-                # Check if status is being skipped and send emails for intermediate statuses
-                intermediate_statuses = []
-                
-                # For pickup orders: ensure ready_for_pickup is sent before picked_up
-                if order.order_type == 'pickup':
-                    if old_status == 'preparing' and new_status == 'picked_up':
-                        intermediate_statuses.append('ready_for_pickup')
-                    elif old_status in ['order_placed', 'preparing'] and new_status == 'picked_up':
-                        intermediate_statuses.append('preparing')
-                        intermediate_statuses.append('ready_for_pickup')
-                
-                # For delivery orders: ensure ready_for_delivery is sent before out_for_delivery
-                elif order.order_type == 'delivery':
-                    if old_status == 'preparing' and new_status == 'out_for_delivery':
-                        intermediate_statuses.append('ready_for_delivery')
-                    elif old_status in ['order_placed', 'preparing'] and new_status == 'out_for_delivery':
-                        if old_status == 'order_placed':
-                            intermediate_statuses.append('preparing')
-                        intermediate_statuses.append('ready_for_delivery')
-                    elif old_status == 'preparing' and new_status == 'delivered':
-                        intermediate_statuses.append('ready_for_delivery')
-                        intermediate_statuses.append('out_for_delivery')
-                
-                # Send emails for intermediate statuses first (without changing order status in DB)
-                # Skip intermediate emails for dine-in orders
-                if order.order_type != 'dine-in':
+            # Status change and its notification emails commit together
+            with transaction.atomic():
+                # Only update if status actually changed
+                if old_status != new_status:
+                    # Statuses skipped by this jump get their tracking timestamps and a line
+                    # in the one status email, rather than an email each
+                    intermediate_statuses = _skipped_statuses(order.order_type, old_status, new_status)
+                    now = timezone.now()
                     for intermediate_status in intermediate_statuses:
-                        if intermediate_status != old_status:  # Don't send if it's the current status
-                            print(f"[ORDER UPDATE] ⚠ Status jump detected! Sending intermediate status email: {intermediate_status}")
-                            
-                            # Get customer email
-                            customer_email = order.customer_email
-                            if not customer_email or customer_email.strip() == '':
-                                if order.user and order.user.email:
-                                    customer_email = order.user.email
-                            
-                            # Send email for intermediate status (order status remains unchanged in DB)
-                            if customer_email and customer_email.strip() != '':
-                                try:
-                                    # Create a temporary order object with intermediate status for email sending
-                                    # We'll pass the intermediate status directly to send_order_status_email
-                                    # The function will use the current order data but with the intermediate status
-                                    send_order_status_email(order, intermediate_status)
-                                    print(f"[ORDER UPDATE] ✓ Intermediate status email sent: {intermediate_status}")
-                                except Exception as e:
-                                    print(f"[ORDER UPDATE ERROR] Failed to send intermediate status email: {str(e)}")
-                            else:
-                                print(f"[ORDER UPDATE] ✗ Cannot send intermediate status email - no customer email")
-                else:
-                    print(f"[ORDER UPDATE] ✗ Skipping intermediate status emails for dine-in order")
+                        timestamp_field = Order.STATUS_TIMESTAMP_FIELDS.get(intermediate_status)
+                        if timestamp_field and not getattr(order, timestamp_field):
+                            setattr(order, timestamp_field, now)
+
+                    # Now update to the final status
+                    order.status = new_status
+                    order.updated_at = timezone.now()
+                    # Saving publishes the new status to open tracking streams (hello.signals)
+                    order.save()
                 
-                # Now update to the final status
-                order.status = new_status
-                order.updated_at = timezone.now()
-                order.save()
+                    log.info(
+                        "order status updated", order_id=order_id, order_type=order.order_type,
+                        old=old_status, new=new_status, skipped=','.join(intermediate_statuses) or None,
+                    )
                 
-                print(f"[ORDER UPDATE] Order status saved: {old_status} -> {new_status}")
-                if intermediate_statuses:
-                    print(f"[ORDER UPDATE] ✓ Sent {len(intermediate_statuses)} intermediate status email(s) before final status")
+                    # Try to get email from order, or fallback to user's email
+                    customer_email = order.customer_email
+                    if not customer_email or customer_email.strip() == '':
+                        # Try to get email from associated user
+                        if order.user and order.user.email:
+                            customer_email = order.user.email
+                            # Update the order with the user's email for future notifications
+                            order.customer_email = customer_email
+                            order.save(update_fields=['customer_email'])
+                            log.debug("order email filled from user account", order_id=order_id, email=customer_email)
                 
-                # Send email notification immediately after status update
-                # Refresh order to ensure all related data is available
-                order.refresh_from_db()
-                
-                # Check customer email - log detailed info for delivery orders
-                print(f"[ORDER UPDATE] Checking email for order {order_id}:")
-                print(f"  - Order Type: {order.order_type}")
-                print(f"  - Customer Email (from order): {order.customer_email}")
-                print(f"  - Customer Email is None: {order.customer_email is None}")
-                print(f"  - Customer Email is empty: {order.customer_email == '' if order.customer_email else 'N/A'}")
-                print(f"  - Customer Email bool: {bool(order.customer_email)}")
-                
-                # Try to get email from order, or fallback to user's email
-                customer_email = order.customer_email
-                if not customer_email or customer_email.strip() == '':
-                    # Try to get email from associated user
-                    if order.user and order.user.email:
-                        customer_email = order.user.email
-                        # Update the order with the user's email for future notifications
-                        order.customer_email = customer_email
-                        order.save(update_fields=['customer_email'])
-                        print(f"[ORDER UPDATE] ✓ Found email from user account: {customer_email}")
-                        print(f"[ORDER UPDATE] ✓ Updated order with customer email")
-                
-                # Send email notification if customer has email
-                # Skip email sending for dine-in orders
-                if order.order_type == 'dine-in':
-                    print(f"[ORDER UPDATE] ✗ Skipping email for dine-in order {order_id} - emails not sent for dine-in orders")
-                else:
-                    # Special logging for delivery statuses
-                    is_delivery_status = new_status in ['out_for_delivery', 'delivered']
-                    if is_delivery_status:
-                        print(f"[ORDER UPDATE] ⚠ DELIVERY STATUS DETECTED: {new_status} for order {order_id}")
-                        print(f"[ORDER UPDATE] ⚠ Order Type: {order.order_type}, Email: {customer_email}")
+                    # Send email notification if customer has email
+                    # Skip email sending for dine-in orders
+                    if order.order_type == 'dine-in':
+                        log.debug("status email skipped for dine-in order", order_id=order_id)
+                    else:
+                        is_delivery_status = new_status in ['out_for_delivery', 'delivered']
                     
-                    if customer_email and customer_email.strip() != '':
-                        print(f"[ORDER UPDATE] ✓ Email found! Sending notification for order {order_id} ({order.order_type}): {old_status} -> {new_status}")
-                        print(f"[ORDER UPDATE] ✓ Email address: {customer_email}")
-                        try:
-                            # Ensure order has the email before sending
-                            if not order.customer_email or order.customer_email.strip() == '':
-                                order.customer_email = customer_email
-                                order.save(update_fields=['customer_email'])
-                                order.refresh_from_db()
-                                print(f"[ORDER UPDATE] ✓ Updated order with customer email: {customer_email}")
-                                print(f"[ORDER UPDATE] ✓ Order refreshed, email confirmed: {order.customer_email}")
-                            
-                            # Force email sending for delivery statuses
-                            if is_delivery_status:
-                                print(f"[ORDER UPDATE] ⚠ FORCING EMAIL SEND for delivery status: {new_status}")
-                                print(f"[ORDER UPDATE] ⚠ Final check - Order email: {order.customer_email}, Status: {new_status}")
+                        if customer_email and customer_email.strip() != '':
+                            try:
+                                # Ensure order has the email before sending
+                                if not order.customer_email or order.customer_email.strip() == '':
+                                    order.customer_email = customer_email
+                                    order.save(update_fields=['customer_email'])
                             
-                            # Double-check email is present before sending
-                            if order.customer_email and order.customer_email.strip() != '':
-                                send_order_status_email(order, new_status)
-                                print(f"[ORDER UPDATE] ✓ Email sending function called successfully for order {order_id}")
-                            else:
-                                print(f"[ORDER UPDATE] ✗✗ CRITICAL: Order email is still empty after update! Cannot send email.")
-                                if is_delivery_status:
-                                    print(f"[ORDER UPDATE] ✗✗ CRITICAL: DELIVERY STATUS EMAIL FAILED - Order email is empty!")
-                            
-                            # Additional confirmation for delivery statuses
-                            if is_delivery_status:
-                                print(f"[ORDER UPDATE] ✓✓ DELIVERY STATUS EMAIL TRIGGERED: {new_status} for order {order_id}")
-                        except Exception as email_error:
-                            import traceback
-                            print(f"[ORDER UPDATE ERROR] Exception in send_order_status_email: {str(email_error)}")
-                            print(f"[ORDER UPDATE ERROR] Traceback: {traceback.format_exc()}")
-                            if is_delivery_status:
-                                print(f"[ORDER UPDATE ERROR] ⚠⚠ CRITICAL: Email failed for delivery status {new_status}!")
-                    else:
-                        print(f"[ORDER UPDATE] ✗ NO EMAIL - Status changed for order {order_id} ({order.order_type}): {old_status} -> {new_status}")
-                        print(f"[ORDER UPDATE] ✗ Customer email is missing or empty. Email will NOT be sent.")
-                        print(f"[ORDER UPDATE] ✗ Order has no email and user has no email either.")
-                        if is_delivery_status:
-                            print(f"[ORDER UPDATE] ✗✗ CRITICAL: Cannot send email for delivery status {new_status} - NO EMAIL ADDRESS!")
-            else:
-                print(f"[ORDER UPDATE] Status unchanged for order {order_id}: {old_status}")
+                                # Double-check email is present before sending
+                                if order.customer_email and order.customer_email.strip() != '':
+                                    send_order_status_email(order, new_status, intermediate_statuses)
+                                else:
+                                    log.error("status email not sent, order email still empty", order_id=order_id, status=new_status)
+                            except Exception:
+                                log.exception(
+                                    "status email failed", order_id=order_id, status=new_status,
+                                    delivery_status=is_delivery_status,
+                                )
+                        else:
+                            # Delivery updates are the ones customers wait on, so flag those louder
+                            level = logging.WARNING if is_delivery_status else logging.INFO
+                            log.log(level, "status email not sent, no customer email", order_id=order_id, status=new_status)
+                else:
+                    log.debug("order status unchanged", order_id=order_id, status=old_status)
             
             return JsonResponse({'success': True, 'message': 'Order status updated'})
         except Order.DoesNotExist:
-            print(f"[ORDER UPDATE ERROR] Order {order_id} not found")
+            log.info("status update for unknown order", order_id=order_id)
             return JsonResponse({'error': 'Order not found'}, status=404)
         except Exception as e:
-            import traceback
-            print(f"[ORDER UPDATE ERROR] {str(e)}")
-            print(f"[ORDER UPDATE ERROR] Traceback: {traceback.format_exc()}")
+            log.exception("api_update_order_status failed", order_id=order_id)
             return JsonResponse({'error': str(e)}, status=400)
     
     return JsonResponse({'error': 'Invalid method'}, status=405)
 
 
+def _admin_order_payload(order, items_count=None):
+    """Serialize an order for the admin dashboard order lists."""
+    items = [
+        {
+            'name': item.product_name,
+            'quantity': item.quantity,
+            'price': float(item.unit_price),
+            'size': getattr(item, 'size', '')
+        } for item in order.order_items.all()
+    ]
+    return {
+        'order_id': order.order_id,
+        'customer_name': order.customer_name,
+        'order_type': order.order_type,
+        'status': order.status,
+        'total_amount': float(order.total_amount),
+        'payment_method': getattr(order, 'payment_method', 'Cash'),
+        # Convert to Philippine time (Asia/Manila) before sending
+        'created_at': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+        'items_count': len(items) if items_count is None else items_count,
+        'items': items
+    }
+
+
+def _encode_changes_token(moment, pk=None):
+    token = str(int(moment.timestamp() * 1_000_000))
+    return token if pk is None else f"{token}_{pk}"
+
+
+def _decode_changes_token(token):
+    """Return ``(moment, pk)``; pk is only set for tokens that resume a truncated page."""
+    moment_us, _, pk = token.partition('_')
+    return datetime.fromtimestamp(int(moment_us) / 1_000_000, tz=dt_timezone.utc), int(pk) if pk else None
+
+
+@csrf_exempt
+def api_get_order_changes(request):
+    """Get orders created, updated or deleted since a cursor token, for the admin dashboard poller.
+
+    Without ``since`` only a fresh token is returned. Each call re-sends
+    orders from the last ORDER_CHANGES_OVERLAP_SECONDS before the token, so
+    rows committed slightly out of order are not missed; clients upsert by
+    ``order_id``, drop the ids in ``deleted_ids`` and treat only entries
+    flagged ``created`` as new orders. A truncated page
+    (``has_more``) hands back an ``(updated_at, pk)`` token that resumes
+    right after its last row instead, so a burst of more than a page of
+    orders updated at once can't send the client round in circles.
+    """
+    if not request.user.is_authenticated or not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    since = request.GET.get('since')
+    if not since:
+        return JsonResponse({'orders': [], 'deleted_ids': [], 'token': _encode_changes_token(timezone.now()), 'has_more': False})
+
+    try:
+        since_moment, since_pk = _decode_changes_token(since)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return JsonResponse({'error': 'Invalid since token'}, status=400)
+
+    try:
+        limit = settings.ORDER_CHANGES_PAGE_SIZE
+        polled_at = timezone.now()
+        if since_pk is None:
+            window_start = since_moment - timedelta(seconds=settings.ORDER_CHANGES_OVERLAP_SECONDS)
+            changes = Order.objects.filter(updated_at__gt=window_start)
+        else:
+            window_start = since_moment
+            changes = Order.objects.filter(
+                Q(updated_at__gt=since_moment) | Q(updated_at=since_moment, pk__gt=since_pk)
+            )
+        changed = list(
+            changes.prefetch_related('order_items').order_by('updated_at', 'pk')[:limit + 1]
+        )
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+
+        # A full page resumes after its last row; otherwise everything up to
+        # the poll time was seen, so idle polls stop re-sending old changes
+        if has_more:
+            token = _encode_changes_token(changed[-1].updated_at, changed[-1].pk)
+        else:
+            token = _encode_changes_token(max(polled_at, since_moment))
+
+        orders_data = []
+        for order in changed:
+            order_data = _admin_order_payload(order)
+            order_data['updated_at'] = timezone.localtime(order.updated_at).strftime('%Y-%m-%d %H:%M:%S')
+            # Lets the dashboard tell newly placed orders from edits to older ones it never loaded
+            order_data['created'] = order.created_at > window_start
+            orders_data.append(order_data)
+        deleted_ids = list(
+            DeletedOrder.objects.filter(deleted_at__gt=window_start).values_list('order_id', flat=True).distinct()
+        )
+
+        return JsonResponse({'orders': orders_data, 'deleted_ids': deleted_ids, 'token': token, 'has_more': has_more})
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def _encode_orders_cursor(order):
+    return f"{int(order.created_at.timestamp() * 1_000_000)}_{order.order_id}"
+
+
+def _decode_orders_cursor(cursor):
+    created_us, order_id = cursor.split('_', 1)
+    return datetime.fromtimestamp(int(created_us) / 1_000_000, tz=dt_timezone.utc), order_id
+
+
+def _local_day_start(value):
+    """Parse a YYYY-MM-DD query parameter as local midnight."""
+    day = datetime.strptime(value, '%Y-%m-%d')
+    return timezone.make_aware(day, timezone.get_current_timezone())
+
+
 @csrf_exempt
 def api_get_orders(request):
-    """Get all orders for admin dashboard"""
+    """Get one page of orders for admin dashboard, newest first
+
+    Query parameters: ``limit``, ``cursor`` (``next_cursor`` from the previous
+    page), ``status`` (comma-separated), ``order_type``, ``date_from`` and
+    ``date_to`` (YYYY-MM-DD, local, inclusive).
+    """
     # Check authentication
     if not request.user.is_authenticated or not (request.user.is_superuser or request.user.is_staff):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     try:
-        orders = Order.objects.all().order_by('-created_at')
-        orders_data = []
-        
-        for order in orders:
-            order_data = {
-                'order_id': order.order_id,
-                'customer_name': order.customer_name,
-                'order_type': order.order_type,
-                'status': order.status,
-                'total_amount': float(order.total_amount),
-                'payment_method': getattr(order, 'payment_method', 'Cash'),
-                # Convert to Philippine time (Asia/Manila) before sending
-                'created_at': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
-                'items_count': order.order_items.count(),
-                'items': [
-                    {
-                        'name': item.product_name,
-                        'quantity': item.quantity,
-                        'price': float(item.unit_price),
-                        'size': getattr(item, 'size', '')
-                    } for item in order.order_items.all()
-                ]
-            }
-            orders_data.append(order_data)
-        
-        return JsonResponse(orders_data, safe=False)
+        limit = min(int(request.GET.get('limit', settings.ORDERS_PAGE_SIZE)), settings.ORDERS_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError('limit must be positive')
+        cursor = request.GET.get('cursor')
+        after = _decode_orders_cursor(cursor) if cursor else None
+        date_from = request.GET.get('date_from')
+        date_to = request.GET.get('date_to')
+        date_from = _local_day_start(date_from) if date_from else None
+        date_to = _local_day_start(date_to) + timedelta(days=1) if date_to else None
+    except (TypeError, ValueError, OverflowError, OSError):
+        return JsonResponse({'error': 'Invalid pagination or filter parameters'}, status=400)
+
+    try:
+        orders = Order.objects.all()
+        statuses = [status for status in request.GET.get('status', '').split(',') if status]
+        if statuses:
+            orders = orders.filter(status__in=statuses)
+        if request.GET.get('order_type'):
+            orders = orders.filter(order_type=request.GET['order_type'])
+        if date_from:
+            orders = orders.filter(created_at__gte=date_from)
+        if date_to:
+            orders = orders.filter(created_at__lt=date_to)
+        if after:
+            after_created, after_order_id = after
+            orders = orders.filter(
+                Q(created_at__lt=after_created) | Q(created_at=after_created, order_id__lt=after_order_id)
+            )
+
+        # Count per returned row only, so the cost stays the same however long the history is
+        items_count = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        page = list(
+            orders.annotate(items_count=Coalesce(Subquery(items_count), 0))
+            .prefetch_related(Prefetch(
+                'order_items',
+                queryset=OrderItem.objects.only('order_id', 'product_name', 'quantity', 'unit_price', 'size'),
+            ))
+            .order_by('-created_at', '-order_id')[:limit + 1]
+        )
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        return JsonResponse({
+            'orders': [_admin_order_payload(order, items_count=order.items_count) for order in page],
+            'next_cursor': _encode_orders_cursor(page[-1]) if has_more else None,
+        })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -1934,7 +1876,11 @@ def api_delete_order(request, order_id):
     
     try:
         order = Order.objects.get(order_id=order_id)
-        order.delete()
+        with transaction.atomic():
+            if order.status != 'cancelled':
+                sales_rollup.reverse_orders([order])
+            order.delete()
+            DeletedOrder.objects.record([order_id])
         return JsonResponse({'success': True, 'message': 'Order deleted successfully'})
     except Order.DoesNotExist:
         return JsonResponse({'error': 'Order not found'}, status=404)
@@ -1950,8 +1896,13 @@ def api_delete_all_orders(request):
     
     try:
         # Delete all orders (this will cascade delete order items)
-        count = Order.objects.all().count()
-        Order.objects.all().delete()
+        with transaction.atomic():
+            order_ids = list(Order.objects.values_list('order_id', flat=True))
+            count = len(order_ids)
+            Order.objects.all().delete()
+            # Open dashboards drop these through the changes feed
+            DeletedOrder.objects.record(order_ids)
+            sales_rollup.clear()
         return JsonResponse({
             'success': True, 
             'message': f'Successfully deleted {count} order(s)',
@@ -1969,38 +1920,46 @@ def api_get_analytics(request):
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     
     try:
-        from django.db.models import Sum, Count, Q
-        from datetime import datetime, timedelta
-        
-        # Get all orders
-        all_orders = Order.objects.exclude(status='cancelled')
-        
-        # Calculate total sales
-        total_sales = all_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        
-        # Calculate total products sold
-        total_products_sold = OrderItem.objects.filter(
-            order__in=all_orders
-        ).aggregate(Sum('quantity'))['quantity__sum'] or 0
-        
-        # Get previous period totals for comparison
-        now = timezone.now()
-        previous_period_start = now - timedelta(days=30)
-        previous_orders = all_orders.filter(created_at__lt=previous_period_start)
-        previous_sales = previous_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        previous_products = OrderItem.objects.filter(
-            order__in=previous_orders
-        ).aggregate(Sum('quantity'))['quantity__sum'] or 0
+        from django.db.models import Sum, Q
+        from datetime import timedelta
+        
+        # All-time totals (yearly rollups) and the figures from before the last
+        # 30 days (daily rollups) in one conditional aggregation
+        previous_period_start = timezone.localtime().date() - timedelta(days=30)
+        all_time = Q(period_type=SalesSummary.PERIOD_YEAR)
+        before_period = Q(period_type=SalesSummary.PERIOD_DAY, period_start__lt=previous_period_start)
+        totals = SalesSummary.objects.filter(all_time | before_period).aggregate(
+            sales=Sum('total_amount', filter=all_time),
+            products=Sum('products_sold', filter=all_time),
+            orders=Sum('order_count', filter=all_time),
+            previous_sales=Sum('total_amount', filter=before_period),
+            previous_products=Sum('products_sold', filter=before_period),
+        )
+        total_sales = totals['sales'] or 0
+        total_products_sold = totals['products'] or 0
+        previous_sales = totals['previous_sales'] or 0
+        previous_products = totals['previous_products'] or 0
         
         # Calculate percentage changes
         sales_change = ((float(total_sales) - float(previous_sales)) / float(previous_sales) * 100) if previous_sales > 0 else 0
         products_change = ((total_products_sold - previous_products) / previous_products * 100) if previous_products > 0 else 0
         
-        # Get order statistics (last 50 orders)
-        recent_orders = all_orders.order_by('-created_at')[:50]
+        # Get order statistics (last 50 orders) with quantities and items in two queries
+        quantity_sum = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(total=Sum('quantity'))
+            .values('total')
+        )
+        recent_orders = (
+            Order.objects.exclude(status='cancelled')
+            .annotate(items_count=Coalesce(Subquery(quantity_sum), 0))
+            .prefetch_related('order_items')
+            .order_by('-created_at')[:50]
+        )
         order_stats = []
         for order in recent_orders:
-            items_count = order.order_items.aggregate(Sum('quantity'))['quantity__sum'] or 0
             # Get order items with details
             order_items = []
             for item in order.order_items.all():
@@ -2019,7 +1978,7 @@ def api_get_analytics(request):
                 'order_type': order.order_type,
                 'order_placed': timezone.localtime(order.created_at).strftime('%Y-%m-%d %H:%M:%S'),
                 'delivery_pickup_date': timezone.localtime(order.updated_at).strftime('%Y-%m-%d %H:%M:%S'),
-                'items_count': items_count,
+                'items_count': order.items_count,
                 'items': order_items,
                 'total_amount': float(order.total_amount),
                 'status': order.status
@@ -2031,7 +1990,7 @@ def api_get_analytics(request):
             'sales_change': sales_change,
             'products_change': products_change,
             'order_stats': order_stats,
-            'order_count': all_orders.count()
+            'order_count': totals['orders'] or 0
         })
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -2075,7 +2034,7 @@ def api_get_products(request):
                 image_url = ''
             except Exception as e:
                 # Handle any other errors
-                print(f"Error getting image URL for product {product.id}: {e}")
+                log.warning("product image URL unavailable", product_id=product.id, error=e)
                 image_url = ''
             
             products_data.append({
@@ -2090,60 +2049,104 @@ def api_get_products(request):
         
         return JsonResponse(products_data, safe=False)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_get_products failed")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+def api_get_stock_changes(request):
+    """Get stock and visibility for products changed since a client version, for the admin stock poller.
+
+    Without ``since`` every product is returned. Like the order changes
+    feed, each call re-sends changes from the last
+    STOCK_CHANGES_OVERLAP_SECONDS before ``since`` so writes committed
+    slightly out of order are not missed.
+    """
+    if not request.user.is_authenticated or not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    since = request.GET.get('since')
+    try:
+        since_version = int(since) if since else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid since version'}, status=400)
+
+    try:
+        polled_at = next_stock_version()
+        products = Product.objects.all()
+        if since_version is not None:
+            overlap = int(settings.STOCK_CHANGES_OVERLAP_SECONDS * 1_000_000)
+            products = products.filter(stock_version__gt=since_version - overlap)
+
+        changes = {
+            product_id: {'stock': stock, 'is_active': is_active, 'show_in_all_menu': show_in_all_menu}
+            for product_id, stock, is_active, show_in_all_menu in products.values_list(
+                'id', 'stock_quantity', 'is_active', 'show_in_all_menu'
+            )
+        }
+        return JsonResponse(
+            {'version': str(max(polled_at, since_version or 0)), 'products': changes},
+            json_dumps_params={'separators': (',', ':')},
+        )
+    except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _build_public_catalog(request):
+    """Serialize the products shown on the public menu."""
+    products = Product.objects.filter(show_in_all_menu=True).order_by('name')
+    products_data = []
+    
+    for product in products:
+        image_url = ''
+        try:
+            if product.image:
+                # Get absolute URL for the image
+                image_url = request.build_absolute_uri(product.image.url)
+        except (ValueError, AttributeError):
+            # Image field exists but file doesn't exist or is empty
+            image_url = ''
+        except Exception as e:
+            # Handle any other errors
+            log.warning("product image URL unavailable", product_id=product.id, error=e)
+            image_url = ''
+        
+        products_data.append({
+            'id': product.id,
+            'name': product.name,
+            'price': float(product.price),
+            'category': catalog.PUBLIC_CATEGORY_MAP.get(product.category, product.category or ''),
+            'stock': product.stock_quantity,
+            'image': image_url,
+            'size_options': product.size_options or {},
+            'description': product.description or ''
+        })
+    return products_data
+
+
 @csrf_exempt
 def api_get_products_public(request):
     """Get products for public website (show_in_all_menu=True)
     Products with 0 stock are still shown but marked as out of stock"""
     try:
         # Only filter by show_in_all_menu - don't filter by is_active or stock
-        # This ensures products remain visible even when stock is 0
-        products = Product.objects.filter(show_in_all_menu=True).order_by('name')
-        products_data = []
-        
-        for product in products:
-            image_url = ''
-            try:
-                if product.image:
-                    # Get absolute URL for the image
-                    image_url = request.build_absolute_uri(product.image.url)
-            except (ValueError, AttributeError):
-                # Image field exists but file doesn't exist or is empty
-                image_url = ''
-            except Exception as e:
-                # Handle any other errors
-                print(f"Error getting image URL for product {product.id}: {e}")
-                image_url = ''
-            
-            # Map category names to match frontend expectations
-            category_map = {
-                'spud': 'spuds',
-                'pasta_bread': 'pasta',
-                'appetizers': 'appetizers',
-                'wrap': 'wrap',
-                'desserts': 'desserts'
-            }
-            frontend_category = category_map.get(product.category, product.category or '')
-            
-            products_data.append({
-                'id': product.id,
-                'name': product.name,
-                'price': float(product.price),
-                'category': frontend_category,
-                'stock': product.stock_quantity,
-                'image': image_url,
-                'size_options': product.size_options or {},
-                'description': product.description or ''
-            })
-        
-        return JsonResponse(products_data, safe=False)
+        # This ensures products remain visible even when stock is 0.
+        # The serialized list is cached per catalog version, so unchanged
+        # menus are served (or answered with 304) without querying the database.
+        site_root = request.build_absolute_uri('/')
+        version = catalog.get_catalog_version()
+        etag = catalog.public_catalog_etag(site_root, version)
+        client_etags = [tag.strip().removeprefix('W/') for tag in request.headers.get('If-None-Match', '').split(',')]
+        if etag in client_etags:
+            response = HttpResponseNotModified()
+        else:
+            etag, body = catalog.get_public_catalog(site_root, lambda: _build_public_catalog(request), version)
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        log.exception("api_get_products_public failed")
         return JsonResponse({'error': str(e)}, status=500)
 
 
@@ -2193,7 +2196,7 @@ def api_create_product(request):
             if product.image:
                 image_url = request.build_absolute_uri(product.image.url)
         except Exception as e:
-            print(f"Error getting image URL: {e}")
+            log.warning("product image URL unavailable", product_id=product.id, error=e)
         
         return JsonResponse({
             'success': True,
@@ -2282,7 +2285,7 @@ def api_update_product(request, product_id):
             if product.image:
                 image_url = request.build_absolute_uri(product.image.url)
         except Exception as e:
-            print(f"Error getting image URL: {e}")
+            log.warning("product image URL unavailable", product_id=product.id, error=e)
         
         return JsonResponse({
             'success': True,
@@ -2327,96 +2330,81 @@ def api_get_reports(request, period):
     if not request.user.is_authenticated or not request.user.is_superuser:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     try:
-        from django.db.models import Sum, Q
-        from datetime import datetime, timedelta
-        
-        now = timezone.now()
-        
-        # Define date ranges based on period
-        if period == 'daily':
-            start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            previous_start = start_date - timedelta(days=1)
-            previous_end = start_date
-        elif period == 'weekly':
-            start_date = now - timedelta(days=7)
-            previous_start = start_date - timedelta(days=7)
-            previous_end = start_date
-        elif period == 'monthly':
-            start_date = now - timedelta(days=30)
-            previous_start = start_date - timedelta(days=30)
-            previous_end = start_date
-        elif period == 'yearly':
-            start_date = now - timedelta(days=365)
-            previous_start = start_date - timedelta(days=365)
-            previous_end = start_date
-        else:
+        now = timezone.localtime()
+        if period not in report_cache.REPORT_PERIOD_DAYS:
             return JsonResponse({'error': 'Invalid period'}, status=400)
-        
-        # Get current period orders
-        current_orders = Order.objects.exclude(status='cancelled').filter(
-            created_at__gte=start_date
-        )
-        
-        # Get previous period orders
-        previous_orders = Order.objects.exclude(status='cancelled').filter(
-            created_at__gte=previous_start,
-            created_at__lt=previous_end
-        )
-        
-        # Calculate current period metrics
-        current_sales = current_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        current_products = OrderItem.objects.filter(
-            order__in=current_orders
-        ).aggregate(Sum('quantity'))['quantity__sum'] or 0
-        
-        # Calculate previous period metrics
-        previous_sales = previous_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        previous_products = OrderItem.objects.filter(
-            order__in=previous_orders
-        ).aggregate(Sum('quantity'))['quantity__sum'] or 0
-        
-        # Calculate percentage changes
-        sales_change = ((float(current_sales) - float(previous_sales)) / float(previous_sales) * 100) if previous_sales > 0 else 0
-        products_change = ((current_products - previous_products) / previous_products * 100) if previous_products > 0 else 0
-        
-        # Get detailed product sales information
-        from django.db.models import Sum, Count
-        product_sales = OrderItem.objects.filter(
-            order__in=current_orders
-        ).values('product_name', 'size').annotate(
-            total_quantity=Sum('quantity'),
-            total_revenue=Sum('total_price'),
-            order_count=Count('order', distinct=True)
-        ).order_by('-total_quantity')
-        
-        # Format product sales data
-        products_list = []
-        for item in product_sales:
-            product_name = item['product_name']
-            size = item['size'] or ''
-            display_name = f"{product_name}{' (' + size + ')' if size else ''}"
-            
-            products_list.append({
-                'name': display_name,
-                'quantity': item['total_quantity'],
-                'revenue': float(item['total_revenue']),
-                'orders': item['order_count']
-            })
-        
-        return JsonResponse({
-            'period': period,
-            'sales': float(current_sales),
-            'products_sold': current_products,
-            'sales_change': sales_change,
-            'products_change': products_change,
-            'products_list': products_list,
-            'period_start': timezone.localtime(start_date).strftime('%Y-%m-%d %H:%M:%S'),
-            'period_end': timezone.localtime(now).strftime('%Y-%m-%d %H:%M:%S')
-        })
+
+        # Cached per period and window start; order writes invalidate the windows they touch
+        data, _ = report_cache.get_or_compute(period, now.date(), lambda: _compute_report(period, now.date()))
+        return JsonResponse(dict(data, period_end=now.strftime('%Y-%m-%d %H:%M:%S')))
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _compute_report(period, today):
+    """Sales figures and product breakdown for a report period ending today."""
+    from django.db.models import Sum, Q
+
+    # Each period covers whole local days ending today, read from the daily rollups
+    start_day, previous_start_day = report_cache.report_window(period, today)
+    
+    # Current and previous period metrics in one pass over the daily rows
+    current_window = Q(period_start__gte=start_day)
+    metrics = SalesSummary.objects.filter(
+        period_type=SalesSummary.PERIOD_DAY,
+        period_start__gte=previous_start_day,
+        period_start__lte=today,
+    ).aggregate(
+        current_sales=Sum('total_amount', filter=current_window),
+        current_products=Sum('products_sold', filter=current_window),
+        previous_sales=Sum('total_amount', filter=~current_window),
+        previous_products=Sum('products_sold', filter=~current_window),
+    )
+    current_sales = metrics['current_sales'] or 0
+    current_products = metrics['current_products'] or 0
+    previous_sales = metrics['previous_sales'] or 0
+    previous_products = metrics['previous_products'] or 0
+    
+    # Calculate percentage changes
+    sales_change = ((float(current_sales) - float(previous_sales)) / float(previous_sales) * 100) if previous_sales > 0 else 0
+    products_change = ((current_products - previous_products) / previous_products * 100) if previous_products > 0 else 0
+    
+    # Get detailed product sales information
+    product_sales = ProductSalesSummary.objects.filter(
+        period_type=SalesSummary.PERIOD_DAY,
+        period_start__gte=start_day,
+        period_start__lte=today,
+    ).values('product_name', 'size').annotate(
+        total_quantity=Sum('quantity'),
+        total_revenue=Sum('revenue'),
+        order_count=Sum('order_count')
+    ).filter(total_quantity__gt=0).order_by('-total_quantity')
+    
+    # Format product sales data
+    products_list = []
+    for item in product_sales:
+        product_name = item['product_name']
+        size = item['size'] or ''
+        display_name = f"{product_name}{' (' + size + ')' if size else ''}"
+        
+        products_list.append({
+            'name': display_name,
+            'quantity': item['total_quantity'],
+            'revenue': float(item['total_revenue']),
+            'orders': item['order_count']
+        })
+    
+    return {
+        'period': period,
+        'sales': float(current_sales),
+        'products_sold': current_products,
+        'sales_change': sales_change,
+        'products_change': products_change,
+        'products_list': products_list,
+        'period_start': start_day.strftime('%Y-%m-%d 00:00:00'),
+    }
+
+
 @csrf_exempt
 def api_get_monthly_reports(request, year=None, month=None):
     """Get daily sales data for a specific month for line graph visualization"""
@@ -2424,11 +2412,9 @@ def api_get_monthly_reports(request, year=None, month=None):
     if not request.user.is_authenticated or not request.user.is_superuser:
         return JsonResponse({'error': 'Unauthorized'}, status=403)
     try:
-        from django.db.models import Sum
-        from datetime import datetime, timedelta
         from calendar import monthrange
         
-        now = timezone.now()
+        now = timezone.localtime()
         
         # Use provided year/month or current
         if year is None or month is None:
@@ -2442,53 +2428,38 @@ def api_get_monthly_reports(request, year=None, month=None):
         if month < 1 or month > 12:
             return JsonResponse({'error': 'Invalid month'}, status=400)
         
-        # Get first and last day of month using the current timezone
+        # Daily sales for this month from the daily rollups
         month_info = monthrange(year, month)
-        first_day = timezone.make_aware(datetime(year, month, 1, 0, 0, 0))
-        last_day = timezone.make_aware(datetime(year, month, month_info[1], 23, 59, 59))
-        
-        # Get orders for this month
-        month_orders = Order.objects.exclude(status='cancelled').filter(
-            created_at__gte=first_day,
-            created_at__lte=last_day
-        )
-        
-        # Get daily sales for this month
-        daily_sales = {}
-        for day in range(1, month_info[1] + 1):
-            day_start = timezone.make_aware(datetime(year, month, day, 0, 0, 0))
-            day_end = timezone.make_aware(datetime(year, month, day, 23, 59, 59))
-            
-            day_orders = month_orders.filter(
-                created_at__gte=day_start,
-                created_at__lte=day_end
-            )
-            day_sales = day_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-            daily_sales[day] = float(day_sales)
-        
+        daily_totals = SalesSummary.objects.filter(
+            period_type=SalesSummary.PERIOD_DAY,
+            period_start__year=year,
+            period_start__month=month,
+        ).values_list('period_start', 'total_amount')
+        daily_sales = {day: 0.0 for day in range(1, month_info[1] + 1)}
+        for day, day_total in daily_totals:
+            daily_sales[day.day] = float(day_total or 0)
+
         # Calculate statistics
-        total_sales = month_orders.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
+        total_sales = sum(daily_sales.values())
         
         # Find highest and lowest sales days
         sales_list = [(day, amount) for day, amount in daily_sales.items()]
         highest_day = max(sales_list, key=lambda x: x[1]) if sales_list else (0, 0)
         lowest_day = min(sales_list, key=lambda x: x[1]) if sales_list else (0, 0)
         
-        # Get all available months for dropdown
+        # Months that have sales, for the dropdown (last 12)
+        order_months = (
+            SalesSummary.objects.filter(period_type=SalesSummary.PERIOD_MONTH, order_count__gt=0)
+            .order_by('-period_start')
+            .values_list('period_start', flat=True)[:12]
+        )
         all_months = []
-        all_orders = Order.objects.exclude(status='cancelled').values_list('created_at', flat=True).order_by('-created_at')
-        months_set = set()
-        for order_date in all_orders:
-            if order_date:
-                # Extract year and month from the order date
-                order_year = order_date.year
-                order_month = order_date.month
-                months_set.add((order_year, order_month))
-        
-        # Sort months in reverse chronological order
-        for y, m in sorted(months_set, reverse=True)[:12]:  # Last 12 months
-            months_name = datetime(y, m, 1).strftime('%B %Y')
-            all_months.append({'year': y, 'month': m, 'name': months_name})
+        for month_start in order_months:
+            all_months.append({
+                'year': month_start.year,
+                'month': month_start.month,
+                'name': datetime(month_start.year, month_start.month, 1).strftime('%B %Y')
+            })
         
         return JsonResponse({
             'year': year,
@@ -2503,9 +2474,7 @@ def api_get_monthly_reports(request, year=None, month=None):
             'available_months': all_months
         })
     except Exception as e:
-        import traceback
-        print(f"Error in api_get_monthly_reports: {str(e)}")
-        print(traceback.format_exc())
+        log.exception("api_get_monthly_reports failed")
         return JsonResponse({'error': str(e)}, status=500)
 
 
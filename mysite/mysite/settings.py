@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'hello.middleware.RequestTimingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -133,6 +134,79 @@ SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 
+# Cache shared by all worker processes on this host (order tracking events, etc.).
+# Override CACHE_BACKEND/CACHE_LOCATION to point at Redis or Memcached.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / '.django_cache')),
+    },
+    # Sessions and the users loaded from them (see SESSION_STORE below)
+    'sessions': {
+        'BACKEND': os.getenv('SESSION_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('SESSION_CACHE_LOCATION', str(BASE_DIR / '.django_cache' / 'sessions')),
+    },
+}
+
+# Session storage: "db" (one django_session query per request), "cached_db" (read through the
+# 'sessions' cache, written to both) or "signed_cookies" (no server-side storage at all).
+# A locmem SESSION_CACHE_BACKEND is only safe with a single worker process: a logout in one
+# process would not evict the session cached by another.
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[os.getenv('SESSION_STORE', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# Users loaded by AuthenticationMiddleware are cached in the 'sessions' cache and evicted when saved
+AUTHENTICATION_BACKENDS = [
+    'hello.backends.CachedModelBackend',
+    # Sessions created before the cached backend was added still name this one
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '300'))
+
+# Per-request timing (hello/middleware.py): Server-Timing header for staff, and a
+# "slow request" log line with the most repeated SQL above either threshold
+REQUEST_TIMING_HEADER = env_bool('REQUEST_TIMING_HEADER', True)
+REQUEST_SLOW_MS = float(os.getenv('REQUEST_SLOW_MS', '500'))
+REQUEST_SLOW_QUERIES = int(os.getenv('REQUEST_SLOW_QUERIES', '30'))
+
+# Prometheus metrics at /metrics: each worker process writes its counters to
+# METRICS_DIR every METRICS_FLUSH_INTERVAL seconds and the endpoint adds them up
+METRICS_DIR = os.getenv('METRICS_DIR', str(BASE_DIR / '.django_cache' / 'metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; unset means staff sessions only
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Server-Sent Events stream used by the delivery/pickup tracking pages
+ORDER_EVENTS_POLL_INTERVAL = float(os.getenv('ORDER_EVENTS_POLL_INTERVAL', '1'))
+ORDER_EVENTS_HEARTBEAT_INTERVAL = float(os.getenv('ORDER_EVENTS_HEARTBEAT_INTERVAL', '15'))
+ORDER_EVENTS_STREAM_TIMEOUT = float(os.getenv('ORDER_EVENTS_STREAM_TIMEOUT', '300'))
+ORDER_EVENTS_RETRY_MS = int(os.getenv('ORDER_EVENTS_RETRY_MS', '3000'))
+ORDER_EVENTS_CACHE_TIMEOUT = int(os.getenv('ORDER_EVENTS_CACHE_TIMEOUT', str(60 * 60 * 12)))
+
+# Keyset-paginated order list for the admin dashboard (/api/orders/all/)
+ORDERS_PAGE_SIZE = int(os.getenv('ORDERS_PAGE_SIZE', '50'))
+ORDERS_MAX_PAGE_SIZE = int(os.getenv('ORDERS_MAX_PAGE_SIZE', '200'))
+
+# Incremental order feed polled by the admin dashboard (/api/orders/changes/)
+ORDER_CHANGES_PAGE_SIZE = int(os.getenv('ORDER_CHANGES_PAGE_SIZE', '200'))
+ORDER_CHANGES_OVERLAP_SECONDS = float(os.getenv('ORDER_CHANGES_OVERLAP_SECONDS', '5'))
+# Deleted order ids are reported to pollers for this long (purged by the reconcile cron)
+ORDER_CHANGES_TOMBSTONE_DAYS = int(os.getenv('ORDER_CHANGES_TOMBSTONE_DAYS', '7'))
+
+# Stock delta feed polled by the admin products page (/api/products/stock/)
+STOCK_CHANGES_OVERLAP_SECONDS = float(os.getenv('STOCK_CHANGES_OVERLAP_SECONDS', '5'))
+
+# Cached sales reports (/api/reports/<period>/)
+REPORTS_CACHE_TIMEOUT = int(os.getenv('REPORTS_CACHE_TIMEOUT', '60'))
+REPORTS_CACHE_LOCK_TIMEOUT = float(os.getenv('REPORTS_CACHE_LOCK_TIMEOUT', '10'))
+REPORTS_CACHE_WAIT_INTERVAL = float(os.getenv('REPORTS_CACHE_WAIT_INTERVAL', '0.05'))
+# flock() files that let one worker compute a report while the others wait (file-based cache only)
+REPORTS_CACHE_LOCK_DIR = os.getenv('REPORTS_CACHE_LOCK_DIR', str(BASE_DIR / '.django_cache' / 'locks'))
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -150,6 +224,8 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT', '587'))
 EMAIL_USE_TLS = env_bool('EMAIL_USE_TLS', True)
 EMAIL_USE_SSL = env_bool('EMAIL_USE_SSL', False)
 EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '30'))
+# Reused mail connection is closed after this many idle seconds (hello/utils/email.py)
+EMAIL_CONNECTION_IDLE_TIMEOUT = float(os.getenv('EMAIL_CONNECTION_IDLE_TIMEOUT', '60'))
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 BREVO_API_KEY = os.getenv("BREVO_API_KEY", "")
@@ -157,6 +233,25 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'Mother Julie <noreply.moth
 SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', 'django-insecure-local-dev-key')
 SERVER_EMAIL = os.getenv('SERVER_EMAIL', DEFAULT_FROM_EMAIL)
 
+# Transactional email outbox drained by `manage.py run_email_worker`
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', '50'))
+EMAIL_OUTBOX_POLL_INTERVAL = float(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', '2'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv('EMAIL_OUTBOX_RETRY_BASE_SECONDS', '15'))
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = float(os.getenv('EMAIL_OUTBOX_RETRY_MAX_SECONDS', '1800'))
+EMAIL_OUTBOX_LOCK_TIMEOUT = int(os.getenv('EMAIL_OUTBOX_LOCK_TIMEOUT', '300'))
+
+# In-process pool that sends freshly committed outbox rows without waiting for the worker's poll
+EMAIL_DISPATCH_IMMEDIATE = env_bool('EMAIL_DISPATCH_IMMEDIATE', True)
+EMAIL_DISPATCH_WORKERS = int(os.getenv('EMAIL_DISPATCH_WORKERS', '2'))
+EMAIL_DISPATCH_QUEUE_SIZE = int(os.getenv('EMAIL_DISPATCH_QUEUE_SIZE', '20'))
+EMAIL_DISPATCH_DRAIN_TIMEOUT = float(os.getenv('EMAIL_DISPATCH_DRAIN_TIMEOUT', '10'))
+
+# Signup OTP and password reset emails: repeat requests inside the window reuse the queued email,
+# and reset responses are padded so they take the same time whether or not the account exists
+OTP_RESEND_WINDOW_SECONDS = int(os.getenv('OTP_RESEND_WINDOW_SECONDS', '60'))
+PASSWORD_RESET_MIN_RESPONSE_SECONDS = float(os.getenv('PASSWORD_RESET_MIN_RESPONSE_SECONDS', '0.3'))
+
 ANYMAIL = {
     "BREVO_API_KEY": BREVO_API_KEY,
     "IGNORE_RECIPIENT_STATUS": True,  # Optional: prevents errors for invalid recipients
@@ -171,6 +266,10 @@ ADMINS = [
 LALAMOVE_API_KEY = os.getenv('LALAMOVE_API_KEY', '')
 LALAMOVE_API_SECRET = os.getenv('LALAMOVE_API_SECRET', '')
 LALAMOVE_MODE = os.getenv('LALAMOVE_MODE', 'sandbox').lower()  # sandbox or production
+# Quotes are reused for endpoints in the same geohash cells (precision 8 is roughly 40 m)
+# for as long as a Lalamove quotation stays valid (5 minutes)
+DELIVERY_QUOTE_GEOHASH_PRECISION = int(os.getenv('DELIVERY_QUOTE_GEOHASH_PRECISION', '8'))
+DELIVERY_QUOTE_CACHE_TTL = int(os.getenv('DELIVERY_QUOTE_CACHE_TTL', '300'))
 DELIVERY_FEE_BASE = float(os.getenv('DELIVERY_FEE_BASE', '50'))
 DELIVERY_FEE_INCLUDED_KM = float(os.getenv('DELIVERY_FEE_INCLUDED_KM', '2'))
 DELIVERY_FEE_PER_KM_AFTER_INCLUDED = float(os.getenv('DELIVERY_FEE_PER_KM_AFTER_INCLUDED', '10'))
@@ -181,6 +280,37 @@ PAYMONGO_SECRET_KEY = os.getenv('PAYMONGO_SECRET_KEY', '')
 PAYMONGO_MODE = os.getenv('PAYMONGO_MODE', 'sandbox').lower()  # sandbox or production
 # Optional Basic auth header for direct QRPH generation flow
 PAYMONGO_QRPH_BASIC_AUTH = os.getenv('PAYMONGO_QRPH_BASIC_AUTH', '')
+# Webhook secret from the PayMongo dashboard (api/paymongo/webhook/)
+PAYMONGO_WEBHOOK_SECRET = os.getenv('PAYMONGO_WEBHOOK_SECRET', '')
+PAYMONGO_WEBHOOK_TOLERANCE_SECONDS = int(os.getenv('PAYMONGO_WEBHOOK_TOLERANCE_SECONDS', '300'))
+# Non-final payment statuses older than this are re-checked with PayMongo
+PAYMENT_STATUS_STALE_SECONDS = int(os.getenv('PAYMENT_STATUS_STALE_SECONDS', '15'))
+
+# Pooled HTTP clients for PayMongo and Lalamove (hello/utils/integrations.py)
+INTEGRATION_CONNECT_TIMEOUT = float(os.getenv('INTEGRATION_CONNECT_TIMEOUT', '3.05'))
+INTEGRATION_READ_TIMEOUT = float(os.getenv('INTEGRATION_READ_TIMEOUT', '10'))
+INTEGRATION_POOL_MAXSIZE = int(os.getenv('INTEGRATION_POOL_MAXSIZE', '10'))
+INTEGRATION_BREAKER_THRESHOLD = int(os.getenv('INTEGRATION_BREAKER_THRESHOLD', '5'))
+INTEGRATION_BREAKER_COOLDOWN = float(os.getenv('INTEGRATION_BREAKER_COOLDOWN', '30'))
+
+# App logging (hello/logging.py): key=value lines written to stdout from a background thread.
+# LOG_LEVEL applies to every "hello" logger; LOG_LEVELS overrides single loggers,
+# e.g. "hello.views=DEBUG,hello.utils.email=WARNING" (debug payload dumps are off at INFO).
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'queue': {'class': 'hello.logging.QueueingHandler'},
+    },
+    'loggers': {
+        'hello': {'handlers': ['queue'], 'level': LOG_LEVEL, 'propagate': False},
+        **{
+            name.strip(): {'level': level.strip().upper()}
+            for name, _, level in (item.partition('=') for item in env_list('LOG_LEVELS'))
+        },
+    },
+}
 
 
 ROOT_URLCONF = 'mysite.urls'
\ No newline at end of file